@@ -1,12 +1,15 @@
 import os
+import weakref
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, current_user
+from app.services.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 bcrypt = Bcrypt()
 login_manager = LoginManager()
@@ -14,19 +17,55 @@ login_manager.login_view = 'auth.login' # 'auth' will be our authentication blue
 
 import app.models
 
+# With `gunicorn --preload` the workers are forked from a master that already built
+# the app. A pooled connection must never be used by two processes, so each child
+# starts with empty pools; close=False leaves the parent's connections to the parent.
+# The hook is registered once per process and covers the engines of every app created
+# so far (weakly held, so apps built by tests or CLI commands can still be freed).
+_fork_engines = weakref.WeakSet()
+_fork_hook_registered = False
+
+def _dispose_pools_in_child():
+    for engine in list(_fork_engines):
+        engine.dispose(close=False)
+
+def _dispose_after_fork(engines):
+    global _fork_hook_registered
+    _fork_engines.update(engines)
+    if not _fork_hook_registered:
+        os.register_at_fork(after_in_child=_dispose_pools_in_child)
+        _fork_hook_registered = True
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    hops = app.config.get('TRUSTED_PROXY_HOPS', 0)
+    if hops:
+        # request.remote_addr becomes the client's address, as the login throttle expects
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
+    from app.services import replicas
+    replicas.configure(app)
     db.init_app(app)
+    with app.app_context():
+        _dispose_after_fork(list(db.engines.values()))
     migrate.init_app(app, db)
     bcrypt.init_app(app)
     login_manager.init_app(app)
 
+    from app.services import versioning, audit, catalog, fragments, user_cache, throttle, profiler
+    replicas.init_app(app)
+    versioning.init_app(app)
+    audit.init_app(app)
+    catalog.init_app(app)
+    fragments.init_app(app)
+    user_cache.init_app(app)
+    throttle.init_app(app)
+    profiler.init_app(app)
+
     @login_manager.user_loader
     def load_user(user_id):
-        from app.models import User
-        return User.query.get(int(user_id))
+        return user_cache.load(int(user_id))
 
     # Register blueprints here
     from app.routes.main import main_bp
@@ -41,9 +80,18 @@ def create_app(config_class=Config):
     from app.staf.routes import staf_bp
     app.register_blueprint(staf_bp)
 
+    from app.api.routes import api_bp
+    app.register_blueprint(api_bp)
+
     # Register CLI commands
-    from app.cli import seed
+    from app.cli import seed, archive_history, report, stock, branch, import_data, bench
     app.cli.add_command(seed)
+    app.cli.add_command(archive_history, 'archive')
+    app.cli.add_command(report)
+    app.cli.add_command(stock)
+    app.cli.add_command(branch)
+    app.cli.add_command(import_data, 'import')
+    app.cli.add_command(bench)
 
     # Error handlers
     from flask import render_template
@@ -1,10 +1,18 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, SelectField, IntegerField
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import Form, StringField, PasswordField, SubmitField, SelectField, SelectMultipleField, IntegerField, FieldList, FormField
+from wtforms.widgets import HiddenInput
 from wtforms.validators import DataRequired, ValidationError, EqualTo, Optional, NumberRange
 from app.models import User, Produk
+from app.services import catalog
+
+ROLE_CHOICES = [('pending', 'Pending'), ('staf', 'Staf'), ('admin', 'Admin'), ('superadmin', 'Superadmin')]
 
 class UserRoleForm(FlaskForm):
-    role = SelectField('Role', choices=[('pending', 'Pending'), ('staf', 'Staf'), ('admin', 'Admin'), ('superadmin', 'Superadmin')], validators=[DataRequired()])
+    # One form for the whole user page: the checked rows all get the selected role
+    user_ids = SelectMultipleField('Pengguna', coerce=int, validate_choice=False,
+                                   validators=[DataRequired(message='Pilih minimal satu pengguna.')])
+    role = SelectField('Role', choices=ROLE_CHOICES, validators=[DataRequired()])
     submit = SubmitField('Update Role')
 
 class ProductForm(FlaskForm):
@@ -13,14 +21,49 @@ class ProductForm(FlaskForm):
     stock = StringField('Stok', validators=[DataRequired()])   # Use StringField for stock for now
     category = StringField('Kategori', validators=[Optional()])
     image = StringField('URL Gambar (Opsional)', validators=[Optional()])
+    reorder_point = IntegerField('Titik Pesan Ulang', default=0, validators=[Optional(), NumberRange(min=0)])
     submit = SubmitField('Simpan Produk')
 
+class ProductImportForm(FlaskForm):
+    # Columns: nama, harga, stok, kategori, gambar (see app/services/importer.py)
+    file = FileField('File CSV', validators=[FileRequired(), FileAllowed(['csv'], 'Hanya file CSV yang diizinkan.')])
+    submit = SubmitField('Import Produk')
+
 class IncomingProductForm(FlaskForm):
-    product_id = SelectField('Pilih Produk', coerce=int, validators=[DataRequired()])
+    # Filled in by the type-ahead search box (templates/_product_search.html)
+    product_id = IntegerField('Pilih Produk', widget=HiddenInput(), validators=[DataRequired(message='Pilih produk terlebih dahulu.')])
     quantity = IntegerField('Jumlah Barang Masuk', validators=[DataRequired(), NumberRange(min=1, message='Jumlah harus lebih dari 0.')])
     submit = SubmitField('Input Barang Masuk')
 
 class OutgoingProductForm(FlaskForm):
-    product_id = SelectField('Pilih Produk', coerce=int, validators=[DataRequired()])
+    # Filled in by the type-ahead search box (templates/_product_search.html)
+    product_id = IntegerField('Pilih Produk', widget=HiddenInput(), validators=[DataRequired(message='Pilih produk terlebih dahulu.')])
     quantity = IntegerField('Jumlah Barang Keluar', validators=[DataRequired(), NumberRange(min=1, message='Jumlah harus lebih dari 0.')])
     submit = SubmitField('Input Barang Keluar')
+
+class TransferForm(FlaskForm):
+    # Filled in by the type-ahead search box (templates/_product_search.html)
+    product_id = IntegerField('Pilih Produk', widget=HiddenInput(), validators=[DataRequired(message='Pilih produk terlebih dahulu.')])
+    # Choices are the branches (plus Pusat), set by the view
+    dari = SelectField('Dari', coerce=int)
+    ke = SelectField('Ke', coerce=int)
+    quantity = IntegerField('Jumlah', validators=[DataRequired(), NumberRange(min=1, message='Jumlah harus lebih dari 0.')])
+    submit = SubmitField('Pindahkan Stok')
+
+    def validate_ke(self, field):
+        if field.data == self.dari.data:
+            raise ValidationError('Cabang tujuan harus berbeda dari cabang asal.')
+
+class CheckoutLineForm(Form):
+    # Plain Form: line items are nested inside CheckoutForm, which carries the CSRF token.
+    # Filled in by the type-ahead search box, so the id is checked against the catalog here
+    product_id = IntegerField('Produk', widget=HiddenInput(), validators=[Optional()])
+    quantity = IntegerField('Jumlah', validators=[Optional(), NumberRange(min=1, message='Jumlah harus lebih dari 0.')])
+
+    def validate_product_id(self, field):
+        if field.data and catalog.get(field.data) is None:
+            raise ValidationError('Produk tidak ditemukan.')
+
+class CheckoutForm(FlaskForm):
+    items = FieldList(FormField(CheckoutLineForm), min_entries=3, max_entries=50)
+    submit = SubmitField('Proses Penjualan')
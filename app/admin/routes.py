@@ -1,9 +1,17 @@
 import functools
-from flask import Blueprint, render_template, abort, flash, redirect, url_for, request
+import io
+import os
+from datetime import datetime, timedelta
+from flask import Blueprint, current_app, render_template, abort, flash, redirect, url_for, request, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from app import db
-from app.models import User, Produk, TransaksiMasuk, TransaksiKeluar, RiwayatAktivitas
-from app.admin.forms import UserRoleForm, ProductForm, IncomingProductForm, OutgoingProductForm
+from app.models import User, Produk, TransaksiMasuk, TransaksiKeluar, RiwayatAktivitas, PenjualanHarian
+from app.admin.forms import ROLE_CHOICES, UserRoleForm, ProductForm, ProductImportForm, IncomingProductForm, OutgoingProductForm, TransferForm
+from app.pagination import keyset_paginate, keyset_slice, name_paginate
+from app.services import archive, audit, branches, catalog, counters, export, fragments, importer, low_stock, profiler, sales, snapshots, user_cache
+from app.services.replicas import read_replica
+from app.services.stock import available, adjust_stock, receive_stock, issue_stock, transfer_stock
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -18,75 +26,107 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def superadmin_required(f):
+    @functools.wraps(f)
+    @login_required
+    def decorated_function(*args, **kwargs):
+        if current_user.role != 'superadmin':
+            flash('Anda tidak memiliki izin untuk mengakses halaman ini.', 'error')
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
 @admin_bp.route('/dashboard')
 @admin_required
+@read_replica
 def dashboard():
-    total_users = User.query.count()
-    total_products = Produk.query.count()
-    total_incoming_transactions = TransaksiMasuk.query.with_entities(db.func.sum(TransaksiMasuk.jumlah)).scalar() or 0
-    total_outgoing_transactions = TransaksiKeluar.query.with_entities(db.func.sum(TransaksiKeluar.jumlah)).scalar() or 0
+    totals = counters.read_all()
+    date_from, date_to = sales.default_range()
+    # The range moves at midnight, so the day is part of the key
+    sales_panel = fragments.render('admin.dashboard_sales', 'admin/_dashboard_sales.html', lambda: {
+        'sales_totals': sales.totals(date_from, date_to),
+        'sales_days': sales.by_period(date_from, date_to),
+        'best_sellers': sales.top_products(date_from, date_to, limit=5),
+    }, key=date_to)
+    # Cached like the product tables: every stock write bumps the catalog version
+    low_stock_panel = fragments.render('admin.dashboard_low_stock', 'admin/_low_stock.html', lambda: {
+        'low_stock': low_stock.top(current_app.config['LOW_STOCK_DASHBOARD_LIMIT']),
+        'low_stock_count': low_stock.count(),
+    })
 
     return render_template('admin/dashboard.html',
                            title='Admin Dashboard',
-                           total_users=total_users,
-                           total_products=total_products,
-                           total_incoming_transactions=total_incoming_transactions,
-                           total_outgoing_transactions=total_outgoing_transactions)
+                           total_users=totals[counters.TOTAL_USERS],
+                           total_products=totals[counters.TOTAL_PRODUCTS],
+                           total_incoming_transactions=totals[counters.TOTAL_INCOMING],
+                           total_outgoing_transactions=totals[counters.TOTAL_OUTGOING],
+                           sales_panel=sales_panel,
+                           low_stock_panel=low_stock_panel)
+
+USERS_PER_PAGE = 50
 
-@admin_bp.route('/users', methods=['GET', 'POST']) # Allow POST for form submission
+def _user_filters(args):
+    """The search/role filters of the user page present in `args`, for links and redirects."""
+    return {key: args.get(key) for key in ('q', 'peran', 'setelah') if args.get(key)}
+
+@admin_bp.route('/users')
 @admin_required
+@read_replica
 def manage_users():
-    users = User.query.all()
-    form_instances = {} # Dictionary to hold a form instance for each user
-
-    for user in users:
-        form = UserRoleForm()
-        form.role.data = user.role # Pre-populate with current role
-        form_instances[user.id] = form
-
-    if request.method == 'POST':
-        user_id = request.form.get('user_id') # Get user_id from hidden field in form
-        if user_id:
-            user_to_update = User.query.get(int(user_id))
-            if user_to_update:
-                form = UserRoleForm(request.form) # Bind form data to specific form
-                if form.validate_on_submit():
-                    # Security checks for role changes
-                    # If the target user is a Superadmin
-                    if user_to_update.role == 'superadmin':
-                        # Prevent changing another Superadmin's role (except self, handled below)
-                        if user_to_update.id != current_user.id:
-                            flash('Anda tidak memiliki izin untuk mengubah peran Superadmin lain.', 'error')
-                            return redirect(url_for('admin.manage_users'))
-                        # Prevent a Superadmin from demoting themselves
-                        elif form.role.data != 'superadmin':
-                            flash('Superadmin tidak dapat menurunkan perannya sendiri.', 'error')
-                            return redirect(url_for('admin.manage_users'))
-                        else: # Superadmin trying to set their own role to superadmin (no actual change)
-                            flash(f'Peran pengguna {user_to_update.username} sudah Superadmin.', 'message')
-                            return redirect(url_for('admin.manage_users'))
-                    # If the target user is NOT a Superadmin
-                    else:
-                        # Prevent non-Superadmin from promoting to Superadmin
-                        if form.role.data == 'superadmin' and current_user.role != 'superadmin':
-                            flash('Hanya Superadmin yang dapat mengangkat pengguna ke peran Superadmin.', 'error')
-                            return redirect(url_for('admin.manage_users'))
-
-                        user_to_update.role = form.role.data
-                        db.session.commit()
-                        flash(f'Peran pengguna {user_to_update.username} berhasil diperbarui menjadi {user_to_update.role}.', 'message')
-                        return redirect(url_for('admin.manage_users'))
-                else:
-                    # If form validation fails for a specific user, display errors
-                    for field, errors in form.errors.items():
-                        for error in errors:
-                            flash(f'Error pada {field} untuk {user_to_update.username}: {error}', 'error')
-            else:
-                flash('Pengguna tidak ditemukan.', 'error')
-        else:
-            flash('ID pengguna tidak diberikan.', 'error')
+    query = request.args.get('q', '').strip()
+    role = request.args.get('peran', '')
+    users = db.session.query(User.id, User.username, User.role)
+    if query:
+        # Prefix match, so the search can use the unique index on username
+        users = users.filter(User.username.startswith(query, autoescape=True))
+    if role in dict(ROLE_CHOICES):
+        users = users.filter(User.role == role)
+    page = name_paginate(users, User.username, after=request.args.get('setelah'), per_page=USERS_PER_PAGE)
+
+    # A single form for the page, whatever the number of users listed
+    form = UserRoleForm()
+    return render_template('admin/manage_users.html', title='Kelola Admin & Staf', users=page.items, page=page,
+                           form=form, query=query, role=role, roles=ROLE_CHOICES,
+                           filters=_user_filters(request.args))
+
+@admin_bp.route('/users/role', methods=['POST'])
+@admin_required
+def update_roles():
+    back = redirect(url_for('admin.manage_users', **_user_filters(request.args)))
+    form = UserRoleForm()
+    if not form.validate_on_submit():
+        for field, errors in form.errors.items():
+            for error in errors:
+                flash(f'Error pada {field}: {error}', 'error')
+        return back
+
+    role = form.role.data
+    # Prevent non-Superadmin from promoting to Superadmin
+    if role == 'superadmin' and current_user.role != 'superadmin':
+        flash('Hanya Superadmin yang dapat mengangkat pengguna ke peran Superadmin.', 'error')
+        return back
+
+    user_ids = set(form.user_ids.data)
+    # One UPDATE for all selected users. Superadmins are never changed here: another
+    # Superadmin's role is off limits and a Superadmin cannot demote themselves; the
+    # condition is part of the UPDATE, so a concurrent promotion cannot slip through.
+    result = db.session.execute(
+        db.update(User)
+        .where(User.id.in_(user_ids), User.role != 'superadmin', User.role != role)
+        .values(role=role)
+        .execution_options(synchronize_session=False))
+    changed = result.rowcount
+    if changed:
+        user_cache.invalidate()
+        audit.log(current_user.id, f'Ubah peran {changed} pengguna menjadi {role}')
+    db.session.commit()
 
-    return render_template('admin/manage_users.html', title='Kelola Admin & Staf', users=users, form_instances=form_instances)
+    if changed:
+        flash(f'Peran {changed} pengguna berhasil diperbarui menjadi {role}.', 'message')
+    skipped = len(user_ids) - changed
+    if skipped:
+        flash(f'{skipped} pengguna dilewati (Superadmin, sudah berperan {role}, atau tidak ditemukan).', 'message')
+    return back
 
 @admin_bp.route('/products', methods=['GET', 'POST'])
 @admin_required
@@ -96,17 +136,52 @@ def manage_products():
         product = Produk(
             nama=form.name.data,
             harga=int(form.price.data), # Convert to int
-            stok=int(form.stock.data),   # Convert to int
+            stok=0,
             kategori=form.category.data,
-            gambar=form.image.data
+            gambar=form.image.data,
+            titik_pesan=form.reorder_point.data or 0
         )
         db.session.add(product)
+        db.session.flush()
+        # The opening stock is a receipt, so the ledger accounts for every unit
+        stok = int(form.stock.data)
+        if stok > 0:
+            receive_stock(product, stok, current_user.id, f'[Admin] Stok awal {stok} unit {product.nama}')
+        counters.bump(counters.TOTAL_PRODUCTS)
+        catalog.invalidate(names=True)
         db.session.commit()
         flash('Produk berhasil ditambahkan!', 'message')
         return redirect(url_for('admin.manage_products'))
 
-    products = Produk.query.all()
-    return render_template('admin/manage_products.html', title='Kelola Produk', products=products, form=form)
+    product_table = fragments.render('admin.product_table', 'admin/_product_table.html',
+                                     lambda: {'products': Produk.query.all()})
+    return render_template('admin/manage_products.html', title='Kelola Produk', product_table=product_table, form=form,
+                           import_form=ProductImportForm())
+
+@admin_bp.route('/products/import', methods=['POST'])
+@admin_required
+def import_products():
+    form = ProductImportForm()
+    if not form.validate_on_submit():
+        for error in form.file.errors:
+            flash(error, 'error')
+        return redirect(url_for('admin.manage_products'))
+
+    # Decoded on the fly, so the upload is parsed batch by batch like the CLI import
+    stream = io.TextIOWrapper(form.file.data.stream, encoding='utf-8-sig', newline='')
+    try:
+        result = importer.import_products(stream, current_user.id)
+    except UnicodeDecodeError:
+        db.session.rollback()
+        flash('File harus berupa CSV dengan encoding UTF-8.', 'error')
+        return redirect(url_for('admin.manage_products'))
+
+    flash(f'Import selesai: {result.created} produk baru, {result.updated} diperbarui, '
+          f'{result.units} unit masuk.', 'message')
+    if result.error_count:
+        details = '; '.join(f'baris {line}: {message}' for line, message in result.errors[:10])
+        flash(f'{result.error_count} baris dilewati ({details}).', 'error')
+    return redirect(url_for('admin.manage_products'))
 
 @admin_bp.route('/product/edit/<int:product_id>', methods=['GET', 'POST'])
 @admin_required
@@ -116,9 +191,14 @@ def edit_product(product_id):
     if form.validate_on_submit():
         product.nama = form.name.data
         product.harga = int(form.price.data)
-        product.stok = int(form.stock.data)
         product.kategori = form.category.data
         product.gambar = form.image.data
+        product.titik_pesan = form.reorder_point.data or 0
+        # A changed stock figure is a correction and is recorded in the ledger
+        stok = int(form.stock.data)
+        adjust_stock(product, stok, current_user.id,
+                     f'[Admin] Koreksi stok {product.nama}: {product.stok} -> {stok} unit')
+        catalog.invalidate(names=True)
         db.session.commit()
         flash('Produk berhasil diperbarui!', 'message')
         return redirect(url_for('admin.manage_products'))
@@ -126,8 +206,9 @@ def edit_product(product_id):
         form.name.data = product.nama
         form.price.data = product.harga
         form.stock.data = product.stok
-        form.kategori.data = product.kategori
-        form.gambar.data = product.gambar
+        form.category.data = product.kategori
+        form.image.data = product.gambar
+        form.reorder_point.data = product.titik_pesan
     return render_template('admin/edit_product.html', title='Edit Produk', form=form, product_id=product.id)
 
 
@@ -135,8 +216,24 @@ def edit_product(product_id):
 @admin_required
 def delete_product(product_id):
     product = Produk.query.get_or_404(product_id)
+    # The ledger and the sales rollups keep their product rows; a product with history stays
+    history = db.session.query(
+        db.exists().where(TransaksiMasuk.produk_id == product.id)
+        | db.exists().where(TransaksiKeluar.produk_id == product.id)
+        | db.exists().where(PenjualanHarian.produk_id == product.id)).scalar()
+    if history:
+        flash(f'Produk {product.nama} tidak dapat dihapus karena sudah memiliki riwayat transaksi.', 'error')
+        return redirect(url_for('admin.manage_products'))
     db.session.delete(product)
-    db.session.commit()
+    counters.bump(counters.TOTAL_PRODUCTS, -1)
+    catalog.invalidate(names=True)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A movement was recorded between the check and the delete
+        db.session.rollback()
+        flash(f'Produk {product_id} tidak dapat dihapus karena sudah memiliki riwayat transaksi.', 'error')
+        return redirect(url_for('admin.manage_products'))
     flash('Produk berhasil dihapus!', 'message')
     return redirect(url_for('admin.manage_products'))
 
@@ -145,33 +242,20 @@ def delete_product(product_id):
 @admin_required
 def incoming_products():
     form = IncomingProductForm()
-    # Populate product choices dynamically
-    form.product_id.choices = [(p.id, p.nama) for p in Produk.query.order_by(Produk.nama).all()]
 
     if form.validate_on_submit():
-        product = Produk.query.get(form.product_id.data)
+        product = catalog.get(form.product_id.data)
         if product:
             quantity = form.quantity.data
-            product.stok += quantity
-            
-            transaction = TransaksiMasuk(
-                produk_id=product.id,
-                jumlah=quantity,
-                user_id=current_user.id
-            )
-            db.session.add(transaction)
-
-            activity = RiwayatAktivitas(
-                user_id=current_user.id,
-                aktivitas=f'Input barang masuk: {quantity} unit {product.nama}'
-            )
-            db.session.add(activity)
-
-            db.session.commit()
-            flash(f'{quantity} unit {product.nama} berhasil ditambahkan ke stok.', 'message')
-            return redirect(url_for('admin.incoming_products'))
-        else:
-            flash('Produk tidak ditemukan.', 'error')
+            if receive_stock(product, quantity, current_user.id,
+                             f'Input barang masuk: {quantity} unit {product.nama}',
+                             cabang_id=current_user.cabang_id):
+                db.session.commit()
+                flash(f'{quantity} unit {product.nama} berhasil ditambahkan ke stok.', 'message')
+                return redirect(url_for('admin.incoming_products'))
+            # The cached product was deleted after the catalog was loaded
+            db.session.rollback()
+        flash('Produk tidak ditemukan.', 'error')
     
     return render_template('admin/incoming_products.html', title='Input Barang Masuk', form=form)
 
@@ -179,58 +263,276 @@ def incoming_products():
 @admin_required
 def outgoing_products():
     form = OutgoingProductForm()
-    # Populate product choices dynamically
-    form.product_id.choices = [(p.id, p.nama) for p in Produk.query.order_by(Produk.nama).all()]
 
     if form.validate_on_submit():
-        product = Produk.query.get(form.product_id.data)
+        product = catalog.get(form.product_id.data)
         if product:
             quantity = form.quantity.data
-            if product.stok >= quantity:
-                product.stok -= quantity
-
-                transaction = TransaksiKeluar(
-                    produk_id=product.id,
-                    jumlah=quantity,
-                    user_id=current_user.id
-                )
-                db.session.add(transaction)
-
-                activity = RiwayatAktivitas(
-                    user_id=current_user.id,
-                    aktivitas=f'Input barang keluar: {quantity} unit {product.nama}'
-                )
-                db.session.add(activity)
-
+            if issue_stock(product, quantity, current_user.id,
+                           f'Input barang keluar: {quantity} unit {product.nama}',
+                           cabang_id=current_user.cabang_id):
                 db.session.commit()
                 flash(f'{quantity} unit {product.nama} berhasil dikeluarkan dari stok.', 'message')
                 return redirect(url_for('admin.outgoing_products'))
             else:
-                flash(f'Stok {product.nama} tidak mencukupi. Stok tersedia: {product.stok}.', 'error')
+                db.session.rollback()
+                flash(f'Stok {product.nama} tidak mencukupi. Stok tersedia: {available(product.id, current_user.cabang_id)}.', 'error')
         else:
             flash('Produk tidak ditemukan.', 'error')
     
     return render_template('admin/outgoing_products.html', title='Input Barang Keluar', form=form)
 
+@admin_bp.route('/branches', methods=['GET', 'POST'])
+@admin_required
+def branch_stock():
+    form = TransferForm()
+    form.dari.choices = form.ke.choices = branches.choices()
+
+    if form.validate_on_submit():
+        product = catalog.get(form.product_id.data)
+        if product:
+            quantity = form.quantity.data
+            dari, ke = branches.from_choice(form.dari.data), branches.from_choice(form.ke.data)
+            labels = dict(form.dari.choices)
+            if transfer_stock(product, quantity, current_user.id, dari, ke,
+                              f'Mutasi stok: {quantity} unit {product.nama} dari {labels[form.dari.data]} '
+                              f'ke {labels[form.ke.data]}'):
+                db.session.commit()
+                flash(f'{quantity} unit {product.nama} berhasil dipindahkan ke {labels[form.ke.data]}.', 'message')
+                return redirect(url_for('admin.branch_stock', cabang_id=form.ke.data))
+            db.session.rollback()
+            flash(f'Stok {product.nama} di {labels[form.dari.data]} tidak mencukupi. '
+                  f'Stok tersedia: {available(product.id, dari)}.', 'error')
+        else:
+            flash('Produk tidak ditemukan.', 'error')
+
+    # Stock of one branch at a time: a range read of that branch's stok_cabang rows
+    cabang_id = request.args.get('cabang_id', type=int)
+    if cabang_id is None and len(form.dari.choices) > 1:
+        cabang_id = form.dari.choices[1][0]
+    stock = branches.stock_list(cabang_id) if cabang_id else []
+    return render_template('admin/branch_stock.html', title='Stok Cabang', form=form, cabang_id=cabang_id,
+                           branch_choices=form.dari.choices[1:], stock=stock)
+
+
+def _parse_date_arg(name, strict=False):
+    # strict: reject a malformed date with 400 instead of ignoring it with a flash
+    value = request.args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        if strict:
+            abort(400)
+        flash(f'Format tanggal tidak valid: {value}', 'error')
+        return None
+
+def _filtered_transactions(model, time_column, date_from, date_to, produk_id, user_id, cabang_id=None):
+    # produk and user are joined into the same SELECT so the template never lazy-loads per row
+    query = model.query.options(db.joinedload(model.produk), db.joinedload(model.user))
+    if cabang_id is not None:
+        # Served by the (cabang_id, tanggal) index: a branch's page reads only its own rows
+        query = query.filter(_branch_is(model.cabang_id, cabang_id))
+    if date_from:
+        query = query.filter(time_column >= date_from)
+    if date_to:
+        query = query.filter(time_column < date_to + timedelta(days=1))
+    if produk_id is not None:
+        query = query.filter(model.produk_id == produk_id)
+    if user_id is not None:
+        query = query.filter(model.user_id == user_id)
+    return query
+
+def _branch_is(column, cabang_id):
+    # branches.PUSAT selects the central stock's rows, which have no branch
+    return column.is_(None) if cabang_id == branches.PUSAT else column == cabang_id
+
+def _archived_rows(table, month, date_from, date_to, produk_id=None, user_id=None, cabang_id=None):
+    # Archived months live in gzip files, not the database; see app/services/archive.py
+    time_attr = archive.ARCHIVE_TABLES[table].time_attr
+    rows = archive.read_month(table, month, produk_id=produk_id, user_id=user_id)
+    if cabang_id is not None:
+        wanted = branches.from_choice(cabang_id)
+        rows = [row for row in rows if getattr(row, 'cabang_id', None) == wanted]
+    if date_from:
+        rows = [row for row in rows if getattr(row, time_attr) >= date_from]
+    if date_to:
+        rows = [row for row in rows if getattr(row, time_attr) < date_to + timedelta(days=1)]
+    return rows
+
+def _selected_archive_month(*tables):
+    month = request.args.get('arsip')
+    if month and not any(month in archive.archived_months(table) for table in tables):
+        flash(f'Arsip bulan {month} tidak ditemukan.', 'error')
+        return None
+    return month
 
 @admin_bp.route('/transactions')
 @admin_required
+@read_replica
 def view_transactions():
-    incoming_transactions = TransaksiMasuk.query.order_by(TransaksiMasuk.tanggal_masuk.desc()).all()
-    outgoing_transactions = TransaksiKeluar.query.order_by(TransaksiKeluar.tanggal_keluar.desc()).all()
+    date_from = _parse_date_arg('dari')
+    date_to = _parse_date_arg('sampai')
+    produk_id = request.args.get('produk_id', type=int)
+    user_id = request.args.get('user_id', type=int)
+    username = request.args.get('pengguna', '').strip()
+    if username and user_id is None:
+        # One lookup on the unique username index instead of listing every user
+        user_id = db.session.query(User.id).filter(User.username == username).scalar()
+        if user_id is None:
+            flash(f'Pengguna tidak ditemukan: {username}', 'error')
+            user_id = 0  # no user has id 0, so the filters below match nothing
+    cabang_id = request.args.get('cabang_id', type=int)
+    archive_month = _selected_archive_month('transaksi_masuk', 'transaksi_keluar')
+
+    if archive_month:
+        incoming_page = keyset_slice(
+            _archived_rows('transaksi_masuk', archive_month, date_from, date_to, produk_id, user_id, cabang_id),
+            'tanggal_masuk', cursor=request.args.get('masuk'))
+        outgoing_page = keyset_slice(
+            _archived_rows('transaksi_keluar', archive_month, date_from, date_to, produk_id, user_id, cabang_id),
+            'tanggal_keluar', cursor=request.args.get('keluar'))
+    else:
+        incoming_page = keyset_paginate(
+            _filtered_transactions(TransaksiMasuk, TransaksiMasuk.tanggal_masuk, date_from, date_to, produk_id, user_id,
+                                   cabang_id),
+            TransaksiMasuk.tanggal_masuk, TransaksiMasuk.id,
+            cursor=request.args.get('masuk'))
+        outgoing_page = keyset_paginate(
+            _filtered_transactions(TransaksiKeluar, TransaksiKeluar.tanggal_keluar, date_from, date_to, produk_id, user_id,
+                                   cabang_id),
+            TransaksiKeluar.tanggal_keluar, TransaksiKeluar.id,
+            cursor=request.args.get('keluar'))
+
+    archive_months = sorted(set(archive.archived_months('transaksi_masuk')) |
+                            set(archive.archived_months('transaksi_keluar')), reverse=True)
+
+    # Keep the active filters in pagination links
+    filters = {key: request.args.get(key) for key in ('dari', 'sampai', 'produk_id', 'user_id', 'pengguna', 'cabang_id',
+                                                      'arsip')
+               if request.args.get(key)}
+
     return render_template('admin/view_transactions.html',
                            title='Lihat Semua Transaksi',
-                           incoming_transactions=incoming_transactions,
-                           outgoing_transactions=outgoing_transactions)
+                           incoming_transactions=incoming_page.items,
+                           outgoing_transactions=outgoing_page.items,
+                           incoming_page=incoming_page,
+                           outgoing_page=outgoing_page,
+                           archive_months=archive_months,
+                           branch_choices=branches.choices(),
+                           filters=filters)
 
 @admin_bp.route('/activity_log')
 @admin_required
+@read_replica
 def activity_log():
-    activities = RiwayatAktivitas.query.order_by(RiwayatAktivitas.timestamp.desc()).all()
-    return render_template('admin/activity_log.html', title='Console Aktivitas', activities=activities)
+    archive_month = _selected_archive_month('riwayat_aktivitas')
+    cabang_id = request.args.get('cabang_id', type=int)
+    if archive_month:
+        rows = archive.read_month('riwayat_aktivitas', archive_month)
+        if cabang_id is not None:
+            rows = [row for row in rows if getattr(row, 'cabang_id', None) == branches.from_choice(cabang_id)]
+        page = keyset_slice(rows, 'timestamp', cursor=request.args.get('cursor'))
+    else:
+        query = RiwayatAktivitas.query.options(db.joinedload(RiwayatAktivitas.user))
+        if cabang_id is not None:
+            query = query.filter(_branch_is(RiwayatAktivitas.cabang_id, cabang_id))
+        page = keyset_paginate(query, RiwayatAktivitas.timestamp, RiwayatAktivitas.id,
+                               cursor=request.args.get('cursor'))
+    return render_template('admin/activity_log.html', title='Console Aktivitas',
+                           activities=page.items, page=page,
+                           archive_month=archive_month,
+                           archive_months=archive.archived_months('riwayat_aktivitas'),
+                           cabang_id=cabang_id, branch_choices=branches.choices())
+
+@admin_bp.route('/reports')
+@admin_required
+@read_replica
+def sales_report():
+    default_from, default_to = sales.default_range()
+    date_from = _parse_date_arg('dari')
+    date_to = _parse_date_arg('sampai')
+    date_from = date_from.date() if date_from else default_from
+    date_to = date_to.date() if date_to else default_to
+    if date_from > date_to:
+        date_from, date_to = date_to, date_from
+    period = request.args.get('periode', 'hari')
+    if period not in sales.PERIODS:
+        period = 'hari'
+    order = 'unit' if request.args.get('urut') == 'unit' else 'omzet'
+    top = min(max(request.args.get('top', 10, type=int), 1), 100)
+    return render_template('admin/sales_report.html', title='Laporan Penjualan',
+                           date_from=date_from, date_to=date_to, period=period, order=order, top=top,
+                           totals=sales.totals(date_from, date_to),
+                           periods=sales.by_period(date_from, date_to, period),
+                           top_products=sales.top_products(date_from, date_to, top, order),
+                           categories=sales.by_category(date_from, date_to))
+
+@admin_bp.route('/export/<jenis>')
+@admin_required
+@read_replica
+def export_csv(jenis):
+    if jenis not in export.EXPORTS:
+        abort(404)
+    date_from = _parse_date_arg('dari', strict=True)
+    date_to = _parse_date_arg('sampai', strict=True)
+
+    # Built from the parsed dates, never from the raw query string
+    filename = export.EXPORTS[jenis].filename
+    if date_from or date_to:
+        filename += '_' + '_'.join(date.date().isoformat() for date in (date_from, date_to) if date)
+    if date_to:
+        date_to += timedelta(days=1)
+    # Streamed chunk by chunk; the export is never held in memory
+    return Response(stream_with_context(export.iter_csv(jenis, date_from, date_to)),
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}.csv'})
 
 @admin_bp.route('/my_activity')
 @admin_required
+@read_replica
 def my_activity():
     activities = RiwayatAktivitas.query.filter_by(user_id=current_user.id).order_by(RiwayatAktivitas.timestamp.desc()).all()
     return render_template('admin/my_activity.html', title='Riwayat Aktivitas Pribadi', activities=activities)
+
+@admin_bp.route('/stats')
+@admin_required
+def runtime_stats():
+    # Per-worker counters; each gunicorn worker reports its own numbers
+    return jsonify(catalog=catalog.stats(), users=user_cache.stats(), audit=audit.stats(), fragments=fragments.stats())
+
+@admin_bp.route('/stock/at')
+@admin_required
+@read_replica
+def stock_at():
+    # ?waktu=YYYY-MM-DDTHH:MM[:SS] (UTC), optional repeated ?produk_id=
+    try:
+        when = datetime.fromisoformat(request.args.get('waktu', ''))
+    except ValueError:
+        return jsonify(error='Parameter waktu wajib diisi (YYYY-MM-DDTHH:MM:SS).'), 400
+    produk_ids = request.args.getlist('produk_id', type=int) or None
+    result = snapshots.stock_at(when, produk_ids)
+    return jsonify(waktu=result.waktu.isoformat(), basis=result.basis,
+                   stok={str(produk_id): units for produk_id, units in sorted(result.stok.items())})
+
+@admin_bp.route('/stock/drift')
+@admin_required
+def stock_drift():
+    latest, drifts = snapshots.drift()
+    return jsonify(snapshot=latest.isoformat() if latest else None,
+                   drift=[item._asdict() for item in drifts])
+
+@admin_bp.route('/perf')
+@superadmin_required
+def perf():
+    # Per-worker numbers, like /admin/stats
+    return render_template('admin/perf.html', title='Statistik SQL per Endpoint',
+                           enabled=profiler.enabled(), endpoints=profiler.report(), pid=os.getpid())
+
+@admin_bp.route('/perf/reset', methods=['POST'])
+@superadmin_required
+def reset_perf():
+    profiler.reset()
+    flash('Statistik SQL telah direset.', 'message')
+    return redirect(url_for('admin.perf'))
@@ -0,0 +1,143 @@
+import functools
+import gzip
+import time
+from datetime import datetime, timezone
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user
+from app import db
+from app.models import Produk, TransaksiMasuk, TransaksiKeluar
+from app.pagination import keyset_paginate
+from app.services import branches, counters
+
+# Read-only JSON API for shop terminals and other pollers. Every response carries a weak
+# ETag and a Last-Modified built from the change counters in the ringkasan table, which
+# the write paths advance inside their own transactions (see counters.touch). The
+# counters are read with one small query before anything else, so an unchanged
+# resource answers 304 Not Modified without loading a single product or transaction row.
+# Bodies are gzip-compressed for clients that accept it.
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+API_ROLES = ('staf', 'admin', 'superadmin')
+MAX_TRANSACTIONS = 200
+
+def api_login_required(f):
+    """Like login_required, but answers JSON 401/403 instead of redirecting to the login page."""
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify(error='Login diperlukan.'), 401
+        if current_user.role not in API_ROLES:
+            return jsonify(error='Anda tidak memiliki izin untuk mengakses API ini.'), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def _not_modified(etag, last_modified):
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110, 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return last_modified is not None and request.if_modified_since is not None \
+        and last_modified <= request.if_modified_since
+
+def conditional(*names):
+    """Serve the view conditionally on the change counters `names`.
+
+    The view only runs when the client's validators are stale; it returns the JSON
+    payload (dict or list), optionally with a status code, which is then serialized,
+    compressed and stamped here. Error responses get no validators.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            versions = counters.read(*names)
+            etag = '-'.join(str(versions[nama]) for nama in names)
+            newest = max(versions.values())
+            # HTTP dates have whole seconds: only announce Last-Modified once that second
+            # is over, otherwise a second change within it would hide behind the same date
+            last_modified = None
+            if newest and newest // 1000000 < int(time.time()):
+                last_modified = datetime.fromtimestamp(newest // 1000000, timezone.utc)
+
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                payload = f(*args, **kwargs)
+                payload, status = payload if isinstance(payload, tuple) else (payload, 200)
+                response = jsonify(payload)
+                response.status_code = status
+                _compress(response)
+                if status != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Accept-Encoding')
+            return response
+        return decorated_function
+    return decorator
+
+def _compress(response):
+    if response.content_length is not None \
+            and response.content_length < current_app.config['API_GZIP_MIN_SIZE']:
+        return
+    if not request.accept_encodings['gzip']:
+        return
+    response.set_data(gzip.compress(response.get_data(), compresslevel=current_app.config['API_GZIP_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+
+def _product_json(product):
+    return {'id': product.id, 'nama': product.nama, 'harga': product.harga, 'stok': product.stok,
+            'kategori': product.kategori, 'gambar': product.gambar}
+
+@api_bp.route('/products')
+@api_login_required
+@conditional(counters.CHANGES_PRODUCTS)
+def list_products():
+    # Read from the database rather than the catalog cache: the ETag comes from the
+    # committed counter, and the cache of this worker may not have caught up yet
+    query = Produk.query
+    kategori = request.args.get('kategori')
+    if kategori:
+        query = query.filter(Produk.kategori == kategori)
+    return {'products': [_product_json(product) for product in query.order_by(Produk.nama, Produk.id)]}
+
+@api_bp.route('/products/<int:produk_id>')
+@api_login_required
+@conditional(counters.CHANGES_PRODUCTS)
+def get_product(produk_id):
+    product = db.session.get(Produk, produk_id)
+    if product is None:
+        return {'error': 'Produk tidak ditemukan.'}, 404
+    return _product_json(product)
+
+@api_bp.route('/stock')
+@api_login_required
+@conditional(counters.CHANGES_PRODUCTS)
+def stock_levels():
+    # ?cabang_id= for one branch's stock; without it, the central stock
+    cabang_id = request.args.get('cabang_id', type=int)
+    if cabang_id:
+        return {'cabang_id': cabang_id,
+                'stok': {str(produk_id): stok for produk_id, stok in sorted(branches.stock_levels(cabang_id).items())}}
+    return {'stok': {str(produk_id): stok for produk_id, stok in
+                     db.session.query(Produk.id, Produk.stok).order_by(Produk.id)}}
+
+@api_bp.route('/transactions')
+@api_login_required
+@conditional(counters.CHANGES_TRANSACTIONS, counters.CHANGES_PRODUCTS)
+def recent_transactions():
+    # ?jenis=keluar|masuk, ?limit=, ?cursor= (next_cursor of the previous page)
+    if request.args.get('jenis', 'keluar') == 'masuk':
+        model, time_column, time_key = TransaksiMasuk, TransaksiMasuk.tanggal_masuk, 'tanggal_masuk'
+    else:
+        model, time_column, time_key = TransaksiKeluar, TransaksiKeluar.tanggal_keluar, 'tanggal_keluar'
+    limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_TRANSACTIONS)
+    query = db.session.query(model.id, model.produk_id, Produk.nama, model.jumlah, model.user_id, time_column) \
+        .outerjoin(Produk, Produk.id == model.produk_id)
+    page = keyset_paginate(query, time_column, model.id, cursor=request.args.get('cursor'), per_page=limit)
+    return {'transactions': [{'id': row.id, 'produk_id': row.produk_id, 'nama': row.nama, 'jumlah': row.jumlah,
+                              'user_id': row.user_id, time_key: getattr(row, time_key).isoformat()}
+                             for row in page.items],
+            'next_cursor': page.next_cursor}
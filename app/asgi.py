@@ -0,0 +1,208 @@
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from flask import request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import greenlet_spawn
+from werkzeug.exceptions import HTTPException
+from app import db
+from app.services import profiler, replicas
+
+# ASGI serving mode (asgi.py, e.g. `uvicorn asgi:app --workers 2`). One event loop per
+# worker serves many requests at once:
+#
+#   * GET requests to the read-heavy views in ASYNC_ENDPOINTS run the unchanged Flask
+#     view inside a greenlet (sqlalchemy.util.greenlet_spawn, the mechanism behind
+#     AsyncSession.run_sync), with the session bound to async-driver engines (aiomysql,
+#     aiosqlite). While a query waits on the database the loop serves other requests,
+#     and a request waiting for a pooled connection waits without holding a thread.
+#   * Everything else (forms, checkout, login with its bcrypt check, exports) runs on a
+#     small thread pool with the ordinary engines, exactly as under gunicorn.
+#
+# The views only ever see db.session, so both modes share one code base. Code running
+# in the async views must not block on anything but the database: a slow call there
+# stalls every request of the worker.
+
+ASYNC_DRIVERS = {'mysql': 'aiomysql', 'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+ASYNC_ENDPOINTS = frozenset((
+    'staf.list_products', 'staf.search_products', 'staf.my_activity',
+    'admin.dashboard', 'admin.manage_users', 'admin.manage_products', 'admin.view_transactions', 'admin.activity_log',
+    'admin.my_activity', 'admin.sales_report',
+    'api.list_products', 'api.get_product', 'api.stock_levels', 'api.recent_transactions',
+))
+
+ENVIRON_KEY = 'konter.engine_map'
+MAX_MEMORY_BODY = 1024 * 1024  # request bodies above this are spooled to a temporary file
+_END = object()
+
+def async_url(url):
+    """`url` with its driver swapped for the asyncio driver of the same database."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver known for {backend}')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+def _environ(scope, body):
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    server = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'], environ['SERVER_PORT'] = server[0], str(server[1] or 80)
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+class AsgiApp:
+    """ASGI adapter around the Flask app: async-driver views on the loop, the rest on threads."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(max_workers=flask_app.config['ASGI_SYNC_THREADS'],
+                                           thread_name_prefix='asgi-sync')
+        self.async_engines = []
+        self._engine_map = None
+        # First, so no query of the request runs before the session is pointed at the async engines
+        flask_app.before_request_funcs.setdefault(None, []).insert(0, _use_async_engines)
+
+    def engine_map(self):
+        """Sync engine -> async-driver engine, created on first use (pools belong to the loop)."""
+        if self._engine_map is None:
+            config = self.flask_app.config
+            with self.flask_app.app_context():
+                engines = list(db.engines.values())
+            engine_map = {}
+            for engine in engines:
+                # A queue pool for every backend (aiosqlite defaults to NullPool), so the
+                # connections of a worker are bounded and waiting requests await one
+                async_engine = create_async_engine(async_url(engine.url), poolclass=AsyncAdaptedQueuePool,
+                                                   pool_size=config['ASGI_DB_POOL_SIZE'],
+                                                   max_overflow=config['ASGI_DB_MAX_OVERFLOW'])
+                profiler.watch(self.flask_app, async_engine.sync_engine)
+                self.async_engines.append(async_engine)
+                engine_map[engine] = async_engine.sync_engine
+            self._engine_map = engine_map
+        return self._engine_map
+
+    def is_async(self, environ):
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return False
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return False
+        return endpoint in ASYNC_ENDPOINTS
+
+    def call_wsgi(self, environ):
+        """Run the Flask app; returns (status, headers, body iterable)."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = headers
+            return lambda data: None
+
+        body = self.flask_app(environ, start_response)
+        return started['status'], started['headers'], body
+
+    def _call_in_greenlet(self, environ):
+        status, headers, body = self.call_wsgi(environ)
+        try:
+            return status, headers, [b''.join(body)]
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported ASGI scope {scope["type"]}')
+
+        body = await self._read_body(receive)
+        try:
+            await self._respond(_environ(scope, body), send)
+        finally:
+            body.close()
+
+    async def _respond(self, environ, send):
+        loop = asyncio.get_running_loop()
+        if self.is_async(environ):
+            environ[ENVIRON_KEY] = self.engine_map()
+            status, headers, chunks = await greenlet_spawn(self._call_in_greenlet, environ)
+            await self._send_start(send, status, headers)
+            await send({'type': 'http.response.body', 'body': chunks[0]})
+            return
+
+        status, headers, chunks = await loop.run_in_executor(self.executor, self.call_wsgi, environ)
+        await self._send_start(send, status, headers)
+        iterator = iter(chunks)
+        try:
+            # Streamed responses (CSV export) are pulled chunk by chunk on the pool
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, iterator, _END)
+                if chunk is _END:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(chunks, 'close'):
+                await loop.run_in_executor(self.executor, chunks.close)
+
+    async def _read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORY_BODY)
+        while True:
+            message = await receive()
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+    async def _send_start(self, send, status, headers):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for async_engine in self.async_engines:
+                    await async_engine.dispose()
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+def _use_async_engines():
+    engine_map = request.environ.get(ENVIRON_KEY)
+    if engine_map is not None:
+        db.session.info[replicas.ENGINE_MAP] = engine_map
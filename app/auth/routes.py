@@ -4,10 +4,10 @@ from flask_login import login_user, logout_user, current_user, login_required
 from app import db
 from app.auth.forms import LoginForm, RegistrationForm, OTPVerificationForm
 from app.models import User
-import pyotp
-import qrcode
-import io
-import base64
+from app.services import counters, throttle, user_cache
+
+# pyotp and qrcode (which pulls in PIL) are imported inside the 2FA views: only a few
+# requests need them, and importing them at startup slows every worker boot
 
 auth_bp = Blueprint('auth', __name__, template_folder='templates')
 
@@ -35,6 +35,7 @@ def register():
         user.set_password(form.password.data)
 
         db.session.add(user)
+        counters.bump(counters.TOTAL_USERS)
         db.session.commit()
 
         flash(f'Registrasi berhasil! Akun Anda terdaftar sebagai {role}. Silakan login.')
@@ -52,6 +53,12 @@ def login():
     LOCKOUT_DURATION_MINUTES = 30
 
     if form.validate_on_submit():
+        # Cheap first line of defence: no user lookup, bcrypt or DB write while throttled
+        wait = throttle.retry_after(form.username.data, request.remote_addr)
+        if wait:
+            flash(f'Terlalu banyak percobaan login. Coba lagi dalam {max(1, wait // 60)} menit.', 'error')
+            return redirect(url_for('auth.login'))
+
         user = User.query.filter_by(username=form.username.data).first()
 
         if user:
@@ -62,9 +69,13 @@ def login():
                 return redirect(url_for('auth.login'))
 
             if user.check_password(form.password.data):
+                throttle.reset(user.username)
                 # Successful login: reset failed attempts and lockout
                 user.failed_login_attempts = 0
                 user.lockout_until = None
+                if user.password_needs_rehash():
+                    # Work factor changed since this hash was made; upgrade it while we have the plaintext
+                    user.set_password(form.password.data)
                 db.session.commit()
 
                 session['temp_user_id'] = user.id
@@ -86,9 +97,11 @@ def login():
                     return redirect(next_page)
             else:
                 # Failed password: increment failed attempts
+                throttle.record_failure(form.username.data, request.remote_addr)
                 user.failed_login_attempts += 1
                 if user.failed_login_attempts >= MAX_FAILED_ATTEMPTS:
                     user.lockout_until = datetime.utcnow() + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
+                    user_cache.invalidate()
                     flash(f'Terlalu banyak percobaan login gagal. Akun Anda telah dikunci selama {LOCKOUT_DURATION_MINUTES} menit.', 'error')
                 else:
                     flash('Username atau password tidak valid.', 'error')
@@ -96,6 +109,7 @@ def login():
                 return redirect(url_for('auth.login'))
         else:
             # User not found: provide generic error
+            throttle.record_failure(form.username.data, request.remote_addr)
             flash('Username atau password tidak valid.', 'error')
             return redirect(url_for('auth.login'))
     return render_template('auth/login.html', title='Sign In', form=form)
@@ -129,6 +143,12 @@ def verify_2fa_login():
 
     form = OTPVerificationForm()
     if form.validate_on_submit():
+        wait = throttle.retry_after(user.username, request.remote_addr)
+        if wait:
+            flash(f'Terlalu banyak percobaan. Coba lagi dalam {max(1, wait // 60)} menit.', 'error')
+            return render_template('auth/verify_2fa_login.html', title='Verifikasi 2FA', form=form)
+
+        import pyotp
         totp = pyotp.TOTP(user.otp_secret)
         if totp.verify(form.otp_code.data):
             # Successful 2FA verification: reset failed attempts and lockout
@@ -152,12 +172,14 @@ def verify_2fa_login():
             return redirect(next_page)
         else:
             # Failed OTP: increment failed attempts
+            throttle.record_failure(user.username, request.remote_addr)
             MAX_FAILED_ATTEMPTS = 5 # Use same constants as login
             LOCKOUT_DURATION_MINUTES = 30 # Use same constants as login
 
             user.failed_login_attempts += 1
             if user.failed_login_attempts >= MAX_FAILED_ATTEMPTS:
                 user.lockout_until = datetime.utcnow() + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
+                user_cache.invalidate()
                 flash(f'Kode OTP tidak valid dan terlalu banyak percobaan. Akun Anda telah dikunci selama {LOCKOUT_DURATION_MINUTES} menit.', 'error')
                 session.pop('temp_user_id', None) # Clear session to prevent further 2FA attempts
             else:
@@ -174,6 +196,11 @@ def setup_2fa():
         flash('2FA sudah diaktifkan.', 'message')
         return redirect(url_for('main.index'))
 
+    import base64
+    import io
+    import pyotp
+    import qrcode
+
     # Generate a random secret for the user
     secret = pyotp.random_base32()
     session['otp_secret'] = secret # Store secret in session temporarily
@@ -211,10 +238,14 @@ def verify_2fa_setup():
 
     form = OTPVerificationForm()
     if form.validate_on_submit():
+        import pyotp
         totp = pyotp.TOTP(secret)
         if totp.verify(form.otp_code.data):
-            current_user.otp_secret = secret
-            current_user.otp_enabled = True
+            # current_user is a read-only cached snapshot; update the real row
+            user = db.session.get(User, current_user.id)
+            user.otp_secret = secret
+            user.otp_enabled = True
+            user_cache.invalidate()
             db.session.commit()
             session.pop('otp_secret', None) # Clear secret from session
             flash('2FA berhasil diaktifkan!', 'message')
@@ -0,0 +1,628 @@
+"""`flask bench`: performance benchmarks against scratch databases.
+
+Kept out of app/cli.py so the operational commands load without it; app/cli.py
+registers the group lazily and this module is imported only when `flask bench` runs.
+"""
+import click
+import os
+from flask.cli import with_appcontext
+from app import db
+from app.models import User, Produk
+
+@click.group()
+def bench():
+    """Run performance benchmarks against a scratch database."""
+    pass
+
+def _scratch_engine(database_url):
+    """Return (engine, cleanup) for the benchmark database; a temporary SQLite file by default."""
+    import shutil
+    import tempfile
+    from sqlalchemy import create_engine
+
+    if database_url:
+        return create_engine(database_url, pool_size=32), lambda: None
+    tmpdir = tempfile.mkdtemp(prefix='konter-bench-')
+    engine = create_engine('sqlite:///' + os.path.join(tmpdir, 'bench.db'),
+                           connect_args={'timeout': 30, 'check_same_thread': False})
+    return engine, lambda: shutil.rmtree(tmpdir, ignore_errors=True)
+
+def _run_sales(engine, produk_id, workers, attempts, sell_once):
+    """Run `attempts` single-unit sales on each of `workers` threads. Returns (sold, errors, elapsed)."""
+    import threading
+    import time
+    from sqlalchemy.orm import sessionmaker
+
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    sold = []
+    errors = []
+
+    def worker():
+        session = Session()
+        ok = failed = 0
+        for _ in range(attempts):
+            try:
+                if sell_once(session, produk_id):
+                    ok += 1
+                session.commit()
+            except Exception:
+                session.rollback()
+                failed += 1
+        session.close()
+        sold.append(ok)
+        errors.append(failed)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(sold), sum(errors), time.perf_counter() - start
+
+def _sell_read_modify_write(session, produk_id):
+    # The pre-existing route logic: read in Python, check, write back
+    product = session.get(Produk, produk_id, populate_existing=True)
+    if product.stok >= 1:
+        product.stok -= 1
+        return True
+    return False
+
+def _sell_atomic(session, produk_id):
+    from app.services.stock import decrement_stock
+    return decrement_stock(produk_id, 1, session=session) == 1
+
+@bench.command('stock')
+@click.option('--workers', default=8, show_default=True, help='Concurrent cashier threads.')
+@click.option('--attempts', default=100, show_default=True, help='Single-unit sales attempted per worker.')
+@click.option('--initial-stock', default=500, show_default=True, help='Units available before the run.')
+@click.option('--database-url', default=None, help='Scratch database URL (default: temporary SQLite file).')
+def stock_bench(workers, attempts, initial_stock, database_url):
+    """Compare read-modify-write selling against the atomic stock service under contention."""
+    engine, cleanup = _scratch_engine(database_url)
+    try:
+        Produk.__table__.create(engine, checkfirst=True)
+        for label, sell_once in (('read-modify-write', _sell_read_modify_write), ('atomic', _sell_atomic)):
+            with engine.begin() as conn:
+                produk_id = conn.execute(
+                    Produk.__table__.insert().values(nama='bench-stock', harga=1, stok=initial_stock)
+                ).inserted_primary_key[0]
+
+            sold, errors, elapsed = _run_sales(engine, produk_id, workers, attempts, sell_once)
+
+            with engine.begin() as conn:
+                final_stock = conn.execute(
+                    db.select(Produk.__table__.c.stok).where(Produk.__table__.c.id == produk_id)
+                ).scalar_one()
+                conn.execute(Produk.__table__.delete().where(Produk.__table__.c.id == produk_id))
+
+            expected = initial_stock - sold
+            status = 'OK' if final_stock == expected and final_stock >= 0 else 'INCONSISTENT'
+            click.echo(f'{label:>18}: sold={sold} errors={errors} final_stock={final_stock} '
+                       f'expected={expected} [{status}] {sold / elapsed:,.0f} sales/sec, '
+                       f'{workers * attempts / elapsed:,.0f} attempts/sec')
+    finally:
+        engine.dispose()
+        cleanup()
+
+@bench.command('login')
+@click.option('--costs', default='8,10,12', show_default=True, help='Comma-separated bcrypt work factors to measure.')
+@click.option('--concurrency', default=8, show_default=True, help='Simultaneous login requests (request threads).')
+@click.option('--logins', default=32, show_default=True, help='Password checks per cost and mode.')
+@with_appcontext
+def login_bench(costs, concurrency, logins):
+    """Measure password checks/sec per worker: one request at a time vs concurrent threads capped at PASSWORD_HASH_THREADS."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from flask import current_app
+    from app import bcrypt as flask_bcrypt
+    from app.services import passwords
+
+    app = current_app._get_current_object()
+    slots = app.config.get('PASSWORD_HASH_THREADS', 4)
+    click.echo(f'{logins} checks per run, {concurrency} concurrent requests, at most {slots} hashing at once')
+    for cost in (int(c) for c in costs.split(',')):
+        password_hash = flask_bcrypt.generate_password_hash('bench-password', cost).decode('utf-8')
+
+        # A default sync worker handles one request at a time
+        start = time.perf_counter()
+        for _ in range(logins):
+            flask_bcrypt.check_password_hash(password_hash, 'bench-password')
+        inline_rate = logins / (time.perf_counter() - start)
+
+        # A gthread worker: request threads hash concurrently, up to the slot limit
+        def one_login(_):
+            with app.app_context():
+                return passwords.check_password(password_hash, 'bench-password')
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as requests:
+            assert all(requests.map(one_login, range(logins)))
+        capped_rate = logins / (time.perf_counter() - start)
+
+        click.echo(f'cost={cost:>2}: inline {inline_rate:8.1f} logins/sec   concurrent {capped_rate:8.1f} logins/sec')
+
+def _current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, falling back to the peak from getrusage)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+@bench.command('export')
+@click.option('--rows', 'row_counts', default='1000,100000', show_default=True,
+              help='Comma-separated row counts to export.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows fetched per server-side cursor batch.')
+def export_bench(row_counts, batch_size):
+    """Measure streaming CSV export throughput and peak RSS on a scratch SQLite database."""
+    import shutil
+    import tempfile
+    import time
+    from datetime import datetime, timedelta
+    from config import Config
+    from app import create_app
+    from app.models import TransaksiKeluar
+    from app.services import export
+
+    for count in (int(c) for c in row_counts.split(',')):
+        tmpdir = tempfile.mkdtemp(prefix='konter-bench-')
+
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmpdir, 'bench.db')
+            AUDIT_LOG_MODE = 'sync'
+
+        bench_app = create_app(BenchConfig)
+        try:
+            with bench_app.app_context():
+                db.create_all()
+                db.session.execute(db.insert(User), [{'username': 'bench', 'password': '-', 'role': 'staf'}])
+                db.session.execute(db.insert(Produk), [{'nama': f'Produk {i}', 'harga': 1000 + i, 'stok': 0}
+                                                       for i in range(1, 101)])
+                start_time = datetime(2025, 1, 1)
+                for offset in range(0, count, 10000):
+                    db.session.execute(db.insert(TransaksiKeluar), [
+                        {'produk_id': 1 + i % 100, 'jumlah': 1 + i % 5, 'user_id': 1,
+                         'tanggal_keluar': start_time + timedelta(seconds=i * 30)}
+                        for i in range(offset, min(offset + 10000, count))])
+                db.session.commit()
+
+                baseline = peak = _current_rss_mb()
+                written = 0
+                start = time.perf_counter()
+                for chunk in export.iter_csv('keluar', batch_size=batch_size):
+                    written += chunk.count('\n')
+                    peak = max(peak, _current_rss_mb())
+                elapsed = time.perf_counter() - start
+                db.session.remove()
+            click.echo(f'{count:>10,} rows: {(written - 1) / elapsed:12,.0f} rows/sec  '
+                       f'peak RSS {peak:7.1f} MB (+{peak - baseline:.1f} MB during export)')
+        finally:
+            with bench_app.app_context():
+                db.engine.dispose()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+# Views that need sample URL arguments, and extra query strings worth timing on their own
+VIEW_BENCH_ARGS = {'product_id': 'product_id', 'jenis': 'keluar'}
+VIEW_BENCH_EXTRA = [
+    ('staf.list_products', {'q': 'samsung'}),
+    ('staf.search_products', {'q': 'case'}),
+    ('admin.view_transactions', {'produk_id': 'product_id'}),
+    ('admin.view_transactions', {'dari': 'month_ago'}),
+]
+# Ends the benchmark session; the POST-only views are skipped as well
+VIEW_BENCH_SKIP = {'auth.logout'}
+# auth views are requested anonymously, except these which need a logged-in user
+VIEW_BENCH_LOGGED_IN = {'auth.setup_2fa': 'staf', 'auth.verify_2fa_setup': 'staf'}
+
+def _view_cases(app, sample):
+    """(endpoint, path, client) for every GET view of the admin, staf and auth blueprints."""
+    from flask import url_for
+
+    def resolve(values):
+        return {key: sample.get(value, value) for key, value in values.items()}
+
+    rules = sorted(app.url_map.iter_rules(), key=lambda rule: rule.endpoint)
+    with app.test_request_context():
+        cases = []
+        for rule in rules:
+            blueprint = rule.endpoint.split('.')[0]
+            if blueprint not in ('admin', 'staf', 'auth') or 'GET' not in rule.methods \
+                    or rule.endpoint in VIEW_BENCH_SKIP:
+                continue
+            path = url_for(rule.endpoint, **resolve({arg: VIEW_BENCH_ARGS[arg] for arg in rule.arguments}))
+            cases.append((rule.endpoint, path, VIEW_BENCH_LOGGED_IN.get(rule.endpoint, blueprint)))
+        for endpoint, params in VIEW_BENCH_EXTRA:
+            cases.append((endpoint, url_for(endpoint, **resolve(params)), endpoint.split('.')[0]))
+    return cases
+
+@bench.command('views')
+@click.option('--scales', default='10000,100000,1000000', show_default=True,
+              help='Comma-separated history sizes (outgoing transactions and activity entries).')
+@click.option('--repeat', default=5, show_default=True, help='Timed requests per view (after one warm-up request).')
+@click.option('--output', default='bench-views.json', show_default=True, type=click.Path(dir_okay=False),
+              help='Where to write the JSON report.')
+@click.option('--baseline', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='Earlier report to compare against; regressions make the command fail.')
+@click.option('--max-slowdown', default=1.5, show_default=True,
+              help='Allowed median time ratio against --baseline before a view counts as regressed.')
+@click.option('--min-slowdown-ms', default=5.0, show_default=True,
+              help='Ignore slowdowns smaller than this many milliseconds (timer noise on fast views).')
+@click.option('--database-url', default=None,
+              help='Empty scratch database to run against (default: a temporary SQLite file per scale).')
+def views_bench(scales, repeat, output, baseline, max_slowdown, min_slowdown_ms, database_url):
+    """Time every admin, staf and auth view at several data scales and count their SQL statements."""
+    import json
+    import platform
+    import shutil
+    import statistics
+    import tempfile
+    import time
+    from datetime import datetime, timedelta
+    from sqlalchemy import event
+    from config import Config
+    from app import create_app
+    from app.services import synthetic as generator
+
+    report = {'generated_at': datetime.utcnow().isoformat(timespec='seconds'), 'python': platform.python_version(),
+              'repeat': repeat, 'scales': {}}
+    for scale in (int(s) for s in scales.split(',')):
+        tmpdir = tempfile.mkdtemp(prefix='konter-bench-')
+
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = database_url or 'sqlite:///' + os.path.join(tmpdir, 'bench.db')
+            WTF_CSRF_ENABLED = False
+            AUDIT_LOG_MODE = 'sync'
+            BCRYPT_LOG_ROUNDS = 4
+            CATALOG_VERSION_FILE = os.path.join(tmpdir, 'catalog.version')
+            USER_CACHE_VERSION_FILE = os.path.join(tmpdir, 'user.version')
+            LOGIN_THROTTLE_FILE = os.path.join(tmpdir, 'throttle.sqlite')
+            ARCHIVE_DIR = os.path.join(tmpdir, 'archive')
+
+        bench_app = create_app(BenchConfig)
+        try:
+            with bench_app.app_context():
+                db.create_all()
+                for username, role in (('bench-admin', 'superadmin'), ('bench-staf', 'staf')):
+                    user = User(username=username, role=role)
+                    user.set_password('bench')
+                    db.session.add(user)
+                db.session.commit()
+                start = time.perf_counter()
+                data = generator.generate(users=max(20, scale // 5000), products=min(5000, max(100, scale // 100)),
+                                          outgoing=scale, activities=scale, seed=scale).as_dict()
+                data['seconds'] = round(time.perf_counter() - start, 1)
+                sample = {'product_id': db.session.query(db.func.min(Produk.id)).scalar(),
+                          'month_ago': (datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%d')}
+                db.session.remove()
+                click.echo(f'scale {scale:,}: generated {data}')
+
+                statements = []
+                event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(1))
+
+            clients = {'auth': bench_app.test_client()}
+            for blueprint, username in (('admin', 'bench-admin'), ('staf', 'bench-staf')):
+                clients[blueprint] = bench_app.test_client()
+                clients[blueprint].post('/login', data={'username': username, 'password': 'bench'})
+
+            results = {}
+            for endpoint, path, blueprint in _view_cases(bench_app, sample):
+                client = clients[blueprint]
+                client.get(path).get_data()
+                timings = []
+                counts = []
+                for _ in range(repeat):
+                    statements.clear()
+                    begin = time.perf_counter()
+                    response = client.get(path)
+                    body = response.get_data()
+                    timings.append((time.perf_counter() - begin) * 1000)
+                    counts.append(len(statements))
+                key = endpoint if endpoint not in results else path
+                results[key] = {'path': path, 'status': response.status_code, 'bytes': len(body),
+                                'median_ms': round(statistics.median(timings), 2), 'min_ms': round(min(timings), 2),
+                                'max_ms': round(max(timings), 2), 'statements': max(counts)}
+                click.echo(f'  {key:<45} {response.status_code} {results[key]["median_ms"]:10.2f} ms '
+                           f'{results[key]["statements"]:4d} statements')
+            report['scales'][str(scale)] = {'data': data, 'views': results}
+        finally:
+            with bench_app.app_context():
+                if database_url:
+                    db.drop_all()
+                db.engine.dispose()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    click.echo(f'Report written to {output}')
+
+    if baseline:
+        with open(baseline) as f:
+            previous = json.load(f)['scales']
+        regressions = []
+        for scale, current in report['scales'].items():
+            for key, view in current['views'].items():
+                before = previous.get(scale, {}).get('views', {}).get(key)
+                if before is None:
+                    continue
+                if view['statements'] > before['statements']:
+                    regressions.append(f'{scale} {key}: {before["statements"]} -> {view["statements"]} statements')
+                if view['median_ms'] > before['median_ms'] * max_slowdown \
+                        and view['median_ms'] - before['median_ms'] >= min_slowdown_ms:
+                    regressions.append(f'{scale} {key}: {before["median_ms"]} -> {view["median_ms"]} ms')
+        if regressions:
+            for regression in regressions:
+                click.echo(f'  REGRESSION {regression}', err=True)
+            raise click.ClickException(f'{len(regressions)} regression(s) against {baseline}.')
+        click.echo(f'No regressions against {baseline}.')
+
+def _connection_gauge(engine):
+    """Track the connections `engine` has checked out: returns a dict with 'open' and 'peak'."""
+    import threading
+    from sqlalchemy import event
+
+    gauge = {'open': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def checkout(*args):
+        with lock:
+            gauge['open'] += 1
+            gauge['peak'] = max(gauge['peak'], gauge['open'])
+
+    def checkin(*args):
+        with lock:
+            gauge['open'] -= 1
+
+    event.listen(engine, 'checkout', checkout)
+    event.listen(engine, 'checkin', checkin)
+    return gauge
+
+def _latency_summary(label, timings, elapsed, in_flight, connections):
+    import statistics
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if timings else 0
+    click.echo(f'{label:<34} {len(timings) / elapsed:8.1f} req/s  p50 {statistics.median(timings):7.1f} ms  '
+               f'p95 {p95:7.1f} ms  {in_flight:4d} in flight  {connections:3d} DB connections')
+    return {'requests_per_sec': round(len(timings) / elapsed, 1), 'p50_ms': round(statistics.median(timings), 1),
+            'p95_ms': round(p95, 1), 'in_flight': in_flight, 'db_connections': connections}
+
+@bench.command('asgi')
+@click.option('--concurrency', default=50, show_default=True, help='Simultaneous clients, each sending requests back to back.')
+@click.option('--requests', 'total', default=1000, show_default=True, help='Requests per mode.')
+@click.option('--threads', default=4, show_default=True, help='Request threads of the sync (gunicorn gthread) worker.')
+@click.option('--db-latency-ms', default=5.0, show_default=True,
+              help='Simulated network round trip added to every statement (0 for none; a local SQLite file has none).')
+@click.option('--paths', default='/staf/products,/admin/transactions,/admin/activity_log,/api/v1/products',
+              show_default=True, help='Comma-separated read-only pages requested in turn.')
+@click.option('--database-url', default=None,
+              help='Empty scratch database to run against (default: a temporary SQLite file).')
+def asgi_bench(concurrency, total, threads, db_latency_ms, paths, database_url):
+    """Compare one sync worker with one ASGI worker on the read-heavy pages."""
+    import asyncio
+    import shutil
+    import tempfile
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy import event
+    from sqlalchemy.util import await_only
+    from werkzeug.test import EnvironBuilder, run_wsgi_app
+    from config import Config
+    from app import create_app
+    from app.asgi import AsgiApp
+    from app.services import synthetic as generator
+
+    paths = [path.strip() for path in paths.split(',') if path.strip()]
+    latency = db_latency_ms / 1000
+    tmpdir = tempfile.mkdtemp(prefix='konter-bench-')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url or 'sqlite:///' + os.path.join(tmpdir, 'bench.db')
+        AUDIT_LOG_MODE = 'sync'
+        BCRYPT_LOG_ROUNDS = 4
+        CATALOG_VERSION_FILE = os.path.join(tmpdir, 'catalog.version')
+        USER_CACHE_VERSION_FILE = os.path.join(tmpdir, 'user.version')
+        LOGIN_THROTTLE_FILE = os.path.join(tmpdir, 'throttle.sqlite')
+        ARCHIVE_DIR = os.path.join(tmpdir, 'archive')
+        FRAGMENT_CACHE_MAX_BYTES = 0  # measure the database path, not the fragment cache
+        WTF_CSRF_ENABLED = False
+        # gunicorn's gthread worker needs a connection per request thread
+        DATABASE_POOL_SIZE = threads
+        DATABASE_MAX_OVERFLOW = 0
+
+    bench_app = create_app(BenchConfig)
+    asgi_app = AsgiApp(bench_app)
+    try:
+        with bench_app.app_context():
+            db.create_all()
+            user = User(username='bench-admin', role='superadmin')
+            user.set_password('bench')
+            db.session.add(user)
+            db.session.commit()
+            generator.generate(users=20, products=500, outgoing=20000, activities=20000, seed=1)
+            db.session.remove()
+            sync_gauge = _connection_gauge(db.engine)
+            if latency:
+                event.listen(db.engine, 'before_cursor_execute', lambda *args: time.sleep(latency))
+
+        client = bench_app.test_client()
+        client.post('/login', data={'username': 'bench-admin', 'password': 'bench'})
+        cookie = f'session={client.get_cookie("session").value}'
+        click.echo(f'{total} requests per mode, {concurrency} clients, {db_latency_ms} ms per statement; '
+                   f'pages: {", ".join(paths)}')
+        report = {}
+
+        # Sync worker: `threads` request threads, each holding a pooled connection while it works
+        worker = ThreadPoolExecutor(max_workers=threads)
+        state = {'sent': 0, 'in_flight': 0, 'peak': 0}
+        lock = threading.Lock()
+        timings = []
+
+        def serve(path):
+            with lock:
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+            try:
+                environ = EnvironBuilder(path=path, headers={'Cookie': cookie}).get_environ()
+                app_iter, status, headers = run_wsgi_app(bench_app, environ, buffered=True)
+                assert status.startswith('200'), (path, status)
+            finally:
+                with lock:
+                    state['in_flight'] -= 1
+
+        def sync_client():
+            while True:
+                with lock:
+                    if state['sent'] >= total:
+                        return
+                    path = paths[state['sent'] % len(paths)]
+                    state['sent'] += 1
+                begin = time.perf_counter()
+                worker.submit(serve, path).result()
+                timings.append((time.perf_counter() - begin) * 1000)
+
+        start = time.perf_counter()
+        clients = [threading.Thread(target=sync_client) for _ in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        report['sync'] = _latency_summary(f'sync worker ({threads} threads)', timings,
+                                          time.perf_counter() - start, state['peak'], sync_gauge['peak'])
+        worker.shutdown()
+
+        # ASGI worker: one event loop, the async engine's pool shared by all requests
+        async def run_async():
+            engine = next(iter(asgi_app.engine_map().values()))
+            gauge = _connection_gauge(engine)
+            if latency:
+                event.listen(engine, 'before_cursor_execute', lambda *args: await_only(asyncio.sleep(latency)))
+            async_state = {'sent': 0, 'in_flight': 0, 'peak': 0}
+            async_timings = []
+
+            async def asgi_client():
+                while async_state['sent'] < total:
+                    path = paths[async_state['sent'] % len(paths)]
+                    async_state['sent'] += 1
+                    path, _, query = path.partition('?')
+                    scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+                             'path': path, 'query_string': query.encode(), 'root_path': '',
+                             'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                             'server': ('localhost', 80), 'client': ('127.0.0.1', 0)}
+                    messages = []
+
+                    async def receive():
+                        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+                    async def send(message):
+                        messages.append(message)
+
+                    begin = time.perf_counter()
+                    async_state['in_flight'] += 1
+                    async_state['peak'] = max(async_state['peak'], async_state['in_flight'])
+                    try:
+                        await asgi_app(scope, receive, send)
+                    finally:
+                        async_state['in_flight'] -= 1
+                    assert messages[0]['status'] == 200, (path, messages[0]['status'])
+                    async_timings.append((time.perf_counter() - begin) * 1000)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(asgi_client() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            for async_engine in asgi_app.async_engines:
+                await async_engine.dispose()
+            return async_timings, elapsed, async_state['peak'], gauge['peak']
+
+        async_timings, elapsed, peak, connections = asyncio.run(run_async())
+        pool = bench_app.config['ASGI_DB_POOL_SIZE'] + bench_app.config['ASGI_DB_MAX_OVERFLOW']
+        report['asgi'] = _latency_summary(f'ASGI worker (pool of {pool})', async_timings, elapsed, peak, connections)
+
+        ratio = report['asgi']['requests_per_sec'] / report['sync']['requests_per_sec']
+        workers_needed = -(-concurrency // threads)
+        click.echo(f'ASGI serves {ratio:.1f}x the requests per worker. To keep {concurrency} requests in flight, '
+                   f'sync mode needs {workers_needed} workers and {workers_needed * threads} DB connections; '
+                   f'ASGI mode needs 1 worker and {connections}.')
+    finally:
+        asgi_app.executor.shutdown()
+        with bench_app.app_context():
+            if database_url:
+                db.drop_all()
+            db.engine.dispose()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+# Modules a worker must not import while booting; the views that need them import them
+STARTUP_LAZY_MODULES = ('pyotp', 'qrcode', 'PIL', 'sqlalchemy.ext.asyncio', 'aiomysql', 'aiosqlite', 'uvicorn',
+                        'app.bench')
+
+# Runs in a fresh interpreter, like a gunicorn worker importing run:app
+STARTUP_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import run
+booted = time.perf_counter()
+from app import db
+with run.app.app_context():
+    connections = sum(engine.pool.checkedout() + engine.pool.checkedin() for engine in db.engines.values())
+print(json.dumps({'boot_ms': (booted - start) * 1000, 'connections': connections,
+                  'modules': sorted(name for name in %r if name in sys.modules)}))
+'''
+
+@bench.command('startup')
+@click.option('--repeat', default=5, show_default=True, help='Cold starts to measure; the median is reported.')
+@click.option('--output', default='bench-startup.json', show_default=True, type=click.Path(dir_okay=False),
+              help='Where to write the JSON report.')
+@click.option('--baseline', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='Earlier report to compare against; a slower cold start makes the command fail.')
+@click.option('--max-slowdown', default=1.3, show_default=True, help='Allowed boot time ratio against --baseline.')
+@click.option('--min-slowdown-ms', default=50.0, show_default=True,
+              help='Ignore slowdowns smaller than this many milliseconds (noise).')
+def startup_bench(repeat, output, baseline, max_slowdown, min_slowdown_ms):
+    """Time a worker's cold start (importing run.py in a fresh interpreter) and check it stays lean.
+
+    Fails when the boot opens a database connection, imports one of STARTUP_LAZY_MODULES
+    or, with --baseline, got slower than allowed.
+    """
+    import json
+    import platform
+    import statistics
+    import subprocess
+    import sys
+    from datetime import datetime
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', STARTUP_PROBE % (STARTUP_LAZY_MODULES,)], cwd=root,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise click.ClickException(f'Cold start failed:\n{result.stderr}')
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    boot_ms = statistics.median(sample['boot_ms'] for sample in samples)
+    report = {'generated_at': datetime.utcnow().isoformat(timespec='seconds'), 'python': platform.python_version(),
+              'repeat': repeat, 'boot_ms': round(boot_ms, 1),
+              'min_boot_ms': round(min(sample['boot_ms'] for sample in samples), 1),
+              'connections': max(sample['connections'] for sample in samples),
+              'eager_modules': sorted({name for sample in samples for name in sample['modules']})}
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    click.echo(f'Cold start: {report["boot_ms"]:.1f} ms median (min {report["min_boot_ms"]:.1f} ms) over {repeat} runs, '
+               f'{report["connections"]} DB connections. Report written to {output}')
+
+    problems = []
+    if report['connections']:
+        problems.append(f'startup opened {report["connections"]} database connection(s)')
+    if report['eager_modules']:
+        problems.append(f'startup imported {", ".join(report["eager_modules"])}')
+    if baseline:
+        with open(baseline) as f:
+            before = json.load(f)['boot_ms']
+        if boot_ms > before * max_slowdown and boot_ms - before >= min_slowdown_ms:
+            problems.append(f'cold start {before:.1f} -> {boot_ms:.1f} ms')
+        else:
+            click.echo(f'No regression against {baseline} ({before:.1f} ms).')
+    if problems:
+        for problem in problems:
+            click.echo(f'  REGRESSION {problem}', err=True)
+        raise click.ClickException(f'{len(problems)} startup regression(s).')
@@ -2,7 +2,8 @@ import click
 import os
 from flask.cli import with_appcontext
 from app import db
-from app.models import User
+from app.models import User, Produk
+from app.services import archive, counters
 
 @click.group()
 def seed():
@@ -27,5 +28,325 @@ def superadmin():
     user = User(username='superadmin', role='superadmin')
     user.set_password(superadmin_password)
     db.session.add(user)
+    counters.bump(counters.TOTAL_USERS)
     db.session.commit()
     click.echo('Superadmin user created successfully!')
+
+@seed.command()
+@click.option('--verify', is_flag=True, help='Only compare stored counters with the source tables; do not write.')
+@with_appcontext
+def rollups(verify):
+    """Rebuild the dashboard counters from the source tables."""
+    stored = counters.read_all()
+    actual = counters.compute_from_tables()
+    mismatched = [nama for nama in counters.COUNTERS if stored[nama] != actual[nama]]
+    for nama in counters.COUNTERS:
+        marker = '' if stored[nama] == actual[nama] else '  <-- mismatch'
+        click.echo(f'{nama}: stored={stored[nama]} actual={actual[nama]}{marker}')
+
+    if verify:
+        if mismatched:
+            raise click.ClickException(f'{len(mismatched)} counter(s) out of sync. Run without --verify to rebuild.')
+        click.echo('All counters are in sync.')
+        return
+
+    counters.rebuild(actual)
+    db.session.commit()
+    click.echo('Counters rebuilt.')
+
+@seed.command()
+@click.option('--users', default=50, show_default=True, help='Users to create (admin, staf and pending).')
+@click.option('--products', default=1000, show_default=True, help='Products to create.')
+@click.option('--transactions', 'outgoing', default=100000, show_default=True, help='Outgoing transactions (sales).')
+@click.option('--incoming', default=None, type=int, help='Incoming receipts. Default: a tenth of --transactions.')
+@click.option('--activities', default=None, type=int, help='Activity log entries. Default: one per transaction.')
+@click.option('--days', default=365, show_default=True, help='Spread history over this many days up to today.')
+@click.option('--password', default='password', show_default=True, help='Password of every synthetic user.')
+@click.option('--seed', 'random_seed', default=None, type=int, help='Random seed for a reproducible data set.')
+@with_appcontext
+def synthetic(users, products, outgoing, incoming, activities, days, password, random_seed):
+    """Bulk-generate realistic users, products, transactions and activity for load testing."""
+    import time
+    from app.services import synthetic as generator
+
+    start = time.perf_counter()
+
+    def progress(table, rows):
+        click.echo(f'  {table}: {rows:,} rows ({time.perf_counter() - start:.1f}s)')
+
+    result = generator.generate(users=users, products=products, outgoing=outgoing, incoming=incoming,
+                                activities=activities, days=days, password=password, seed=random_seed,
+                                progress=progress)
+    click.echo(f'Created {result.users:,} users, {result.products:,} products, {result.incoming:,} incoming '
+               f'and {result.outgoing:,} outgoing transactions, {result.activities:,} activity entries '
+               f'in {time.perf_counter() - start:.1f}s.')
+
+@click.command()
+@click.option('--before', 'before', default=None, help='Archive rows older than this date (YYYY-MM-DD).')
+@click.option('--older-than-days', default=365, show_default=True, help='Used when --before is not given.')
+@click.option('--table', 'tables', multiple=True, type=click.Choice(sorted(archive.ARCHIVE_TABLES)),
+              help='Table to archive (repeatable). Default: all history tables.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows moved and deleted per transaction.')
+@with_appcontext
+def archive_history(before, older_than_days, tables, batch_size):
+    """Move old activity and transaction history into monthly gzip archives."""
+    from datetime import datetime, timedelta
+
+    if before:
+        cutoff = datetime.strptime(before, '%Y-%m-%d')
+    else:
+        cutoff = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=older_than_days)
+    click.echo(f'Archiving rows older than {cutoff:%Y-%m-%d %H:%M} into {archive.archive_dir()}')
+
+    def progress(table, moved):
+        click.echo(f'  {table}: {moved} rows archived')
+
+    for table in tables or sorted(archive.ARCHIVE_TABLES):
+        moved = archive.archive_table(table, cutoff, batch_size=batch_size, progress=progress)
+        if moved and table in ('transaksi_masuk', 'transaksi_keluar'):
+            # Archived rows disappear from the API's transaction listing
+            counters.touch(counters.CHANGES_TRANSACTIONS)
+            db.session.commit()
+        click.echo(f'{table}: {moved} rows moved.')
+
+def _parse_day(value):
+    from datetime import datetime
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+@click.group()
+def report():
+    """Sales reports from the daily rollups."""
+    pass
+
+@report.command()
+@click.option('--from', 'date_from', default=None, help='First day to rebuild (YYYY-MM-DD). Default: first movement.')
+@click.option('--to', 'date_to', default=None, help='Last day to rebuild (YYYY-MM-DD). Default: today.')
+@with_appcontext
+def backfill(date_from, date_to):
+    """Rebuild the daily sales rollups from the transaction tables and archives."""
+    from app.services import sales
+
+    def progress(month, rows):
+        click.echo(f'  {month}: {rows} rollup rows')
+
+    written = sales.rebuild(_parse_day(date_from), _parse_day(date_to), progress=progress)
+    click.echo(f'{written} rollup rows written.')
+
+@report.command('sales')
+@click.option('--from', 'date_from', default=None, help='First day (YYYY-MM-DD). Default: 30 days ago.')
+@click.option('--to', 'date_to', default=None, help='Last day (YYYY-MM-DD). Default: today.')
+@click.option('--period', type=click.Choice(['hari', 'minggu', 'bulan']), default='hari', show_default=True)
+@click.option('--top', default=10, show_default=True, help='Number of best sellers to list.')
+@click.option('--by', 'order', type=click.Choice(['omzet', 'unit']), default='omzet', show_default=True)
+@with_appcontext
+def sales_report(date_from, date_to, period, top, order):
+    """Print revenue per period, per category and the best sellers."""
+    from app.services import sales
+
+    default_from, default_to = sales.default_range()
+    date_from, date_to = _parse_day(date_from) or default_from, _parse_day(date_to) or default_to
+    totals = sales.totals(date_from, date_to)
+    click.echo(f'{date_from} .. {date_to}: {totals.unit_keluar} units sold, revenue Rp {totals.omzet:,}, '
+               f'{totals.unit_masuk} units received')
+    click.echo(f'\nPer {period}:')
+    for row in sales.by_period(date_from, date_to, period):
+        click.echo(f'  {row.mulai}  {row.unit_keluar:>8}  Rp {row.omzet:>15,}')
+    click.echo('\nPer category:')
+    for row in sales.by_category(date_from, date_to):
+        click.echo(f'  {row.kategori:<20}  {row.unit_keluar:>8}  Rp {row.omzet:>15,}')
+    click.echo(f'\nTop {top} by {order}:')
+    for rank, row in enumerate(sales.top_products(date_from, date_to, top, order), 1):
+        click.echo(f'  {rank:>3}. {row.nama:<40}  {row.unit_keluar:>8}  Rp {row.omzet:>15,}')
+
+def _parse_time(value):
+    from datetime import datetime
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise click.BadParameter(f'{value!r} is not YYYY-MM-DD[ HH:MM[:SS]]')
+
+@click.group()
+def stock():
+    """Stock snapshots, point-in-time stock, drift checks and low-stock alerts."""
+    pass
+
+@stock.command()
+@click.option('--keep-days', default=None, type=int, help='Delete snapshots older than this many days.')
+@with_appcontext
+def snapshot(keep_days):
+    """Snapshot the current stock of every product (schedule it, e.g. nightly from cron)."""
+    from datetime import datetime, timedelta
+    from app.services import snapshots
+
+    prune_before = datetime.utcnow() - timedelta(days=keep_days) if keep_days is not None else None
+    waktu, products = snapshots.take(prune_before)
+    click.echo(f'Snapshot {waktu:%Y-%m-%d %H:%M:%S} taken for {products} products.')
+
+@stock.command('at')
+@click.argument('when')
+@click.option('--product', 'produk_ids', multiple=True, type=int, help='Product id (repeatable). Default: all.')
+@with_appcontext
+def stock_at(when, produk_ids):
+    """Print the stock as of WHEN (UTC, YYYY-MM-DD[ HH:MM[:SS]])."""
+    from app.services import snapshots
+
+    result = snapshots.stock_at(_parse_time(when), produk_ids or None)
+    names = dict(db.session.query(Produk.id, Produk.nama).filter(Produk.id.in_(result.stok)).all())
+    click.echo(f'Stock as of {result.waktu:%Y-%m-%d %H:%M:%S} ({result.basis}):')
+    for produk_id, units in sorted(result.stok.items()):
+        click.echo(f'  {produk_id:>6}  {names.get(produk_id, "(produk dihapus)"):<40}  {units:>8}')
+
+@stock.command()
+@with_appcontext
+def drift():
+    """Compare Produk.stok with the latest snapshot plus the ledger; fails when they differ."""
+    from app.services import snapshots
+
+    latest, drifts = snapshots.drift()
+    basis = f'snapshot {latest:%Y-%m-%d %H:%M:%S}' if latest else 'full ledger replay (no snapshot yet)'
+    click.echo(f'Checked against {basis}.')
+    for item in drifts:
+        click.echo(f'  {item.produk_id:>6}  {item.nama:<40}  stok={item.stok} ledger={item.expected} '
+                   f'selisih={item.selisih:+d}')
+    if drifts:
+        raise click.ClickException(f'{len(drifts)} product(s) drifted from the ledger.')
+    click.echo('No drift.')
+
+@stock.command()
+@click.option('--limit', default=50, show_default=True, help='Products to list, most urgent first.')
+@click.option('--fail', 'fail_when_low', is_flag=True, help='Exit with an error when any product is low (for cron alerts).')
+@with_appcontext
+def low(limit, fail_when_low):
+    """List products at or below their reorder point (two indexed queries; cheap enough for cron every few minutes)."""
+    from app.services import low_stock
+
+    total = low_stock.count()
+    if not total:
+        click.echo('No product is at or below its reorder point.')
+        return
+    click.echo(f'{total} product(s) at or below their reorder point:')
+    for row in low_stock.top(limit):
+        click.echo(f'  {row.id:>6}  {row.nama:<40}  stok={row.stok:<6} titik_pesan={row.titik_pesan:<6} '
+                   f'selisih={row.selisih:+d}')
+    if total > limit:
+        click.echo(f'  ... and {total - limit} more')
+    if fail_when_low:
+        raise click.ClickException(f'{total} product(s) low on stock.')
+
+@click.group()
+def branch():
+    """Branches (outlets) and the users assigned to them."""
+    pass
+
+@branch.command('add')
+@click.argument('kode')
+@click.argument('nama')
+@with_appcontext
+def add_branch(kode, nama):
+    """Create branch KODE named NAMA."""
+    from app.models import Cabang
+
+    if Cabang.query.filter_by(kode=kode).first():
+        raise click.ClickException(f'Branch {kode} already exists.')
+    db.session.add(Cabang(kode=kode, nama=nama))
+    db.session.commit()
+    click.echo(f'Branch {kode} created.')
+
+@branch.command('list')
+@with_appcontext
+def list_branches():
+    """List branches with their staff count and stocked products."""
+    from app.models import Cabang, StokCabang
+
+    staff = dict(db.session.query(User.cabang_id, db.func.count()).group_by(User.cabang_id).all())
+    stocked = dict(db.session.query(StokCabang.cabang_id, db.func.count())
+                   .filter(StokCabang.stok > 0).group_by(StokCabang.cabang_id).all())
+    click.echo(f'  {"-":>4}  {"PUSAT":<16}  {"(stok pusat)":<40}  users={staff.get(None, 0)}')
+    for cabang in Cabang.query.order_by(Cabang.kode):
+        click.echo(f'  {cabang.id:>4}  {cabang.kode:<16}  {cabang.nama:<40}  users={staff.get(cabang.id, 0)} '
+                   f'produk={stocked.get(cabang.id, 0)}')
+
+@branch.command('assign')
+@click.argument('username')
+@click.argument('kode', required=False)
+@with_appcontext
+def assign_branch(username, kode):
+    """Assign USERNAME to branch KODE (omit KODE to move the user back to the central stock)."""
+    from app.models import Cabang
+    from app.services import user_cache
+
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'User {username} not found.')
+    cabang = None
+    if kode:
+        cabang = Cabang.query.filter_by(kode=kode).first()
+        if cabang is None:
+            raise click.ClickException(f'Branch {kode} not found.')
+    user.cabang_id = cabang.id if cabang else None
+    user_cache.invalidate()
+    db.session.commit()
+    click.echo(f'{username} now works at {kode or "the central stock"}.')
+
+@click.group()
+def import_data():
+    """Bulk-import data from files."""
+    pass
+
+@import_data.command('products')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--user', 'username', default='superadmin', show_default=True,
+              help='User recorded on the stock receipts and activity log.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows upserted per transaction.')
+@with_appcontext
+def import_products(csv_file, username, batch_size):
+    """Upsert products by name from CSV_FILE and record the stock as incoming receipts.
+
+    Columns: nama, harga, stok, kategori, gambar.
+    """
+    from app.services import audit, importer
+
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'User {username!r} not found.')
+
+    def progress(batch_no, rows, seconds):
+        click.echo(f'  batch {batch_no}: {rows} rows in {seconds * 1000:.0f} ms ({rows / seconds:,.0f} rows/sec)')
+
+    result = importer.import_products(csv_file, user.id, batch_size=batch_size, progress=progress)
+    audit.drain()
+    for line, message in result.errors:
+        click.echo(f'  line {line}: {message}', err=True)
+    if result.error_count > len(result.errors):
+        click.echo(f'  ... and {result.error_count - len(result.errors)} more invalid rows', err=True)
+    click.echo(f'{result.rows} rows imported: {result.created} products created, {result.updated} updated, '
+               f'{result.units} units received, {result.error_count} rows skipped.')
+
+class LazyGroup(click.Group):
+    """Command group whose commands live in another module, imported on first use.
+
+    `import_path` is 'module:attribute' of the real click.Group.
+    """
+
+    def __init__(self, name, import_path, **kwargs):
+        super().__init__(name, **kwargs)
+        self.import_path = import_path
+        self._group = None
+
+    def _target(self):
+        if self._group is None:
+            import importlib
+            module, attribute = self.import_path.split(':')
+            self._group = getattr(importlib.import_module(module), attribute)
+        return self._group
+
+    def list_commands(self, ctx):
+        return self._target().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._target().get_command(ctx, name)
+
+# Benchmarks live in app/bench.py and are not imported by the operational commands
+bench = LazyGroup('bench', 'app.bench:bench', help='Run performance benchmarks against a scratch database.')
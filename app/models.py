@@ -1,5 +1,6 @@
 from datetime import datetime
-from app import db, bcrypt
+from app import db
+from app.services import passwords
 from flask_login import UserMixin
 
 class User(db.Model, UserMixin):
@@ -11,16 +12,22 @@ class User(db.Model, UserMixin):
     otp_enabled = db.Column(db.Boolean, default=False) # Flag to enable/disable 2FA
     failed_login_attempts = db.Column(db.Integer, default=0, nullable=False)
     lockout_until = db.Column(db.DateTime, nullable=True)
+    # Branch the user works at; None = the central stock (and, for admins, every branch)
+    cabang_id = db.Column(db.Integer, db.ForeignKey('cabang.id'), nullable=True, index=True)
 
     transaksi_masuk = db.relationship('TransaksiMasuk', backref='user', lazy='dynamic')
     transaksi_keluar = db.relationship('TransaksiKeluar', backref='user', lazy='dynamic')
     riwayat_aktivitas = db.relationship('RiwayatAktivitas', backref='user', lazy='dynamic')
 
     def set_password(self, password):
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password = passwords.hash_password(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password, password)
+        return passwords.check_password(self.password, password)
+
+    def password_needs_rehash(self):
+        # True when the stored hash was made with a different BCRYPT_LOG_ROUNDS
+        return passwords.needs_rehash(self.password)
 
     def __repr__(self):
         return f'<User {self.username} ({self.role})>'
@@ -32,6 +39,11 @@ class Produk(db.Model):
     stok = db.Column(db.Integer, default=0, nullable=False)
     kategori = db.Column(db.String(64), nullable=True) # Contoh: HP, Aksesoris
     gambar = db.Column(db.String(128), nullable=True) # Path atau URL gambar
+    # Reorder point: the product is low on stock once stok <= titik_pesan (0 = alert when sold out)
+    titik_pesan = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    # Generated by the database, so every write path keeps it current; its index lets
+    # the low-stock list read only the products at or below their reorder point
+    selisih_stok = db.Column(db.Integer, db.Computed('stok - titik_pesan'), index=True)
 
     transaksi_masuk = db.relationship('TransaksiMasuk', backref='produk', lazy='dynamic')
     transaksi_keluar = db.relationship('TransaksiKeluar', backref='produk', lazy='dynamic')
@@ -39,12 +51,36 @@ class Produk(db.Model):
     def __repr__(self):
         return f'<Produk {self.nama} (Stok: {self.stok})>'
 
+class Cabang(db.Model):
+    # A branch (outlet) with its own stock; see app/services/branches.py
+    id = db.Column(db.Integer, primary_key=True)
+    kode = db.Column(db.String(16), index=True, unique=True, nullable=False)
+    nama = db.Column(db.String(128), nullable=False)
+
+    def __repr__(self):
+        return f'<Cabang {self.kode} ({self.nama})>'
+
+class StokCabang(db.Model):
+    # Stock of one product at one branch. The (cabang_id, produk_id) key keeps a branch's
+    # rows together, so its stock updates and lists never touch another branch's rows.
+    cabang_id = db.Column(db.Integer, db.ForeignKey('cabang.id', ondelete='CASCADE'), primary_key=True)
+    produk_id = db.Column(db.Integer, db.ForeignKey('produk.id', ondelete='CASCADE'), primary_key=True, index=True)
+    stok = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<StokCabang Cabang: {self.cabang_id}, Produk: {self.produk_id}, Stok: {self.stok}>'
+
 class TransaksiMasuk(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     produk_id = db.Column(db.Integer, db.ForeignKey('produk.id'), nullable=False)
     jumlah = db.Column(db.Integer, nullable=False)
     tanggal_masuk = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    cabang_id = db.Column(db.Integer, db.ForeignKey('cabang.id'), nullable=True) # None = central stock (Produk.stok)
+    mutasi = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False) # half of an inter-branch transfer or a stock correction, not a sale/purchase
+
+    # A branch's transaction list seeks straight to its own rows
+    __table_args__ = (db.Index('ix_transaksi_masuk_cabang_id_tanggal_masuk', 'cabang_id', 'tanggal_masuk'),)
 
     def __repr__(self):
         return f'<TransaksiMasuk Produk: {self.produk_id}, Jumlah: {self.jumlah}, Tanggal: {self.tanggal_masuk}>'
@@ -55,6 +91,11 @@ class TransaksiKeluar(db.Model):
     jumlah = db.Column(db.Integer, nullable=False)
     tanggal_keluar = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    cabang_id = db.Column(db.Integer, db.ForeignKey('cabang.id'), nullable=True) # None = central stock (Produk.stok)
+    mutasi = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False) # half of an inter-branch transfer or a stock correction, not a sale/purchase
+
+    # A branch's transaction list seeks straight to its own rows
+    __table_args__ = (db.Index('ix_transaksi_keluar_cabang_id_tanggal_keluar', 'cabang_id', 'tanggal_keluar'),)
 
     def __repr__(self):
         return f'<TransaksiKeluar Produk: {self.produk_id}, Jumlah: {self.jumlah}, Tanggal: {self.tanggal_keluar}>'
@@ -64,6 +105,37 @@ class RiwayatAktivitas(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     aktivitas = db.Column(db.String(256), nullable=False)
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    cabang_id = db.Column(db.Integer, db.ForeignKey('cabang.id'), nullable=True)
+
+    __table_args__ = (db.Index('ix_riwayat_aktivitas_cabang_id_timestamp', 'cabang_id', 'timestamp'),)
 
     def __repr__(self):
         return f'<RiwayatAktivitas User: {self.user_id}, Aktivitas: {self.aktivitas}, Waktu: {self.timestamp}>'
+
+class Ringkasan(db.Model):
+    # Running totals for the admin dashboard, maintained by the write paths (see app/services/counters.py)
+    nama = db.Column(db.String(64), primary_key=True)
+    nilai = db.Column(db.BigInteger, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<Ringkasan {self.nama}: {self.nilai}>'
+
+class PenjualanHarian(db.Model):
+    # Daily per-product totals, maintained by the stock write paths (see app/services/sales.py)
+    tanggal = db.Column(db.Date, primary_key=True)
+    produk_id = db.Column(db.Integer, db.ForeignKey('produk.id'), primary_key=True, index=True)
+    unit_keluar = db.Column(db.Integer, default=0, nullable=False)
+    omzet = db.Column(db.BigInteger, default=0, nullable=False) # unit_keluar x harga at the time of sale
+    unit_masuk = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<PenjualanHarian {self.tanggal} Produk: {self.produk_id}, Keluar: {self.unit_keluar}, Omzet: {self.omzet}>'
+
+class SnapshotStok(db.Model):
+    # Periodic copies of Produk.stok; stock at any time = nearest snapshot +/- ledger movements (see app/services/snapshots.py)
+    waktu = db.Column(db.DateTime, primary_key=True)
+    produk_id = db.Column(db.Integer, db.ForeignKey('produk.id', ondelete='CASCADE'), primary_key=True, index=True)
+    stok = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<SnapshotStok {self.waktu} Produk: {self.produk_id}, Stok: {self.stok}>'
@@ -0,0 +1,139 @@
+import base64
+from datetime import datetime
+from app import db
+
+DEFAULT_PAGE_SIZE = 50
+
+def encode_cursor(timestamp, row_id):
+    """Encode the (timestamp, id) of the last row on a page as an opaque URL-safe token."""
+    raw = f'{timestamp.isoformat()}|{row_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Decode a cursor token back into (timestamp, id). Returns None for missing or malformed tokens."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        timestamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def encode_name_cursor(name, row_id):
+    """Encode the (name, id) of the last row on a page as an opaque URL-safe token."""
+    raw = f'{row_id}|{name}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_name_cursor(token):
+    """Decode a name cursor token back into (name, id). Returns None for missing or malformed tokens."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        row_id, name = raw.split('|', 1)
+        return name, int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+class KeysetPage:
+    """One page of rows ordered by (timestamp DESC, id DESC), plus the cursor of the next page."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+def keyset_paginate(query, time_column, id_column, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """Return a KeysetPage of `query`, newest first, starting strictly after `cursor`.
+
+    Unlike OFFSET pagination, the database seeks straight to the cursor position through
+    the index on `time_column`, so every page costs the same regardless of how deep it is.
+    Exactly one SELECT is issued; one extra row is fetched to know whether a next page exists.
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        timestamp, row_id = position
+        query = query.filter(db.or_(
+            time_column < timestamp,
+            db.and_(time_column == timestamp, id_column < row_id)
+        ))
+
+    rows = query.order_by(time_column.desc(), id_column.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_column.key), getattr(last, id_column.key))
+    return KeysetPage(rows, next_cursor)
+
+def keyset_slice(rows, time_attr, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """KeysetPage over an in-memory list already sorted by (time, id) descending.
+
+    Lets rows read from somewhere other than the database (e.g. archived months)
+    share the cursor links of keyset_paginate.
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        rows = [row for row in rows if (getattr(row, time_attr), row.id) < position]
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_attr), last.id)
+    return KeysetPage(rows, next_cursor)
+
+class NamePage:
+    """One page of rows ordered by a unique name column, plus the cursor of the next page."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+def name_paginate(query, name_column, after=None, per_page=DEFAULT_PAGE_SIZE):
+    """Return a NamePage of `query` in `name_column` order, starting strictly after the name `after`.
+
+    `name_column` must be unique and indexed (e.g. User.username): the database seeks
+    straight to `after` through the index, so every page costs one SELECT of at most
+    `per_page + 1` rows, however many rows precede it.
+    """
+    if after:
+        query = query.filter(name_column > after)
+    rows = query.order_by(name_column).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = getattr(rows[-1], name_column.key)
+    return NamePage(rows, next_cursor)
+
+def name_id_paginate(query, name_column, id_column, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """Return a NamePage of `query` in (`name_column`, `id_column`) order, starting strictly after `cursor`.
+
+    For indexed names that are not unique (e.g. Produk.nama): the id breaks ties, and
+    the cursor is an opaque token of the last row's name and id. Like name_paginate,
+    every page is one SELECT of at most `per_page + 1` rows.
+    """
+    position = decode_name_cursor(cursor)
+    if position is not None:
+        name, row_id = position
+        query = query.filter(db.or_(
+            name_column > name,
+            db.and_(name_column == name, id_column > row_id)
+        ))
+    rows = query.order_by(name_column, id_column).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_name_cursor(getattr(last, name_column.key), getattr(last, id_column.key))
+    return NamePage(rows, next_cursor)
@@ -0,0 +1,151 @@
+import gzip
+import json
+import os
+from collections import namedtuple
+from datetime import datetime
+from types import SimpleNamespace
+from flask import current_app
+from app import db
+from app.models import User, Produk, TransaksiMasuk, TransaksiKeluar, RiwayatAktivitas
+
+# History older than a cutoff is moved out of the hot tables into append-only,
+# gzip-compressed JSON Lines files, one per table per month:
+#     <ARCHIVE_DIR>/<table>/<YYYY-MM>.jsonl.gz
+# Every archive run appends a new gzip member, which gzip readers concatenate
+# transparently. manifest.json keeps per-month row counts and quantity sums so the
+# dashboard counters can be verified without opening the archives.
+#
+# Rows are written and fsync'ed before they are deleted from the database. If a run
+# dies in between, the next run archives the same rows again; readers drop the
+# duplicates by id.
+
+ArchiveSpec = namedtuple('ArchiveSpec', 'model time_attr has_produk')
+
+ARCHIVE_TABLES = {
+    'riwayat_aktivitas': ArchiveSpec(RiwayatAktivitas, 'timestamp', False),
+    'transaksi_masuk': ArchiveSpec(TransaksiMasuk, 'tanggal_masuk', True),
+    'transaksi_keluar': ArchiveSpec(TransaksiKeluar, 'tanggal_keluar', True),
+}
+
+def archive_dir():
+    return current_app.config.get('ARCHIVE_DIR') or os.path.join(current_app.instance_path, 'archive')
+
+def _manifest_path():
+    return os.path.join(archive_dir(), 'manifest.json')
+
+def load_manifest():
+    try:
+        with open(_manifest_path()) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _save_manifest(manifest):
+    path = _manifest_path()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _month_path(table, month):
+    return os.path.join(archive_dir(), table, f'{month}.jsonl.gz')
+
+def _serialize(spec, row, username, produk_nama):
+    record = {column.name: getattr(row, column.key) for column in spec.model.__table__.columns}
+    record[spec.time_attr] = record[spec.time_attr].isoformat()
+    # Names are denormalized so archived months stay readable after users/products change
+    record['username'] = username
+    if spec.has_produk:
+        record['produk_nama'] = produk_nama
+    return record
+
+def archive_table(table, cutoff, batch_size=1000, progress=None):
+    """Move rows of `table` older than `cutoff` into the monthly archive files. Returns rows moved."""
+    spec = ARCHIVE_TABLES[table]
+    model = spec.model
+    time_column = getattr(model, spec.time_attr)
+    manifest = load_manifest()
+    moved = 0
+
+    while True:
+        entities = [model, User.username] + ([Produk.nama] if spec.has_produk else [])
+        query = db.session.query(*entities).join(User, User.id == model.user_id)
+        if spec.has_produk:
+            query = query.outerjoin(Produk, Produk.id == model.produk_id)
+        rows = query.filter(time_column < cutoff) \
+            .order_by(time_column, model.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        by_month = {}
+        for result in rows:
+            row, username = result[0], result[1]
+            produk_nama = result[2] if spec.has_produk else None
+            month = getattr(row, spec.time_attr).strftime('%Y-%m')
+            by_month.setdefault(month, []).append(_serialize(spec, row, username, produk_nama))
+
+        for month, records in by_month.items():
+            path = _month_path(table, month)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='ab') as gz:
+                    for record in records:
+                        gz.write((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+                raw.flush()
+                os.fsync(raw.fileno())
+
+        ids = [result[0].id for result in rows]
+        db.session.execute(db.delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+        db.session.commit()
+
+        # Counted only once the rows have really left the hot table
+        for month, records in by_month.items():
+            summary = manifest.setdefault(table, {}).setdefault(month, {'rows': 0, 'jumlah': 0})
+            summary['rows'] += len(records)
+            summary['jumlah'] += sum(record.get('jumlah', 0) for record in records)
+            # Transfers and corrections are kept apart so the counters can leave them out
+            summary['jumlah_mutasi'] = summary.get('jumlah_mutasi', 0) + \
+                sum(record.get('jumlah', 0) for record in records if record.get('mutasi'))
+        _save_manifest(manifest)
+        moved += len(ids)
+        if progress:
+            progress(table, moved)
+    return moved
+
+def archived_months(table):
+    """Archived months of `table`, newest first."""
+    return sorted(load_manifest().get(table, {}), reverse=True)
+
+def archived_totals(table):
+    """(rows, sum of jumlah not flagged mutasi) across every archived month of `table`."""
+    months = load_manifest().get(table, {}).values()
+    return sum(m['rows'] for m in months), sum(m['jumlah'] - m.get('jumlah_mutasi', 0) for m in months)
+
+def _as_row(spec, record):
+    # Shaped like the ORM objects so the existing templates render archived rows unchanged
+    record = dict(record)
+    record[spec.time_attr] = datetime.fromisoformat(record[spec.time_attr])
+    row = SimpleNamespace(**record)
+    row.user = SimpleNamespace(id=record['user_id'], username=record['username'])
+    if spec.has_produk:
+        row.produk = SimpleNamespace(id=record['produk_id'], nama=record['produk_nama'] or '(produk dihapus)')
+    return row
+
+def read_month(table, month, produk_id=None, user_id=None):
+    """All archived rows of `table` for `month` ('YYYY-MM'), newest first, optionally filtered."""
+    spec = ARCHIVE_TABLES[table]
+    path = _month_path(table, month)
+    if not os.path.exists(path):
+        return []
+    records = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if produk_id is not None and record.get('produk_id') != produk_id:
+                continue
+            if user_id is not None and record['user_id'] != user_id:
+                continue
+            records[record['id']] = record
+    rows = [_as_row(spec, record) for record in records.values()]
+    rows.sort(key=lambda row: (getattr(row, spec.time_attr), row.id), reverse=True)
+    return rows
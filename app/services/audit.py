@@ -0,0 +1,149 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event
+from app import db
+from app.models import RiwayatAktivitas
+
+# Activity entries are written either inside the caller's transaction ("sync", strict
+# audit: the entry commits or rolls back with the change it describes) or handed to a
+# per-process background writer after the transaction commits ("async"). The writer
+# bulk-inserts entries in batches, so a sale's commit no longer carries the audit row,
+# but entries still queued when the process is killed are lost. "sync" is the default;
+# async is an opt-in for deployments that accept that window.
+
+class AuditWriter:
+
+    def __init__(self, app, batch_size, flush_interval, max_queue):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def _ensure_started(self):
+        # The writer thread does not survive fork(); start it lazily in each worker
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self.max_queue)
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                    self._thread.start()
+
+    def submit(self, entries):
+        self._ensure_started()
+        for entry in entries:
+            # Blocks when the queue is full, applying backpressure instead of dropping entries
+            self._queue.put(entry)
+
+    def _take_batch(self, timeout):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(db.insert(RiwayatAktivitas.__table__), batch)
+            self.written += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            self.app.logger.exception('Gagal menulis %d entri riwayat aktivitas', len(batch))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.batches += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(self.flush_interval)
+            if batch:
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def drain(self):
+        """Block until every queued entry has been written (used at shutdown and by CLI commands)."""
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'max_flush_ms': round(self.max_flush_ms, 2),
+            'avg_flush_ms': round(self._total_flush_ms / self.batches, 2) if self.batches else 0.0,
+        }
+
+def _after_commit(session):
+    pending = session.info.pop('pending_audit', None)
+    if pending:
+        pending[0].submit(pending[1])
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('pending_audit', None)
+
+def init_app(app):
+    mode = app.config.get('AUDIT_LOG_MODE', 'sync')
+    writer = None
+    if mode == 'async':
+        writer = AuditWriter(app,
+                             batch_size=app.config.get('AUDIT_LOG_BATCH_SIZE', 200),
+                             flush_interval=app.config.get('AUDIT_LOG_FLUSH_INTERVAL', 1.0),
+                             max_queue=app.config.get('AUDIT_LOG_QUEUE_SIZE', 10000))
+        atexit.register(writer.drain)
+    app.extensions['audit_writer'] = writer
+    if not event.contains(db.session, 'after_commit', _after_commit):
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
+
+def log(user_id, aktivitas, cabang_id=None):
+    """Record an activity entry (at branch `cabang_id`) for the change being made in the current transaction."""
+    aktivitas = aktivitas if len(aktivitas) <= 256 else aktivitas[:253] + '...'
+    writer = current_app.extensions['audit_writer']
+    if writer is None:
+        db.session.add(RiwayatAktivitas(user_id=user_id, aktivitas=aktivitas, cabang_id=cabang_id))
+        return
+    # Queued only once the transaction commits, so rolled-back changes leave no entry
+    pending = db.session.info.setdefault('pending_audit', (writer, []))
+    pending[1].append({'user_id': user_id, 'aktivitas': aktivitas, 'cabang_id': cabang_id,
+                       'timestamp': datetime.utcnow()})
+
+def drain():
+    writer = current_app.extensions['audit_writer']
+    if writer is not None:
+        writer.drain()
+
+def stats():
+    writer = current_app.extensions['audit_writer']
+    if writer is None:
+        return {'mode': 'sync'}
+    return dict(mode='async', **writer.stats())
@@ -0,0 +1,32 @@
+from app import db
+from app.models import Cabang, Produk, StokCabang
+
+# Branches (outlets). Each branch keeps its own stock in stok_cabang, keyed by
+# (cabang_id, produk_id); users assigned to a branch receive, sell and see that
+# branch's stock, everyone else works on the central stock in Produk.stok. Branches
+# are created and users assigned with `flask branch`; stock moves between branches
+# with stock.transfer_stock (the admin "Stok Cabang" page).
+
+PUSAT = 0  # form/query value standing for the central stock (cabang_id None)
+
+def choices(include_pusat=True):
+    """(id, label) pairs for branch SelectFields, ordered by code; PUSAT first."""
+    rows = db.session.query(Cabang.id, Cabang.kode, Cabang.nama).order_by(Cabang.kode).all()
+    return ([(PUSAT, 'Pusat')] if include_pusat else []) + [(id, f'{kode} - {nama}') for id, kode, nama in rows]
+
+def from_choice(value):
+    """Turn a choice value back into a cabang_id (None for PUSAT)."""
+    return None if not value else value
+
+def stock_levels(cabang_id, produk_ids=None):
+    """produk_id -> units at branch `cabang_id`; one range read of the branch's stok_cabang rows."""
+    query = db.session.query(StokCabang.produk_id, StokCabang.stok).filter(StokCabang.cabang_id == cabang_id)
+    if produk_ids is not None:
+        query = query.filter(StokCabang.produk_id.in_(produk_ids))
+    return dict(query.all())
+
+def stock_list(cabang_id):
+    """(produk_id, nama, kategori, stok) of every product stocked at branch `cabang_id`, by name."""
+    return db.session.query(Produk.id, Produk.nama, Produk.kategori, StokCabang.stok) \
+        .join(StokCabang, StokCabang.produk_id == Produk.id) \
+        .filter(StokCabang.cabang_id == cabang_id).order_by(Produk.nama).all()
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from app import db
+from app.models import Produk
+from app.services import counters, replicas
+from app.services.search import SearchIndex
+from app.services.versioning import VersionFile, bump_after_commit
+
+# Read-only snapshot of a product row, safe to share between requests
+CatalogItem = namedtuple('CatalogItem', 'id nama harga stok kategori gambar')
+
+class CatalogCache:
+    """Per-worker copy of the product catalog, shared across gunicorn workers through version files.
+
+    Every worker keeps the catalog in memory and, on each lookup, compares the shared
+    version files with the versions it loaded. Writers bump them after their transaction
+    commits, so every worker on the host reloads the catalog exactly once per change
+    instead of querying Produk on every request. Two versions are kept: `version_file`
+    changes with any product or stock write, `names_version_file` only when products
+    are created, edited, deleted or imported. A stock-only change re-reads just
+    (id, stok) and keeps the search index, which is rebuilt only for name changes.
+    A TTL bounds staleness when the version files are not shared (e.g. across hosts).
+    """
+
+    def __init__(self, version_file, names_version_file, ttl):
+        self.version_file = VersionFile(version_file)
+        self.names_version_file = VersionFile(names_version_file)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = None
+        self._by_id = {}
+        self._index = None
+        self._version = None
+        self._loading = None  # versions some request is loading right now
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.stock_refreshes = 0
+
+    def _fresh(self):
+        version = (self.version_file.read(), self.names_version_file.read())
+        expired = time.monotonic() - self._loaded_at >= self.ttl
+        if self._items is not None and version == self._version and not expired:
+            self.hits += 1
+            return
+        # The lock only guards the bookkeeping, never the query: under the ASGI entry
+        # point (app/asgi.py) the query yields to the event loop, and a request blocking
+        # on a lock held across it would stall the loop thread for good.
+        with self._lock:
+            if self._items is not None and self._loading == version:
+                # Another request is already loading these versions; serve the previous snapshot
+                self.hits += 1
+                return
+            self._loading = version
+            previous_items, previous_index, previous_version = self._items, self._index, self._version
+        stock_only = previous_items is not None and not expired and previous_version[1] == version[1]
+        try:
+            # From the primary: a lagging replica would be cached under the new version
+            with replicas.on_primary():
+                if stock_only:
+                    stok = dict(db.session.query(Produk.id, Produk.stok).all())
+                else:
+                    rows = db.session.query(Produk.id, Produk.nama, Produk.harga, Produk.stok,
+                                            Produk.kategori, Produk.gambar).order_by(Produk.nama).all()
+            if stock_only:
+                items = tuple(item._replace(stok=stok[item.id]) for item in previous_items if item.id in stok)
+                index = previous_index
+            else:
+                items = tuple(CatalogItem(*row) for row in rows)
+                index = SearchIndex(items)
+            by_id = {item.id: item for item in items}
+        finally:
+            with self._lock:
+                if self._loading == version:
+                    self._loading = None
+        with self._lock:
+            # `version` was read before the query, so a bump during it forces another reload
+            self._items, self._by_id, self._index = items, by_id, index
+            self._version = version
+            if stock_only:
+                self.stock_refreshes += 1
+            else:
+                # The TTL runs from the last full load, so names from other hosts still expire
+                self._loaded_at = time.monotonic()
+                self.misses += 1
+
+    def items(self):
+        self._fresh()
+        return self._items
+
+    def get(self, produk_id):
+        self._fresh()
+        return self._by_id.get(produk_id)
+
+    def search(self, query, limit):
+        self._fresh()
+        by_id = self._by_id
+        return [by_id[produk_id] for produk_id in self._index.search(query, limit) if produk_id in by_id]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stock_refreshes': self.stock_refreshes,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'products': len(self._items or ()),
+            'version_file': self.version_file.path,
+        }
+
+def init_app(app):
+    version_file = app.config.get('CATALOG_VERSION_FILE') or os.path.join(app.instance_path, 'catalog.version')
+    names_version_file = app.config.get('CATALOG_NAMES_VERSION_FILE') \
+        or os.path.join(os.path.dirname(version_file), 'catalog_names.version')
+    app.extensions['catalog_cache'] = CatalogCache(version_file, names_version_file,
+                                                   app.config.get('CATALOG_CACHE_TTL', 300))
+    app.add_template_global(get, 'catalog_item')
+
+def _cache():
+    return current_app.extensions['catalog_cache']
+
+def get(produk_id):
+    """Cached CatalogItem for `produk_id`, or None if no such product."""
+    return _cache().get(produk_id)
+
+def search(query, limit=10):
+    """Top `limit` CatalogItems matching `query` by name/category prefix or substring."""
+    return _cache().search(query, limit)
+
+def invalidate(names=False):
+    """Mark the catalog stale; the version is bumped only once the current transaction commits.
+
+    Pass names=True when products were created, deleted or had their name, category,
+    price or image changed; stock-only writes leave the search index alone.
+    Also advances the products change counter in the same transaction, so HTTP validators
+    of the JSON API change exactly when the catalog does.
+    """
+    bump_after_commit(_cache().version_file)
+    if names:
+        bump_after_commit(_cache().names_version_file)
+    counters.touch(counters.CHANGES_PRODUCTS)
+
+def stats():
+    return _cache().stats()
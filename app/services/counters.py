@@ -0,0 +1,104 @@
+import time
+from app import db
+from app.models import Ringkasan, User, Produk, TransaksiMasuk, TransaksiKeluar
+from app.services import archive
+
+# Counter names stored in the ringkasan table
+TOTAL_USERS = 'total_users'
+TOTAL_PRODUCTS = 'total_products'
+TOTAL_INCOMING = 'total_incoming_transactions'
+TOTAL_OUTGOING = 'total_outgoing_transactions'
+
+COUNTERS = (TOTAL_USERS, TOTAL_PRODUCTS, TOTAL_INCOMING, TOTAL_OUTGOING)
+
+# Change counters behind the JSON API's ETag/Last-Modified (see app/api/routes.py). Each
+# holds the time of the last change in microseconds since the epoch, advanced by at least
+# one per change, so it is both a strictly increasing version and a modification time.
+CHANGES_PRODUCTS = 'perubahan_produk'
+CHANGES_TRANSACTIONS = 'perubahan_transaksi'
+
+def _upsert(nama, value, on_conflict):
+    """INSERT counter `nama` with `value`, or UPDATE it to `on_conflict(column, new_value)` if it exists.
+
+    One atomic statement, so two first writers cannot both insert the row. Returns
+    False on databases without an upsert, where the caller falls back to UPDATE.
+    """
+    table = Ringkasan.__table__
+    dialect = db.session.get_bind(mapper=Ringkasan).dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(nama=nama, nilai=value)
+        stmt = stmt.on_duplicate_key_update(nilai=on_conflict(table.c.nilai, stmt.inserted.nilai))
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(nama=nama, nilai=value)
+        stmt = stmt.on_conflict_do_update(index_elements=['nama'],
+                                          set_={'nilai': on_conflict(table.c.nilai, stmt.excluded.nilai)})
+    else:
+        return False
+    db.session.execute(stmt)
+    return True
+
+def _update_existing(nama, nilai):
+    result = db.session.execute(
+        db.update(Ringkasan)
+        .where(Ringkasan.nama == nama)
+        .values(nilai=nilai)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise RuntimeError(f"Counter '{nama}' is missing; run `flask db upgrade` or `flask seed rollups`.")
+
+def bump(nama, delta=1):
+    """Add `delta` to a counter inside the caller's transaction.
+
+    The increment is a single upsert so concurrent writers never lose counts, and the
+    row is created on first use for databases built with db.create_all() instead of
+    migrations. Databases without an upsert need the row from the migrations.
+    """
+    if not _upsert(nama, delta, lambda current, new: current + new):
+        _update_existing(nama, Ringkasan.nilai + delta)
+
+def touch(nama):
+    """Advance change counter `nama` inside the caller's transaction."""
+    now = time.time_ns() // 1000
+    advance = lambda current, new: db.case((current >= new, current + 1), else_=new)
+    if not _upsert(nama, now, advance):
+        _update_existing(nama, advance(Ringkasan.nilai, now))
+
+def read(*names):
+    """Return the given counters as a dict in one query; missing counters read as 0."""
+    values = dict(db.session.query(Ringkasan.nama, Ringkasan.nilai).filter(Ringkasan.nama.in_(names)).all())
+    return {nama: values.get(nama, 0) for nama in names}
+
+def read_all():
+    """Return every counter as a dict in one query; missing counters read as 0."""
+    values = dict(db.session.query(Ringkasan.nama, Ringkasan.nilai).all())
+    return {nama: values.get(nama, 0) for nama in COUNTERS}
+
+def compute_from_tables():
+    """Recompute every counter from the source tables plus archived history (for rebuild/verify only).
+
+    Ledger rows flagged `mutasi` (branch transfers, stock corrections) are not
+    incoming or outgoing goods and are left out, as the write paths do.
+    """
+    _, archived_incoming = archive.archived_totals('transaksi_masuk')
+    _, archived_outgoing = archive.archived_totals('transaksi_keluar')
+    return {
+        TOTAL_USERS: User.query.count(),
+        TOTAL_PRODUCTS: Produk.query.count(),
+        TOTAL_INCOMING: (TransaksiMasuk.query.with_entities(db.func.sum(TransaksiMasuk.jumlah))
+                         .filter(db.not_(TransaksiMasuk.mutasi)).scalar() or 0) + archived_incoming,
+        TOTAL_OUTGOING: (TransaksiKeluar.query.with_entities(db.func.sum(TransaksiKeluar.jumlah))
+                         .filter(db.not_(TransaksiKeluar.mutasi)).scalar() or 0) + archived_outgoing,
+    }
+
+def rebuild(actual=None):
+    """Overwrite the stored counters with freshly computed values. The caller commits."""
+    actual = actual or compute_from_tables()
+    for nama, nilai in actual.items():
+        db.session.merge(Ringkasan(nama=nama, nilai=nilai))
+    return actual
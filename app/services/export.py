@@ -0,0 +1,63 @@
+import csv
+import io
+from collections import namedtuple
+from app import db
+from app.models import User, Produk, TransaksiMasuk, TransaksiKeluar, RiwayatAktivitas
+
+# Exports stream straight from a server-side cursor (yield_per) into CSV chunks, so
+# memory stays flat whether the export holds a thousand rows or ten million.
+
+ExportSpec = namedtuple('ExportSpec', 'filename header time_column build')
+
+def _transactions(model, time_column):
+    return (db.select(model.id, time_column, Produk.nama, Produk.harga, model.jumlah,
+                      (model.jumlah * Produk.harga).label('total'), User.username)
+            .join(Produk, Produk.id == model.produk_id)
+            .join(User, User.id == model.user_id))
+
+def _activities():
+    return (db.select(RiwayatAktivitas.id, RiwayatAktivitas.timestamp, User.username, RiwayatAktivitas.aktivitas)
+            .join(User, User.id == RiwayatAktivitas.user_id))
+
+EXPORTS = {
+    'masuk': ExportSpec('transaksi_masuk',
+                        ['id', 'tanggal_masuk', 'produk', 'harga', 'jumlah', 'total', 'oleh'],
+                        TransaksiMasuk.tanggal_masuk,
+                        lambda: _transactions(TransaksiMasuk, TransaksiMasuk.tanggal_masuk)),
+    'keluar': ExportSpec('transaksi_keluar',
+                         ['id', 'tanggal_keluar', 'produk', 'harga', 'jumlah', 'total', 'oleh'],
+                         TransaksiKeluar.tanggal_keluar,
+                         lambda: _transactions(TransaksiKeluar, TransaksiKeluar.tanggal_keluar)),
+    'aktivitas': ExportSpec('riwayat_aktivitas',
+                            ['id', 'waktu', 'pengguna', 'aktivitas'],
+                            RiwayatAktivitas.timestamp,
+                            _activities),
+}
+
+def export_statement(jenis, date_from=None, date_to=None):
+    """SELECT for export `jenis`, limited to [date_from, date_to) and ordered by time."""
+    spec = EXPORTS[jenis]
+    stmt = spec.build()
+    if date_from:
+        stmt = stmt.where(spec.time_column >= date_from)
+    if date_to:
+        stmt = stmt.where(spec.time_column < date_to)
+    return stmt.order_by(spec.time_column, stmt.selected_columns[0])
+
+def iter_csv(jenis, date_from=None, date_to=None, batch_size=1000):
+    """Yield the CSV export as text chunks of about `batch_size` rows each."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORTS[jenis].header)
+
+    result = db.session.execute(
+        export_statement(jenis, date_from, date_to).execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        for row in partition:
+            writer.writerow([value.strftime('%Y-%m-%d %H:%M:%S') if hasattr(value, 'strftime') else value
+                             for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
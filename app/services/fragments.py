@@ -0,0 +1,123 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, render_template
+from markupsafe import Markup
+from app.services import replicas
+from app.services.versioning import VersionFile
+
+# Rendered template fragments (product tables, the dashboard sales panel), cached per
+# worker. A fragment is keyed by its name, the caller's key (e.g. the search query) and
+# the catalog version file, which every product and stock write bumps after commit
+# (catalog.invalidate), so a hit needs one stat() and no database query or template
+# rendering. Sales rollups only change together with stock, so the same version covers
+# them; a `flask report backfill` shows up once the TTL runs out.
+
+class FragmentStats:
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.render_ms = 0.0
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'avg_render_ms': round(self.render_ms / self.misses, 2) if self.misses else 0.0,
+        }
+
+class FragmentCache:
+    """LRU of rendered fragments bounded by the total size of the cached HTML.
+
+    The whole cache is dropped when the version file changes, so entries never outlive
+    the data they were rendered from; between changes the least recently used entries
+    are evicted once `max_bytes` is exceeded. A TTL bounds staleness when the version
+    file is not shared (e.g. across hosts).
+    """
+
+    def __init__(self, version_file, max_bytes, ttl):
+        self.version_file = VersionFile(version_file)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (name, key) -> (html, size, stored_at)
+        self._version = None
+        self.bytes = 0
+        self.evictions = 0
+        self._stats = {}
+
+    def render(self, name, key, build):
+        """Return the cached fragment `(name, key)`, calling `build()` to render it on a miss."""
+        version = self.version_file.read()
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats.setdefault(name, FragmentStats())
+            if version != self._version:
+                self._entries.clear()
+                self.bytes = 0
+                self._version = version
+            entry = self._entries.get((name, key))
+            if entry is not None and now - entry[2] < self.ttl:
+                self._entries.move_to_end((name, key))
+                stats.hits += 1
+                return entry[0]
+
+        start = time.perf_counter()
+        html = Markup(build())
+        elapsed = time.perf_counter() - start
+        size = sys.getsizeof(html)
+        with self._lock:
+            stats.misses += 1
+            stats.render_ms += elapsed * 1000
+            # Only cache if nobody bumped the version while we were rendering
+            if self._version == version and size <= self.max_bytes:
+                previous = self._entries.pop((name, key), None)
+                if previous is not None:
+                    self.bytes -= previous[1]
+                self._entries[(name, key)] = (html, size, now)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                    self.bytes -= evicted_size
+                    self.evictions += 1
+        return html
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'fragments': {name: stats.as_dict() for name, stats in sorted(self._stats.items())},
+        }
+
+def init_app(app):
+    # Shares the catalog's version file: fragments go stale exactly when the catalog does
+    version_file = app.config.get('CATALOG_VERSION_FILE') or os.path.join(app.instance_path, 'catalog.version')
+    app.extensions['fragment_cache'] = FragmentCache(version_file,
+                                                     app.config.get('FRAGMENT_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+                                                     app.config.get('FRAGMENT_CACHE_TTL', 300))
+
+def _cache():
+    return current_app.extensions['fragment_cache']
+
+def render(name, template, context, key=None):
+    """Render `template` as fragment `name`, or return it from the cache.
+
+    `context` is a callable returning the template variables; it runs only on a miss,
+    so any queries it makes are skipped on hits. `key` separates variants of one
+    fragment and must be hashable. Never cache anything that depends on the user.
+    Misses read from the primary, so a lagging replica is never cached as current.
+    """
+    def build():
+        with replicas.on_primary():
+            return render_template(template, **context())
+    return _cache().render(name, key, build)
+
+def stats():
+    return _cache().stats()
@@ -0,0 +1,153 @@
+import csv
+import time
+from app import db
+from app.models import Produk, TransaksiMasuk
+from app.services import audit, catalog, counters, sales
+
+# CSV columns: nama (required), harga (required), stok (units received, default 0),
+# kategori, gambar. Products are matched by exact name; existing ones get their price
+# (and category/image, when given) updated and the received units added to stock.
+# Every row with stok > 0 is also recorded as a TransaksiMasuk receipt, so the ledger
+# stays consistent with Produk.stok.
+
+MAX_REPORTED_ERRORS = 100
+
+class ImportResult:
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.units = 0
+        self.rows = 0
+        self.error_count = 0
+        self.errors = []  # (line number, message), capped at MAX_REPORTED_ERRORS
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+def _parse_int(value, field, default=None):
+    value = (value or '').strip()
+    if not value:
+        if default is None:
+            raise ValueError(f'{field} wajib diisi')
+        return default
+    number = int(value)
+    if number < 0:
+        raise ValueError(f'{field} tidak boleh negatif')
+    return number
+
+def _parse_row(row):
+    nama = (row.get('nama') or '').strip()
+    if not nama:
+        raise ValueError('nama wajib diisi')
+    if len(nama) > 128:
+        raise ValueError('nama lebih dari 128 karakter')
+    return {
+        'nama': nama,
+        'harga': _parse_int(row.get('harga'), 'harga'),
+        'stok': _parse_int(row.get('stok'), 'stok', default=0),
+        'kategori': (row.get('kategori') or '').strip()[:64] or None,
+        'gambar': (row.get('gambar') or '').strip()[:128] or None,
+    }
+
+def _apply_batch(batch, user_id):
+    """Upsert one batch of parsed rows in a single transaction. Returns (created, updated, units)."""
+    existing = dict(db.session.query(Produk.nama, db.func.min(Produk.id))
+                    .filter(Produk.nama.in_(batch)).group_by(Produk.nama).all())
+
+    new_rows = [row for nama, row in batch.items() if nama not in existing]
+    if new_rows:
+        db.session.execute(db.insert(Produk), [
+            {'nama': row['nama'], 'harga': row['harga'], 'stok': row['stok'],
+             'kategori': row['kategori'], 'gambar': row['gambar']} for row in new_rows])
+        # Portable way to learn the new ids (MySQL has no INSERT ... RETURNING)
+        existing_new = dict(db.session.query(Produk.nama, db.func.max(Produk.id))
+                            .filter(Produk.nama.in_([row['nama'] for row in new_rows]))
+                            .group_by(Produk.nama).all())
+    else:
+        existing_new = {}
+
+    updates = [row for nama, row in batch.items() if nama in existing]
+    if updates:
+        table = Produk.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.id == db.bindparam('b_id'))
+            .values(harga=db.bindparam('b_harga'),
+                    stok=table.c.stok + db.bindparam('b_stok'),
+                    kategori=db.func.coalesce(db.bindparam('b_kategori'), table.c.kategori),
+                    gambar=db.func.coalesce(db.bindparam('b_gambar'), table.c.gambar)),
+            [{'b_id': existing[row['nama']], 'b_harga': row['harga'], 'b_stok': row['stok'],
+              'b_kategori': row['kategori'], 'b_gambar': row['gambar']} for row in updates])
+
+    ids = {**existing, **existing_new}
+    receipts = [{'produk_id': ids[nama], 'jumlah': row['stok'], 'user_id': user_id}
+                for nama, row in batch.items() if row['stok'] > 0]
+    if receipts:
+        db.session.execute(db.insert(TransaksiMasuk), receipts)
+        sales.record_receipts([(receipt['produk_id'], receipt['jumlah']) for receipt in receipts])
+
+    units = sum(receipt['jumlah'] for receipt in receipts)
+    counters.bump(counters.TOTAL_PRODUCTS, len(new_rows))
+    counters.bump(counters.TOTAL_INCOMING, units)
+    if receipts:
+        counters.touch(counters.CHANGES_TRANSACTIONS)
+    catalog.invalidate(names=True)
+    audit.log(user_id, f'Import produk: {len(new_rows)} baru, {len(updates)} diperbarui, {units} unit masuk')
+    db.session.commit()
+    return len(new_rows), len(updates), units
+
+def import_products(text_stream, user_id, batch_size=1000, progress=None):
+    """Import products from a CSV text stream in batches of `batch_size` rows.
+
+    The file is read incrementally; each batch costs a fixed handful of statements
+    (one lookup, one executemany INSERT, one executemany UPDATE, one receipts INSERT,
+    one rollup upsert) and its own commit. `progress(batch_no, rows, seconds)` is called after each batch.
+    """
+    result = ImportResult()
+    reader = csv.DictReader(text_stream)
+    if reader.fieldnames is None or 'nama' not in reader.fieldnames or 'harga' not in reader.fieldnames:
+        result.add_error(1, 'Header CSV harus memuat kolom nama dan harga')
+        return result
+
+    batch = {}
+    batch_no = 0
+
+    def flush():
+        nonlocal batch, batch_no
+        if not batch:
+            return
+        start = time.perf_counter()
+        rows = sum(row.pop('_count') for row in batch.values())
+        created, updated, units = _apply_batch(batch, user_id)
+        result.created += created
+        result.updated += updated
+        result.units += units
+        batch_no += 1
+        if progress:
+            progress(batch_no, rows, time.perf_counter() - start)
+        batch = {}
+
+    for row in reader:
+        try:
+            parsed = _parse_row(row)
+        except ValueError as e:
+            result.add_error(reader.line_num, str(e))
+            continue
+        result.rows += 1
+        previous = batch.get(parsed['nama'])
+        if previous:
+            # Same product twice in one batch: later values win, received units add up
+            parsed['stok'] += previous['stok']
+            parsed['kategori'] = parsed['kategori'] or previous['kategori']
+            parsed['gambar'] = parsed['gambar'] or previous['gambar']
+            parsed['_count'] = previous['_count'] + 1
+        else:
+            parsed['_count'] = 1
+        batch[parsed['nama']] = parsed
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return result
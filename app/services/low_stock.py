@@ -0,0 +1,24 @@
+from collections import namedtuple
+from app import db
+from app.models import Produk
+
+# Low-stock watch list. A product is low once stok <= titik_pesan (its reorder point;
+# 0 means "alert when sold out"). Produk.selisih_stok is a generated column holding
+# stok - titik_pesan, maintained by the database on every write, and it is indexed: the
+# queries below are an index range scan over `selisih_stok <= 0`, so they touch only
+# the products that are actually low, however large the catalog.
+
+LowStockRow = namedtuple('LowStockRow', 'id nama kategori stok titik_pesan selisih')
+
+def _low():
+    return db.session.query(Produk.id, Produk.nama, Produk.kategori, Produk.stok, Produk.titik_pesan,
+                            Produk.selisih_stok).filter(Produk.selisih_stok <= 0)
+
+def top(limit=10):
+    """The `limit` products furthest below their reorder point, most urgent first."""
+    rows = _low().order_by(Produk.selisih_stok, Produk.id).limit(limit).all()
+    return [LowStockRow(*row) for row in rows]
+
+def count():
+    """Number of products at or below their reorder point (answered from the index)."""
+    return db.session.query(db.func.count()).select_from(Produk).filter(Produk.selisih_stok <= 0).scalar()
@@ -0,0 +1,47 @@
+import os
+import threading
+from flask import current_app
+from app import bcrypt
+
+# bcrypt releases the GIL while hashing, so under a gthread worker the other request
+# threads keep serving pages while one thread hashes. The request thread that logs in
+# still waits for its own hash; nothing here makes a login itself faster. A semaphore
+# only caps how many hashes a worker runs at once, so a login burst cannot occupy
+# every CPU core; extra logins queue for a slot.
+_slots = None
+_slots_pid = None
+_slots_lock = threading.Lock()
+
+def _hash_slots():
+    global _slots, _slots_pid
+    # A fork can copy a semaphore mid-acquire; build it lazily in each gunicorn worker
+    if _slots is None or _slots_pid != os.getpid():
+        with _slots_lock:
+            if _slots is None or _slots_pid != os.getpid():
+                _slots = threading.BoundedSemaphore(current_app.config.get('PASSWORD_HASH_THREADS', 4))
+                _slots_pid = os.getpid()
+    return _slots
+
+def work_factor():
+    return current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+def hash_password(password):
+    """bcrypt hash of `password` at the configured work factor, on the calling thread once a slot is free."""
+    rounds = work_factor()
+    with _hash_slots():
+        return bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+
+def check_password(password_hash, password):
+    """Verify `password` against `password_hash` on the calling thread once a slot is free."""
+    with _hash_slots():
+        return bcrypt.check_password_hash(password_hash, password)
+
+def hash_cost(password_hash):
+    """Work factor embedded in a bcrypt hash ("$2b$12$..." -> 12), or None if unparseable."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(password_hash):
+    return hash_cost(password_hash) != work_factor()
@@ -0,0 +1,162 @@
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+from flask import current_app, g, request
+from sqlalchemy import event
+from app import db
+
+# Per-request SQL instrumentation. Engine events time every statement a request runs;
+# after_request folds the request into per-endpoint totals (query count, DB time, the
+# slowest statements) and flags statement shapes repeated within one request, the
+# signature of N+1 lazy loading. Off by default: when SQL_PROFILING is false no engine
+# listener or request hook is registered at all, so the hot path pays nothing.
+
+# Collapse literals and IN-lists so "same query, different row" share one shape
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|:\w+|__\[POSTCOMPILE_\w+\])(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+def statement_shape(statement):
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _IN_LIST.sub('(?)', shape)
+    return _NUMBER.sub('N', shape)
+
+class EndpointStats:
+
+    def __init__(self, keep_slowest):
+        self.keep_slowest = keep_slowest
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_ms = 0.0
+        self.max_db_ms = 0.0
+        self.slowest = []  # min-heap of (ms, sql)
+        self.n_plus_one = {}  # shape -> most repeats seen in one request
+
+    def add(self, statements, n_plus_one):
+        db_ms = sum(ms for ms, _ in statements)
+        self.requests += 1
+        self.queries += len(statements)
+        self.max_queries = max(self.max_queries, len(statements))
+        self.db_ms += db_ms
+        self.max_db_ms = max(self.max_db_ms, db_ms)
+        for ms, sql in statements:
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, (ms, sql))
+            elif ms > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (ms, sql))
+        for shape, repeats in n_plus_one.items():
+            self.n_plus_one[shape] = max(self.n_plus_one.get(shape, 0), repeats)
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'avg_queries': round(self.queries / self.requests, 1) if self.requests else 0,
+            'max_queries': self.max_queries,
+            'avg_db_ms': round(self.db_ms / self.requests, 2) if self.requests else 0.0,
+            'max_db_ms': round(self.max_db_ms, 2),
+            'total_db_ms': round(self.db_ms, 2),
+            'slowest': [{'ms': round(ms, 2), 'sql': sql} for ms, sql in sorted(self.slowest, reverse=True)],
+            'n_plus_one': [{'repeats': repeats, 'shape': shape}
+                           for shape, repeats in sorted(self.n_plus_one.items(), key=lambda item: -item[1])],
+        }
+
+class SqlProfiler:
+    """Per-worker SQL statistics, grouped by endpoint."""
+
+    def __init__(self, app, keep_slowest, n_plus_one_threshold, header):
+        self.app = app
+        self.keep_slowest = keep_slowest
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.header = header
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._warned = set()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Statements outside a request (CLI, audit writer thread) are not attributed
+        statements = g.get('sql_statements') if g else None
+        started = getattr(context, '_profiler_start', None)
+        if statements is not None and started is not None:
+            statements.append(((time.perf_counter() - started) * 1000, statement))
+
+    def _before_request(self):
+        g.sql_statements = []
+
+    def _after_request(self, response):
+        statements = g.pop('sql_statements', None)
+        if statements is None:
+            return response
+        shapes = Counter(statement_shape(sql) for _, sql in statements)
+        n_plus_one = {shape: repeats for shape, repeats in shapes.items() if repeats >= self.n_plus_one_threshold}
+        endpoint = request.endpoint or request.path
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats(self.keep_slowest)
+            stats.add(statements, n_plus_one)
+            new_suspects = [shape for shape in n_plus_one if (endpoint, shape) not in self._warned]
+            self._warned.update((endpoint, shape) for shape in new_suspects)
+        for shape in new_suspects:
+            self.app.logger.warning('Kemungkinan N+1 di %s: %dx %s', endpoint, n_plus_one[shape], shape[:200])
+        if self.header:
+            db_ms = sum(ms for ms, _ in statements)
+            response.headers['X-SQL-Stats'] = f'queries={len(statements)}; db_ms={db_ms:.2f}; n_plus_one={len(n_plus_one)}'
+        return response
+
+    def listen(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def install(self):
+        with self.app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            self.listen(engine)
+        self.app.before_request(self._before_request)
+        self.app.after_request(self._after_request)
+
+    def report(self):
+        with self._lock:
+            endpoints = {endpoint: stats.as_dict() for endpoint, stats in self._endpoints.items()}
+        return dict(sorted(endpoints.items(), key=lambda item: -item[1]['total_db_ms']))
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._warned.clear()
+
+def init_app(app):
+    profiler = None
+    if app.config.get('SQL_PROFILING'):
+        profiler = SqlProfiler(app,
+                               keep_slowest=app.config.get('SQL_PROFILING_SLOWEST', 5),
+                               n_plus_one_threshold=app.config.get('SQL_PROFILING_N_PLUS_ONE', 5),
+                               header=app.config.get('SQL_PROFILING_HEADER', False))
+        profiler.install()
+    app.extensions['sql_profiler'] = profiler
+
+def watch(app, engine):
+    """Also time statements of `engine`, created after startup (e.g. the ASGI async-driver engines)."""
+    profiler = app.extensions['sql_profiler']
+    if profiler is not None:
+        profiler.listen(engine)
+
+def enabled():
+    return current_app.extensions['sql_profiler'] is not None
+
+def report():
+    """Per-endpoint statistics of this worker, heaviest total DB time first ({} when disabled)."""
+    profiler = current_app.extensions['sql_profiler']
+    return profiler.report() if profiler is not None else {}
+
+def reset():
+    profiler = current_app.extensions['sql_profiler']
+    if profiler is not None:
+        profiler.reset()
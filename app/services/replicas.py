@@ -0,0 +1,126 @@
+import contextlib
+import functools
+import random
+import time
+import sqlalchemy as sa
+from flask import current_app, session
+from flask_sqlalchemy.session import Session
+
+# Read replicas for the reporting views. DATABASE_REPLICA_URLS lists one or more
+# replicas; each becomes a Flask-SQLAlchemy bind named replica0, replica1, ... Views
+# decorated with @read_replica send their SELECTs to a randomly chosen replica. Every
+# other request, and every write, flush or SELECT ... FOR UPDATE, uses the primary.
+#
+# Read-your-writes: once a request commits a write, the user's session cookie pins the
+# user to the primary for READ_YOUR_WRITES_SECONDS, which should cover the replication
+# lag. Within one request, the first write pins the rest of the request to the primary.
+#
+# This module is imported by app/__init__.py before `db` exists (RoutingSession is the
+# session class), so it reaches the extension through the session or current_app only.
+#
+# Local test: copy the SQLite file (cp app.db replica.db) and start the app with
+# DATABASE_REPLICA_URLS=sqlite:////abs/path/replica.db. Writes then visibly do not reach
+# the reports until the file is copied again. Two local MySQL servers work the same way.
+
+REPLICA = 'replica_bind'
+ENGINE_MAP = 'engine_map'  # set by the ASGI entry point (app/asgi.py): sync engine -> async-driver engine
+WROTE = 'replica_wrote'
+COMMITTED_WRITE = 'replica_committed_write'
+GUARD_COOKIE = 'primary_until'
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends the reads of replica-routed requests to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = None
+        if bind is None:
+            if self._flushing or isinstance(clause, sa.sql.dml.UpdateBase):
+                # Read our own writes for the rest of the request
+                self.info[WROTE] = True
+                self.info.pop(REPLICA, None)
+            elif REPLICA in self.info and isinstance(clause, sa.sql.Select) and clause._for_update_arg is None:
+                engine = self._db.engines[self.info[REPLICA]]
+        if engine is None:
+            engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engine_map = self.info.get(ENGINE_MAP)
+        return engine_map.get(engine, engine) if engine_map else engine
+
+def _int_option(config, name):
+    value = config.get(name)
+    return int(value) if value not in (None, '') else None
+
+def _pool_options(config, prefix):
+    options = {'pool_size': _int_option(config, f'{prefix}_POOL_SIZE'),
+               'max_overflow': _int_option(config, f'{prefix}_MAX_OVERFLOW'),
+               'pool_recycle': _int_option(config, f'{prefix}_POOL_RECYCLE')}
+    return {key: value for key, value in options.items() if value is not None}
+
+def replica_urls(config):
+    urls = config.get('DATABASE_REPLICA_URLS') or ''
+    if isinstance(urls, str):
+        urls = urls.split(',')
+    return [url.strip() for url in urls if url.strip()]
+
+def configure(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS and SQLALCHEMY_BINDS from the DATABASE_* settings.
+
+    Must run before db.init_app(app), which creates the engines.
+    """
+    primary = _pool_options(app.config, 'DATABASE')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**primary, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    replica = _pool_options(app.config, 'DATABASE_REPLICA')
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for i, url in enumerate(replica_urls(app.config)):
+        binds[f'replica{i}'] = {'url': url, **replica}
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+def _after_commit(db_session):
+    if db_session.info.pop(WROTE, False):
+        db_session.info[COMMITTED_WRITE] = True
+
+def _after_soft_rollback(db_session, previous_transaction):
+    db_session.info.pop(WROTE, None)
+
+def init_app(app):
+    keys = [key for key in app.config['SQLALCHEMY_BINDS'] if key.startswith('replica')]
+    app.extensions['replicas'] = keys
+    if not keys:
+        return
+    db = app.extensions['sqlalchemy']
+    if not sa.event.contains(db.session, 'after_commit', _after_commit):
+        sa.event.listen(db.session, 'after_commit', _after_commit)
+        sa.event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
+
+    @app.after_request
+    def pin_to_primary(response):
+        if db.session.info.pop(COMMITTED_WRITE, False):
+            session[GUARD_COOKIE] = time.time() + app.config['READ_YOUR_WRITES_SECONDS']
+        return response
+
+def _session():
+    return current_app.extensions['sqlalchemy'].session
+
+def route_reads():
+    """Send this request's reads to a replica, unless the user wrote something moments ago."""
+    keys = current_app.extensions['replicas']
+    if keys and session.get(GUARD_COOKIE, 0) < time.time():
+        _session().info[REPLICA] = random.choice(keys)
+
+@contextlib.contextmanager
+def on_primary():
+    """Read from the primary inside the block, e.g. to fill a cache shared with other requests."""
+    info = _session().info
+    replica = info.pop(REPLICA, None)
+    try:
+        yield
+    finally:
+        if replica is not None and not info.get(WROTE):
+            info[REPLICA] = replica
+
+def read_replica(f):
+    """View decorator: the view only reads, so its queries may go to a replica."""
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        route_reads()
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,210 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from app import db
+from app.models import Produk, TransaksiMasuk, TransaksiKeluar, PenjualanHarian
+from app.services import archive
+
+# Sales reports are answered from penjualan_harian, one row per product per day, instead
+# of the raw transaction tables. The stock write paths add their movements to today's
+# row inside their own transaction with a single upsert, so the rollups commit (or roll
+# back) together with the sale. `flask report backfill` rebuilds a date range from the
+# raw tables and the archives, e.g. after restoring a backup.
+#
+# Days are UTC dates, like every timestamp the app stores. Revenue uses the price at
+# the time of sale; backfilled days use the current price, since older prices are not kept.
+
+PERIODS = ('hari', 'minggu', 'bulan')
+
+SalesTotals = namedtuple('SalesTotals', 'unit_keluar omzet unit_masuk')
+PeriodRow = namedtuple('PeriodRow', 'mulai unit_keluar omzet')
+ProductRow = namedtuple('ProductRow', 'produk_id nama kategori unit_keluar omzet')
+CategoryRow = namedtuple('CategoryRow', 'kategori unit_keluar omzet')
+
+_COLUMNS = ('unit_keluar', 'omzet', 'unit_masuk')
+
+def _upsert_statement():
+    table = PenjualanHarian.__table__
+    dialect = db.session.get_bind(mapper=PenjualanHarian).dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update({name: table.c[name] + stmt.inserted[name] for name in _COLUMNS})
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(index_elements=['tanggal', 'produk_id'],
+                                          set_={name: table.c[name] + stmt.excluded[name] for name in _COLUMNS})
+    return None
+
+def _add(rows):
+    rows = [{'unit_keluar': 0, 'omzet': 0, 'unit_masuk': 0, **row} for row in rows]
+    if not rows:
+        return
+    stmt = _upsert_statement()
+    if stmt is not None:
+        db.session.execute(stmt, rows)
+        return
+    # Generic fallback: increment, insert where the day's row does not exist yet
+    table = PenjualanHarian.__table__
+    for row in rows:
+        result = db.session.execute(
+            table.update()
+            .where(table.c.tanggal == row['tanggal'], table.c.produk_id == row['produk_id'])
+            .values({name: table.c[name] + row[name] for name in _COLUMNS}))
+        if result.rowcount == 0:
+            db.session.execute(table.insert().values(row))
+
+def record_sales(lines, when=None):
+    """Add outgoing (produk_id, quantity, harga) lines to the day's rollups, in the caller's transaction."""
+    tanggal = (when or datetime.utcnow()).date()
+    _add([{'tanggal': tanggal, 'produk_id': produk_id, 'unit_keluar': quantity, 'omzet': quantity * harga}
+          for produk_id, quantity, harga in lines])
+
+def record_receipts(lines, when=None):
+    """Add incoming (produk_id, quantity) lines to the day's rollups, in the caller's transaction."""
+    tanggal = (when or datetime.utcnow()).date()
+    _add([{'tanggal': tanggal, 'produk_id': produk_id, 'unit_masuk': quantity} for produk_id, quantity in lines])
+
+def _archived_movements(table, month, date_from, date_to, prices):
+    """(tanggal, produk_id, jumlah) archived for `month` ('YYYY-MM') within [date_from, date_to]."""
+    spec = archive.ARCHIVE_TABLES[table]
+    if month not in archive.archived_months(table):
+        return
+    for row in archive.read_month(table, month):
+        tanggal = getattr(row, spec.time_attr).date()
+        if row.produk_id in prices and date_from <= tanggal <= date_to and not getattr(row, 'mutasi', False):
+            yield tanggal, row.produk_id, row.jumlah
+
+def _live_movements(model, time_column, date_from, date_to, batch_size):
+    # Inter-branch transfers (mutasi) move stock without selling or buying it
+    stmt = db.select(time_column, model.produk_id, model.jumlah).where(
+        db.not_(model.mutasi),
+        time_column >= datetime.combine(date_from, datetime.min.time()),
+        time_column < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for timestamp, produk_id, jumlah in result:
+        yield timestamp.date(), produk_id, jumlah
+
+def _first_day():
+    """Earliest day with any live or archived movement, or None."""
+    candidates = [db.session.query(db.func.min(TransaksiKeluar.tanggal_keluar)).scalar(),
+                  db.session.query(db.func.min(TransaksiMasuk.tanggal_masuk)).scalar()]
+    days = [value.date() for value in candidates if value is not None]
+    for table in ('transaksi_keluar', 'transaksi_masuk'):
+        months = archive.archived_months(table)
+        if months:
+            days.append(datetime.strptime(months[-1], '%Y-%m').date())
+    return min(days) if days else None
+
+def _rebuild_window(date_from, date_to, prices, batch_size):
+    table = PenjualanHarian.__table__
+    month = date_from.strftime('%Y-%m')
+    totals = {}
+    sources = (
+        ('unit_keluar', _live_movements(TransaksiKeluar, TransaksiKeluar.tanggal_keluar, date_from, date_to, batch_size)),
+        ('unit_keluar', _archived_movements('transaksi_keluar', month, date_from, date_to, prices)),
+        ('unit_masuk', _live_movements(TransaksiMasuk, TransaksiMasuk.tanggal_masuk, date_from, date_to, batch_size)),
+        ('unit_masuk', _archived_movements('transaksi_masuk', month, date_from, date_to, prices)),
+    )
+    for column, movements in sources:
+        for tanggal, produk_id, jumlah in movements:
+            row = totals.get((tanggal, produk_id))
+            if row is None:
+                row = totals[(tanggal, produk_id)] = {'tanggal': tanggal, 'produk_id': produk_id,
+                                                      'unit_keluar': 0, 'omzet': 0, 'unit_masuk': 0}
+            row[column] += jumlah
+            if column == 'unit_keluar':
+                row['omzet'] += jumlah * prices.get(produk_id, 0)
+
+    db.session.execute(table.delete().where(table.c.tanggal >= date_from, table.c.tanggal <= date_to))
+    rows = sorted(totals.values(), key=lambda row: (row['tanggal'], row['produk_id']))
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[start:start + batch_size])
+    db.session.commit()
+    return len(rows)
+
+def rebuild(date_from=None, date_to=None, batch_size=10000, progress=None):
+    """Recompute the rollups of [date_from, date_to] from the raw tables and the archives.
+
+    The range defaults to the first recorded movement up to today. Work is done one
+    calendar month per transaction, so memory is bounded by a month of rollups. Writes
+    from the live paths during a rebuild may be counted twice or lost for the rebuilt
+    days; run it when the shop is closed. `progress(month, rows)` is called per month.
+    Returns the number of rollup rows written.
+    """
+    date_from = date_from or _first_day()
+    date_to = date_to or datetime.utcnow().date()
+    if date_from is None or date_from > date_to:
+        return 0
+    prices = dict(db.session.query(Produk.id, Produk.harga).all())
+    written = 0
+    window_start = date_from
+    while window_start <= date_to:
+        next_month = (window_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        window_end = min(next_month - timedelta(days=1), date_to)
+        rows = _rebuild_window(window_start, window_end, prices, batch_size)
+        written += rows
+        if progress:
+            progress(window_start.strftime('%Y-%m'), rows)
+        window_start = next_month
+    return written
+
+def _in_range(query, date_from, date_to):
+    return query.filter(PenjualanHarian.tanggal >= date_from, PenjualanHarian.tanggal <= date_to)
+
+def totals(date_from, date_to):
+    row = _in_range(db.session.query(
+        db.func.coalesce(db.func.sum(PenjualanHarian.unit_keluar), 0),
+        db.func.coalesce(db.func.sum(PenjualanHarian.omzet), 0),
+        db.func.coalesce(db.func.sum(PenjualanHarian.unit_masuk), 0)), date_from, date_to).one()
+    return SalesTotals(int(row[0]), int(row[1]), int(row[2]))
+
+def _period_start(tanggal, period):
+    if period == 'minggu':
+        return tanggal - timedelta(days=tanggal.weekday())
+    if period == 'bulan':
+        return tanggal.replace(day=1)
+    return tanggal
+
+def by_period(date_from, date_to, period='hari'):
+    """Units and revenue per day, week (starting Monday) or month of the range, empty periods included."""
+    daily = dict((tanggal, (unit, omzet)) for tanggal, unit, omzet in _in_range(
+        db.session.query(PenjualanHarian.tanggal, db.func.sum(PenjualanHarian.unit_keluar),
+                         db.func.sum(PenjualanHarian.omzet)), date_from, date_to)
+        .group_by(PenjualanHarian.tanggal).all())
+    buckets = {}
+    tanggal = date_from
+    while tanggal <= date_to:
+        unit, omzet = daily.get(tanggal, (0, 0))
+        bucket = buckets.setdefault(_period_start(tanggal, period), [0, 0])
+        bucket[0] += int(unit or 0)
+        bucket[1] += int(omzet or 0)
+        tanggal += timedelta(days=1)
+    return [PeriodRow(mulai, unit, omzet) for mulai, (unit, omzet) in buckets.items()]
+
+def top_products(date_from, date_to, limit=10, order='omzet'):
+    """Best sellers of the range by revenue ('omzet') or units ('unit')."""
+    unit = db.func.sum(PenjualanHarian.unit_keluar).label('unit_keluar')
+    omzet = db.func.sum(PenjualanHarian.omzet).label('omzet')
+    rows = _in_range(db.session.query(Produk.id, Produk.nama, Produk.kategori, unit, omzet)
+                     .join(Produk, Produk.id == PenjualanHarian.produk_id), date_from, date_to) \
+        .group_by(Produk.id, Produk.nama, Produk.kategori) \
+        .having(db.func.sum(PenjualanHarian.unit_keluar) > 0) \
+        .order_by((unit if order == 'unit' else omzet).desc(), Produk.id) \
+        .limit(limit).all()
+    return [ProductRow(row[0], row[1], row[2], int(row[3]), int(row[4])) for row in rows]
+
+def by_category(date_from, date_to):
+    rows = _in_range(db.session.query(Produk.kategori, db.func.sum(PenjualanHarian.unit_keluar),
+                                      db.func.sum(PenjualanHarian.omzet))
+                     .join(Produk, Produk.id == PenjualanHarian.produk_id), date_from, date_to) \
+        .group_by(Produk.kategori).order_by(db.func.sum(PenjualanHarian.omzet).desc()).all()
+    return [CategoryRow(kategori or '-', int(unit or 0), int(omzet or 0)) for kategori, unit, omzet in rows]
+
+def default_range(days=30):
+    """The last `days` days up to today (UTC), inclusive."""
+    today = datetime.utcnow().date()
+    return today - timedelta(days=days - 1), today
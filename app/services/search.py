@@ -0,0 +1,94 @@
+import bisect
+import heapq
+import re
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+def normalize(text):
+    return ' '.join(_WORD_RE.findall((text or '').lower()))
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class SearchIndex:
+    """Prefix + substring index over product names and categories.
+
+    Built from a catalog snapshot (see app/services/catalog.py) and rebuilt only when
+    product names change; it holds ids, not items, so stock updates can reuse it.
+    Prefix lookups bisect a sorted word list;
+    substring lookups intersect trigram posting sets and verify the few candidates,
+    so neither scans the whole catalog.
+    """
+
+    def __init__(self, items):
+        self._sort_key = {item.id: (item.nama.lower(), item.id) for item in items}
+        self._haystack = {}
+        self._trigrams = {}
+        words = []
+        for item in items:
+            text = normalize(f'{item.nama} {item.kategori or ""}')
+            self._haystack[item.id] = text
+            for word in set(text.split()):
+                words.append((word, item.id))
+            for gram in _trigrams(text):
+                self._trigrams.setdefault(gram, set()).add(item.id)
+        words.sort()
+        self._word_keys = [word for word, _ in words]
+        self._word_ids = [produk_id for _, produk_id in words]
+        texts = sorted((text, produk_id) for produk_id, text in self._haystack.items())
+        self._text_keys = [text for text, _ in texts]
+        self._text_ids = [produk_id for _, produk_id in texts]
+
+    @staticmethod
+    def _prefix_range(keys, ids, prefix):
+        ids_found = set()
+        i = bisect.bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            ids_found.add(ids[i])
+            i += 1
+        return ids_found
+
+    def _substring_ids(self, query):
+        grams = _trigrams(query)
+        if not grams:
+            return set()
+        postings = sorted((self._trigrams.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return {produk_id for produk_id in candidates if query in self._haystack[produk_id]}
+
+    def search(self, query, limit=10):
+        """Return the ids of up to `limit` items matching `query`, best matches first.
+
+        Matches are ranked in tiers, each tier ordered by name:
+        1. the name/category text starts with the query;
+        2. every query word starts some word (so "sam gal" finds "Samsung Galaxy");
+        3. queries of 3+ characters found anywhere inside the text.
+        Lower tiers are only computed when the higher ones return fewer than `limit` items.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        tiers = [self._prefix_range(self._text_keys, self._text_ids, query)]
+
+        terms = query.split()
+        word_matches = self._prefix_range(self._word_keys, self._word_ids, terms[0])
+        for term in terms[1:]:
+            if not word_matches:
+                break
+            word_matches &= self._prefix_range(self._word_keys, self._word_ids, term)
+        tiers.append(word_matches - tiers[0])
+
+        results = []
+        seen = set()
+        for position in range(3):
+            if position == 2:
+                if len(query) < 3:
+                    break
+                tiers.append(self._substring_ids(query) - seen)
+            tier = tiers[position]
+            results.extend(heapq.nsmallest(limit - len(results), tier, key=self._sort_key.__getitem__))
+            seen |= tier
+            if len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,139 @@
+from collections import namedtuple
+from datetime import datetime
+from app import db
+from app.models import Produk, TransaksiMasuk, TransaksiKeluar, SnapshotStok
+from app.services import archive
+
+# Point-in-time stock. `flask stock snapshot` (run from cron, e.g. nightly) copies every
+# Produk.stok into snapshot_stok under one timestamp. Stock at any moment T is then the
+# snapshot nearest to T, rolled forward or backward by the ledger movements between
+# the two. Only the movements of one snapshot interval are scanned, however long the
+# history. Current Produk.stok acts as a snapshot taken "now".
+#
+# The same arithmetic gives the drift check: latest snapshot + movements since should
+# equal Produk.stok. A difference means stock changed without a ledger row (e.g. a
+# manual UPDATE on the database) or a write path is broken.
+
+StockAt = namedtuple('StockAt', 'waktu basis stok')
+Drift = namedtuple('Drift', 'produk_id nama stok expected selisih')
+
+_LEDGER = (
+    (TransaksiMasuk, TransaksiMasuk.tanggal_masuk, 'transaksi_masuk', 1),
+    (TransaksiKeluar, TransaksiKeluar.tanggal_keluar, 'transaksi_keluar', -1),
+)
+
+def take(prune_before=None):
+    """Snapshot every product's current stock; optionally delete snapshots older than `prune_before`.
+
+    Returns (waktu, products). Commits.
+    """
+    # Lock the product rows before taking the time. Stock writers update Produk before
+    # inserting their ledger row, so on a row-locking database every movement reflected
+    # in the stock read here is timestamped before `waktu`, and every later one after it.
+    rows = db.session.execute(db.select(Produk.id, Produk.stok).with_for_update()).all()
+    waktu = datetime.utcnow()
+    if rows:
+        db.session.execute(db.insert(SnapshotStok),
+                           [{'waktu': waktu, 'produk_id': produk_id, 'stok': stok} for produk_id, stok in rows])
+    if prune_before:
+        db.session.execute(db.delete(SnapshotStok).where(SnapshotStok.waktu < min(prune_before, waktu)))
+    db.session.commit()
+    return waktu, len(rows)
+
+def _month_overlaps(month, start, end):
+    month_start = datetime.strptime(month, '%Y-%m')
+    month_end = month_start.replace(year=month_start.year + month_start.month // 12,
+                                    month=month_start.month % 12 + 1)
+    return (start is None or month_end > start) and (end is None or month_start <= end)
+
+def net_movements(start, end, produk_ids=None):
+    """Units received minus units sold per product, for movements with start < time <= end.
+
+    Either bound may be None (open). Archived months overlapping the range are included.
+    Only movements of the central stock (Produk.stok, no branch) are counted.
+    """
+    net = {}
+    for model, time_column, table, sign in _LEDGER:
+        query = db.session.query(model.produk_id, db.func.sum(model.jumlah)).filter(model.cabang_id.is_(None))
+        if start is not None:
+            query = query.filter(time_column > start)
+        if end is not None:
+            query = query.filter(time_column <= end)
+        if produk_ids is not None:
+            query = query.filter(model.produk_id.in_(produk_ids))
+        for produk_id, jumlah in query.group_by(model.produk_id):
+            net[produk_id] = net.get(produk_id, 0) + sign * int(jumlah)
+
+        time_attr = archive.ARCHIVE_TABLES[table].time_attr
+        for month in archive.archived_months(table):
+            if not _month_overlaps(month, start, end):
+                continue
+            for row in archive.read_month(table, month):
+                timestamp = getattr(row, time_attr)
+                # Rows archived before branches existed have no cabang_id
+                if (start is None or timestamp > start) and (end is None or timestamp <= end) \
+                        and (produk_ids is None or row.produk_id in produk_ids) \
+                        and getattr(row, 'cabang_id', None) is None:
+                    net[row.produk_id] = net.get(row.produk_id, 0) + sign * row.jumlah
+    return net
+
+def _snapshot(waktu, produk_ids=None):
+    query = db.session.query(SnapshotStok.produk_id, SnapshotStok.stok).filter(SnapshotStok.waktu == waktu)
+    if produk_ids is not None:
+        query = query.filter(SnapshotStok.produk_id.in_(produk_ids))
+    return dict(query.all())
+
+def _current(produk_ids=None):
+    query = db.session.query(Produk.id, Produk.stok)
+    if produk_ids is not None:
+        query = query.filter(Produk.id.in_(produk_ids))
+    return dict(query.all())
+
+def latest_snapshot():
+    return db.session.query(db.func.max(SnapshotStok.waktu)).scalar()
+
+def stock_at(when, produk_ids=None):
+    """Stock per product after every movement up to and including `when`.
+
+    Starts from whichever is closest in time: the last snapshot before `when`, the first
+    one after it, or the current stock. Returns a StockAt(waktu, basis, stok) where `stok`
+    maps produk_id to units.
+    """
+    produk_ids = set(produk_ids) if produk_ids is not None else None
+    now = datetime.utcnow()
+    before = db.session.query(db.func.max(SnapshotStok.waktu)).filter(SnapshotStok.waktu <= when).scalar()
+    after = db.session.query(db.func.min(SnapshotStok.waktu)).filter(SnapshotStok.waktu > when).scalar()
+
+    if before is not None and (when - before) <= ((after or now) - when):
+        stok = _snapshot(before, produk_ids)
+        for produk_id, units in net_movements(before, when, produk_ids).items():
+            stok[produk_id] = stok.get(produk_id, 0) + units
+        return StockAt(when, f'snapshot {before:%Y-%m-%d %H:%M:%S} + mutasi', stok)
+
+    if after is not None:
+        stok, basis = _snapshot(after, produk_ids), f'snapshot {after:%Y-%m-%d %H:%M:%S} - mutasi'
+    else:
+        stok, basis = _current(produk_ids), 'stok saat ini - mutasi'
+    for produk_id, units in net_movements(when, after, produk_ids).items():
+        stok[produk_id] = stok.get(produk_id, 0) - units
+    return StockAt(when, basis, stok)
+
+def drift(produk_ids=None):
+    """Products whose Produk.stok differs from the latest snapshot plus the ledger since.
+
+    Without any snapshot the whole ledger is replayed. Returns (snapshot waktu or None,
+    list of Drift). A sale committing while this runs can show up as a one-off difference;
+    re-run before acting on it.
+    """
+    produk_ids = set(produk_ids) if produk_ids is not None else None
+    latest = latest_snapshot()
+    expected = _snapshot(latest, produk_ids) if latest is not None else {}
+    for produk_id, units in net_movements(latest, None, produk_ids).items():
+        expected[produk_id] = expected.get(produk_id, 0) + units
+
+    query = db.session.query(Produk.id, Produk.nama, Produk.stok).order_by(Produk.id)
+    if produk_ids is not None:
+        query = query.filter(Produk.id.in_(produk_ids))
+    drifts = [Drift(produk_id, nama, stok, expected.get(produk_id, 0), stok - expected.get(produk_id, 0))
+              for produk_id, nama, stok in query if stok != expected.get(produk_id, 0)]
+    return latest, drifts
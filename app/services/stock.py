@@ -0,0 +1,244 @@
+from app import db
+from app.models import Produk, StokCabang, TransaksiMasuk, TransaksiKeluar
+from app.services import audit, catalog, counters, sales
+
+# All stock mutations go through a single conditional UPDATE so the check and the
+# change happen atomically inside the database. Two workers selling the last unit
+# can no longer both pass a Python-side `stok >= jumlah` check: the second UPDATE
+# simply matches zero rows. On MySQL/InnoDB the UPDATE also takes the row lock for
+# the rest of the transaction, so the TransaksiKeluar insert is serialized with it.
+#
+# Stock lives in one of two places: Produk.stok is the central stock (cabang_id None,
+# the only stock of a single-outlet shop), and stok_cabang holds one row per branch
+# and product. A movement with a cabang_id locks only that branch's stock row.
+# It still updates rows shared by every branch in the same transaction: the ringkasan
+# counters (TOTAL_*, the change counters, the latter also via catalog.invalidate) and
+# the day's penjualan_harian row of the product. Concurrent movements therefore queue
+# on those rows for the rest of their transaction, whichever branch they come from.
+
+def _stock_rows(cabang_id, produk_ids):
+    """(model, product key column, WHERE clauses) selecting the stock rows of `produk_ids` at `cabang_id`."""
+    if cabang_id is None:
+        return Produk, Produk.id, [Produk.id.in_(produk_ids)]
+    return StokCabang, StokCabang.produk_id, [StokCabang.cabang_id == cabang_id, StokCabang.produk_id.in_(produk_ids)]
+
+def _branch_upsert_statement(session):
+    table = StokCabang.__table__
+    dialect = session.get_bind(mapper=StokCabang).dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update(stok=table.c.stok + stmt.inserted.stok)
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(index_elements=['cabang_id', 'produk_id'],
+                                          set_={'stok': table.c.stok + stmt.excluded.stok})
+    return None
+
+def increment_stock(produk_id, quantity, session=None, cabang_id=None):
+    """Add `quantity` units to a product (at branch `cabang_id`). Returns the number of rows updated (0 if the product is gone)."""
+    session = session or db.session
+    if cabang_id is None:
+        result = session.execute(
+            db.update(Produk)
+            .where(Produk.id == produk_id)
+            .values(stok=Produk.stok + quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    if not session.query(db.exists().where(Produk.id == produk_id)).scalar():
+        return 0
+    # The branch's row is created by its first receipt
+    stmt = _branch_upsert_statement(session)
+    if stmt is not None:
+        session.execute(stmt, [{'cabang_id': cabang_id, 'produk_id': produk_id, 'stok': quantity}])
+        return 1
+    table = StokCabang.__table__
+    result = session.execute(
+        table.update()
+        .where(table.c.cabang_id == cabang_id, table.c.produk_id == produk_id)
+        .values(stok=table.c.stok + quantity))
+    if result.rowcount == 0:
+        session.execute(table.insert().values(cabang_id=cabang_id, produk_id=produk_id, stok=quantity))
+    return 1
+
+def decrement_stock(produk_id, quantity, session=None, cabang_id=None):
+    """Remove `quantity` units only if enough stock is left (at branch `cabang_id`). Returns the number of rows updated (0 or 1)."""
+    session = session or db.session
+    model, _, where = _stock_rows(cabang_id, [produk_id])
+    result = session.execute(
+        db.update(model)
+        .where(*where, model.stok >= quantity)
+        .values(stok=model.stok - quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def available(produk_id, cabang_id=None):
+    """Units of a product in stock (at branch `cabang_id`)."""
+    model, _, where = _stock_rows(cabang_id, [produk_id])
+    return db.session.query(model.stok).filter(*where).scalar() or 0
+
+def receive_stock(product, quantity, user_id, aktivitas, cabang_id=None):
+    """Record an incoming movement: stock UPDATE, TransaksiMasuk and an activity entry in the current transaction.
+
+    Returns the number of product rows updated. The caller commits.
+    """
+    updated = increment_stock(product.id, quantity, cabang_id=cabang_id)
+    if updated:
+        db.session.add(TransaksiMasuk(produk_id=product.id, jumlah=quantity, user_id=user_id, cabang_id=cabang_id))
+        audit.log(user_id, aktivitas, cabang_id)
+        counters.bump(counters.TOTAL_INCOMING, quantity)
+        counters.touch(counters.CHANGES_TRANSACTIONS)
+        sales.record_receipts([(product.id, quantity)])
+        catalog.invalidate()
+    return updated
+
+def issue_stock(product, quantity, user_id, aktivitas, cabang_id=None):
+    """Record an outgoing movement if stock allows it, in the current transaction.
+
+    Returns the number of product rows updated; 0 means the stock was insufficient
+    (or the product disappeared) and nothing was written. The caller commits.
+    """
+    updated = decrement_stock(product.id, quantity, cabang_id=cabang_id)
+    if updated:
+        db.session.add(TransaksiKeluar(produk_id=product.id, jumlah=quantity, user_id=user_id, cabang_id=cabang_id))
+        audit.log(user_id, aktivitas, cabang_id)
+        counters.bump(counters.TOTAL_OUTGOING, quantity)
+        counters.touch(counters.CHANGES_TRANSACTIONS)
+        sales.record_sales([(product.id, quantity, product.harga)])
+        catalog.invalidate()
+    return updated
+
+def adjust_stock(product, stok, user_id, aktivitas):
+    """Set the central stock of a product to `stok` (a stock-take correction), in the current transaction.
+
+    The difference to the locked current stock goes into the ledger as one row flagged
+    `mutasi`, so a correction keeps the drift check clean without counting as a sale
+    or purchase. Returns the difference (0 writes nothing). The caller commits.
+    """
+    current = db.session.execute(
+        db.select(Produk.stok).where(Produk.id == product.id).with_for_update()).scalar()
+    selisih = stok - (current or 0)
+    if current is None or not selisih:
+        return 0
+    db.session.execute(
+        db.update(Produk)
+        .where(Produk.id == product.id)
+        .values(stok=stok)
+        .execution_options(synchronize_session=False)
+    )
+    model = TransaksiMasuk if selisih > 0 else TransaksiKeluar
+    db.session.add(model(produk_id=product.id, jumlah=abs(selisih), user_id=user_id, mutasi=True))
+    audit.log(user_id, aktivitas)
+    counters.touch(counters.CHANGES_TRANSACTIONS)
+    catalog.invalidate()
+    return selisih
+
+def transfer_stock(product, quantity, user_id, dari, ke, aktivitas):
+    """Move `quantity` units from branch `dari` to branch `ke` (None = central stock), in the current transaction.
+
+    The source decrement, the destination increment and both ledger rows (flagged
+    `mutasi`, so they never count as sales or purchases) commit or roll back together.
+    Returns the number of source rows updated; 0 means the source stock was
+    insufficient and nothing was written. The caller commits.
+    """
+    if dari == ke:
+        raise ValueError('Cabang asal dan tujuan sama.')
+    # Lock both ends in a fixed order (central row first, then branches by id), so two
+    # opposite transfers of the same product cannot deadlock
+    if dari is None or ke is None:
+        db.session.execute(db.select(Produk.id).where(Produk.id == product.id).with_for_update())
+    branches = sorted(cabang_id for cabang_id in (dari, ke) if cabang_id is not None)
+    db.session.execute(db.select(StokCabang.cabang_id).where(
+        StokCabang.cabang_id.in_(branches), StokCabang.produk_id == product.id)
+        .order_by(StokCabang.cabang_id).with_for_update())
+
+    updated = decrement_stock(product.id, quantity, cabang_id=dari)
+    if updated:
+        increment_stock(product.id, quantity, cabang_id=ke)
+        db.session.add(TransaksiKeluar(produk_id=product.id, jumlah=quantity, user_id=user_id, cabang_id=dari, mutasi=True))
+        db.session.add(TransaksiMasuk(produk_id=product.id, jumlah=quantity, user_id=user_id, cabang_id=ke, mutasi=True))
+        audit.log(user_id, aktivitas, dari)
+        # No TOTAL_INCOMING/TOTAL_OUTGOING bump: the goods never left the shop
+        counters.touch(counters.CHANGES_TRANSACTIONS)
+        catalog.invalidate()
+    return updated
+
+class InsufficientStock(ValueError):
+    """Raised when a checkout cannot be fulfilled; nothing has been written when this is raised."""
+    pass
+
+def checkout(lines, user_id, aktivitas_prefix='', cabang_id=None):
+    """Sell several products as one receipt in a single transaction.
+
+    `lines` is an iterable of (produk_id, quantity). Duplicate products are merged.
+    The whole sale costs a constant number of statements regardless of line count:
+    one SELECT ... FOR UPDATE over all stock rows, one conditional UPDATE using CASE,
+    one executemany INSERT into transaksi_keluar, one counter update, one rollup upsert
+    and one activity row. With `cabang_id` the branch's stock rows are sold from
+    (plus one unlocked SELECT of the products for names and prices). Raises
+    InsufficientStock (after rolling back) if any line cannot be fulfilled.
+    Returns the list of (Produk, quantity) sold. The caller commits.
+    """
+    quantities = {}
+    for produk_id, quantity in lines:
+        quantities[produk_id] = quantities.get(produk_id, 0) + quantity
+    if not quantities:
+        raise InsufficientStock('Keranjang kosong.')
+
+    model, key, where = _stock_rows(cabang_id, quantities)
+    if cabang_id is None:
+        products = db.session.execute(
+            db.select(Produk).where(Produk.id.in_(quantities)).with_for_update(),
+            execution_options={'populate_existing': True}
+        ).scalars().all()
+        levels = {product.id: product.stok for product in products}
+    else:
+        products = db.session.execute(db.select(Produk).where(Produk.id.in_(quantities))).scalars().all()
+        levels = dict(db.session.execute(db.select(key, model.stok).where(*where).with_for_update()).all())
+    products_by_id = {product.id: product for product in products}
+
+    missing = [produk_id for produk_id in quantities if produk_id not in products_by_id]
+    if missing:
+        db.session.rollback()
+        raise InsufficientStock('Produk tidak ditemukan.')
+    short = [produk_id for produk_id, quantity in quantities.items() if levels.get(produk_id, 0) < quantity]
+    if short:
+        message = ', '.join(f'{products_by_id[produk_id].nama} (tersedia {levels.get(produk_id, 0)})'
+                            for produk_id in short)
+        db.session.rollback()
+        raise InsufficientStock(f'Stok tidak mencukupi: {message}.')
+
+    quantity_case = db.case(quantities, value=key)
+    result = db.session.execute(
+        db.update(model)
+        .where(*where, model.stok >= quantity_case)
+        .values(stok=model.stok - quantity_case)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(quantities):
+        # Only reachable on backends without row locks (SQLite) when another writer got in first
+        db.session.rollback()
+        raise InsufficientStock('Stok berubah saat transaksi diproses. Silakan coba lagi.')
+
+    db.session.execute(
+        db.insert(TransaksiKeluar),
+        [{'produk_id': produk_id, 'jumlah': quantity, 'user_id': user_id, 'cabang_id': cabang_id}
+         for produk_id, quantity in quantities.items()]
+    )
+    counters.bump(counters.TOTAL_OUTGOING, sum(quantities.values()))
+    counters.touch(counters.CHANGES_TRANSACTIONS)
+    sales.record_sales([(produk_id, quantity, products_by_id[produk_id].harga)
+                        for produk_id, quantity in quantities.items()])
+    catalog.invalidate()
+
+    sold = [(products_by_id[produk_id], quantity) for produk_id, quantity in quantities.items()]
+    summary = ', '.join(f'{quantity} unit {product.nama}' for product, quantity in sold)
+    audit.log(user_id, f'{aktivitas_prefix}Checkout {len(sold)} produk: {summary}', cabang_id)
+    return sold
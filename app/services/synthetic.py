@@ -0,0 +1,193 @@
+import random
+from datetime import datetime, timedelta
+from app import db
+from app.models import User, Produk, TransaksiMasuk, TransaksiKeluar, RiwayatAktivitas
+from app.services import catalog, counters, passwords, sales
+
+# Synthetic shop data for load testing. History rows are generated day by day in
+# chronological order and written with executemany INSERTs in chunks, so memory stays
+# flat at millions of rows. The distributions are deliberately shop-like:
+#   * product popularity follows a Zipf curve (a few best sellers, a long tail);
+#   * traffic grows over the period, peaks in the evening and is higher on weekends;
+#   * sales are mostly single units, restocks come in boxes.
+# Final Produk.stok equals received minus sold units, so the data passes the same
+# consistency checks as real data.
+
+CHUNK_SIZE = 10000
+
+# Relative traffic per hour of day (shop opens 09:00, closes 22:00)
+HOUR_WEIGHTS = {9: 3, 10: 5, 11: 6, 12: 7, 13: 6, 14: 5, 15: 5, 16: 6, 17: 8, 18: 10, 19: 10, 20: 8, 21: 4}
+WEEKEND_FACTOR = 1.4
+GROWTH = 0.5  # the last day sees 50% more traffic than the first
+
+PHONES = [('Samsung Galaxy A', 1500000, 6000000), ('Xiaomi Redmi Note ', 1800000, 4500000),
+          ('Oppo Reno', 3500000, 8000000), ('Vivo Y', 1400000, 3500000), ('iPhone ', 9000000, 25000000)]
+ACCESSORIES = ['Case', 'Tempered Glass', 'Charger', 'Kabel Data', 'Earphone', 'Powerbank', 'Holder', 'Memory Card']
+BRANDS = ['Samsung', 'Xiaomi', 'Oppo', 'Vivo', 'iPhone', 'Anker', 'Baseus', 'Robot']
+
+class SyntheticResult:
+
+    def __init__(self):
+        self.users = 0
+        self.products = 0
+        self.incoming = 0
+        self.outgoing = 0
+        self.activities = 0
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+def _insert_chunks(model, rows, progress=None):
+    """executemany-INSERT an iterable of dicts in CHUNK_SIZE chunks, one commit per chunk."""
+    written = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.session.execute(db.insert(model), chunk)
+            db.session.commit()
+            written += len(chunk)
+            chunk = []
+            if progress:
+                progress(model.__tablename__, written)
+    if chunk:
+        db.session.execute(db.insert(model), chunk)
+        db.session.commit()
+        written += len(chunk)
+        if progress:
+            progress(model.__tablename__, written)
+    return written
+
+def _daily_counts(total, days, start, rng):
+    weights = []
+    for day in range(days):
+        date = start + timedelta(days=day)
+        weight = 1 + GROWTH * day / max(days - 1, 1)
+        if date.weekday() >= 5:
+            weight *= WEEKEND_FACTOR
+        weights.append(weight)
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    for day in rng.choices(range(days), weights=weights, k=total - sum(counts)):
+        counts[day] += 1
+    return counts
+
+def _timestamps(total, days, start, rng):
+    """Yield `total` timestamps over `days` days from `start`, in ascending order."""
+    hours = list(HOUR_WEIGHTS)
+    hour_weights = list(HOUR_WEIGHTS.values())
+    for day, count in enumerate(_daily_counts(total, days, start, rng)):
+        date = start + timedelta(days=day)
+        offsets = sorted(hour * 3600 + rng.randrange(3600)
+                         for hour in rng.choices(hours, weights=hour_weights, k=count))
+        for offset in offsets:
+            yield date + timedelta(seconds=offset)
+
+def _product_rows(count, offset, rng):
+    for i in range(offset, offset + count):
+        if rng.random() < 0.3:
+            seri, low, high = rng.choice(PHONES)
+            yield {'nama': f'{seri}{10 + i}', 'harga': rng.randrange(low, high, 50000),
+                   'stok': 0, 'kategori': 'HP', 'gambar': None}
+        else:
+            yield {'nama': f'{rng.choice(ACCESSORIES)} {rng.choice(BRANDS)} {100 + i}',
+                   'harga': rng.randrange(15000, 500000, 5000), 'stok': 0,
+                   'kategori': 'Aksesoris', 'gambar': None}
+
+def generate(users=50, products=1000, outgoing=100000, incoming=None, activities=None,
+             days=365, password='password', prefix='sintetis', seed=None, progress=None):
+    """Bulk-insert synthetic users, products, transactions and activity entries.
+
+    `incoming` defaults to a tenth of `outgoing` (restocks, grown where needed so stock
+    never ends negative); `activities` defaults to one entry per transaction. Names are
+    numbered after any existing `prefix` users, so the command can be run repeatedly.
+    `progress(table, rows_written)` is called after every chunk. Returns a SyntheticResult.
+    """
+    rng = random.Random(seed)
+    result = SyntheticResult()
+    incoming = outgoing // 10 if incoming is None else incoming
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+
+    # Users: one bcrypt hash shared by all rows, hashing thousands would take minutes
+    password_hash = passwords.hash_password(password)
+    existing = User.query.filter(User.username.like(f'{prefix}%')).count()
+    roles = ['admin'] * 2 + ['staf'] * 17 + ['pending']
+    result.users = _insert_chunks(User, (
+        {'username': f'{prefix}{existing + i:06d}', 'password': password_hash,
+         'role': 'admin' if i == 0 else rng.choice(roles)} for i in range(users)), progress)
+    cashiers = [user_id for user_id, in db.session.query(User.id).filter(
+        User.username.like(f'{prefix}%'), User.role.in_(['admin', 'staf']))]
+
+    first_new_product = (db.session.query(db.func.max(Produk.id)).scalar() or 0) + 1
+    result.products = _insert_chunks(Produk, _product_rows(products, first_new_product, rng), progress)
+    catalog_rows = db.session.query(Produk.id, Produk.nama).filter(Produk.id >= first_new_product).all()
+    product_ids = [row.id for row in catalog_rows]
+    names = {row.id: row.nama for row in catalog_rows}
+    if not product_ids or not cashiers:
+        return result
+
+    # Zipf popularity over a shuffled product order
+    ranked = product_ids[:]
+    rng.shuffle(ranked)
+    popularity = [1 / (rank + 1) ** 1.07 for rank in range(len(ranked))]
+    cumulative = []
+    total = 0
+    for weight in popularity:
+        total += weight
+        cumulative.append(total)
+
+    sold = dict.fromkeys(product_ids, 0)
+
+    def sale_rows():
+        for timestamp in _timestamps(outgoing, days, start, rng):
+            produk_id = rng.choices(ranked, cum_weights=cumulative)[0]
+            jumlah = rng.choices((1, 2, 3, 4, 5), weights=(70, 18, 7, 3, 2))[0]
+            sold[produk_id] += jumlah
+            yield {'produk_id': produk_id, 'jumlah': jumlah, 'user_id': rng.choice(cashiers),
+                   'tanggal_keluar': timestamp}
+    result.outgoing = _insert_chunks(TransaksiKeluar, sale_rows(), progress)
+
+    # Restocks: each product gets receipts covering its sales plus a remaining stock
+    receipts_per_product = dict.fromkeys(product_ids, 0)
+    for produk_id in rng.choices(ranked, cum_weights=cumulative, k=incoming):
+        receipts_per_product[produk_id] += 1
+    remaining = {produk_id: rng.randrange(0, 40) for produk_id in product_ids}
+    batches = []
+    for produk_id, receipts in receipts_per_product.items():
+        needed = sold[produk_id] + remaining[produk_id]
+        receipts = max(receipts, 1 if needed else 0)
+        share, extra = divmod(needed, receipts) if receipts else (0, 0)
+        batches.extend((produk_id, share + (1 if i < extra else 0)) for i in range(receipts))
+    rng.shuffle(batches)
+
+    def restocks():
+        for timestamp, (produk_id, jumlah) in zip(_timestamps(len(batches), days, start, rng), batches):
+            if jumlah:
+                yield {'produk_id': produk_id, 'jumlah': jumlah, 'user_id': rng.choice(cashiers),
+                       'tanggal_masuk': timestamp}
+    result.incoming = _insert_chunks(TransaksiMasuk, restocks(), progress)
+
+    table = Produk.__table__
+    db.session.execute(table.update().where(table.c.id == db.bindparam('b_id')).values(stok=db.bindparam('b_stok')),
+                       [{'b_id': produk_id, 'b_stok': stok} for produk_id, stok in remaining.items()])
+
+    activities = result.outgoing + result.incoming if activities is None else activities
+
+    def entries():
+        for timestamp in _timestamps(activities, days, start, rng):
+            produk_id = rng.choices(ranked, cum_weights=cumulative)[0]
+            jumlah = rng.choices((1, 2, 3), weights=(80, 15, 5))[0]
+            template = rng.choices(('Input barang keluar: {} unit {}', '[Staf] Input barang keluar: {} unit {}',
+                                    '[Staf] Checkout 1 produk: {}x {}', 'Input barang masuk: {} unit {}'),
+                                   weights=(30, 45, 15, 10))[0]
+            yield {'user_id': rng.choice(cashiers), 'aktivitas': template.format(jumlah, names[produk_id]),
+                   'timestamp': timestamp}
+    result.activities = _insert_chunks(RiwayatAktivitas, entries(), progress)
+
+    counters.rebuild()
+    counters.touch(counters.CHANGES_TRANSACTIONS)
+    catalog.invalidate(names=True)
+    db.session.commit()
+    sales.rebuild(start.date(), end.date())
+    return result
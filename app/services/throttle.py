@@ -0,0 +1,98 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from flask import current_app
+
+# Failed-login counters shared by every worker on the host through a small SQLite
+# file (independent of the main database, so a credential-stuffing run never turns
+# into writes on the user table). Each key keeps two fixed buckets and the sliding
+# window count is estimated as  previous * (1 - elapsed/window) + current,
+# which costs one SELECT to check and one UPSERT to record, no matter the volume.
+
+class LoginThrottle:
+
+    def __init__(self, path, window, limits):
+        self.path = path
+        self.window = window
+        self.limits = limits  # {'user': n, 'ip': n}
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # sqlite3 connections must not cross fork(); reopen in each worker
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS attempts ('
+                         'key TEXT NOT NULL, bucket INTEGER NOT NULL, hits INTEGER NOT NULL, '
+                         'PRIMARY KEY (key, bucket))')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _keys(self, username, ip):
+        keys = []
+        if username:
+            keys.append(('user', f'user:{username.strip().lower()}'))
+        if ip:
+            keys.append(('ip', f'ip:{ip}'))
+        return keys
+
+    def _estimate(self, key, now):
+        bucket = int(now // self.window)
+        rows = dict(self._conn().execute(
+            'SELECT bucket, hits FROM attempts WHERE key = ? AND bucket IN (?, ?)',
+            (key, bucket - 1, bucket)).fetchall())
+        elapsed = (now % self.window) / self.window
+        return rows.get(bucket - 1, 0) * (1 - elapsed) + rows.get(bucket, 0)
+
+    def retry_after(self, username, ip):
+        """Seconds until a new attempt is allowed, or 0 if neither the username nor the IP is throttled."""
+        now = time.time()
+        for kind, key in self._keys(username, ip):
+            if self._estimate(key, now) >= self.limits[kind]:
+                return max(1, math.ceil(self.window - now % self.window))
+        return 0
+
+    def record_failure(self, username, ip):
+        now = time.time()
+        bucket = int(now // self.window)
+        conn = self._conn()
+        for _, key in self._keys(username, ip):
+            conn.execute('INSERT INTO attempts (key, bucket, hits) VALUES (?, ?, 1) '
+                         'ON CONFLICT (key, bucket) DO UPDATE SET hits = hits + 1', (key, bucket))
+        # Buckets older than the previous one no longer affect any estimate
+        if random.random() < 0.05:
+            conn.execute('DELETE FROM attempts WHERE bucket < ?', (bucket - 1,))
+
+    def reset(self, username):
+        """Forget the username's failures after a successful login. IP counters are kept."""
+        if username:
+            self._conn().execute('DELETE FROM attempts WHERE key = ?', (f'user:{username.strip().lower()}',))
+
+def init_app(app):
+    path = app.config.get('LOGIN_THROTTLE_FILE') or os.path.join(app.instance_path, 'login_throttle.sqlite')
+    app.extensions['login_throttle'] = LoginThrottle(
+        path,
+        window=app.config.get('LOGIN_THROTTLE_WINDOW', 300),
+        limits={
+            'user': app.config.get('LOGIN_THROTTLE_USER_LIMIT', 5),
+            'ip': app.config.get('LOGIN_THROTTLE_IP_LIMIT', 20),
+        })
+
+def _throttle():
+    return current_app.extensions['login_throttle']
+
+def retry_after(username, ip):
+    return _throttle().retry_after(username, ip)
+
+def record_failure(username, ip):
+    _throttle().record_failure(username, ip)
+
+def reset(username):
+    _throttle().reset(username)
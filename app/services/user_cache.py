@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from flask_login import UserMixin
+from app import db
+from app.models import User
+from app.services.versioning import VersionFile, bump_after_commit
+
+class UserSnapshot(UserMixin, namedtuple('UserSnapshot', 'id username role otp_enabled cabang_id')):
+    """Immutable stand-in for `current_user` on ordinary requests.
+
+    Carries only what the decorators and templates read. Code that needs to change
+    the account must load the real User row, e.g. `db.session.get(User, current_user.id)`.
+    """
+    __slots__ = ()
+
+class UserCache:
+    """Per-worker cache of UserSnapshot objects for Flask-Login's user_loader.
+
+    Entries expire after `ttl` seconds. Any role, branch, 2FA or lockout change bumps a
+    shared version file, which drops every worker's cache on its next request,
+    so demotions take effect immediately without a query per request.
+    """
+
+    def __init__(self, version_file, ttl):
+        self.version_file = VersionFile(version_file)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, user_id):
+        version = self.version_file.read()
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[0]
+        row = db.session.query(User.id, User.username, User.role, User.otp_enabled, User.cabang_id) \
+            .filter(User.id == user_id).first()
+        snapshot = UserSnapshot(row.id, row.username, row.role, bool(row.otp_enabled), row.cabang_id) if row else None
+        with self._lock:
+            self.misses += 1
+            # Only cache if nobody bumped the version while we were querying
+            if snapshot is not None and self._version == version:
+                self._entries[user_id] = (snapshot, now)
+        return snapshot
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'entries': len(self._entries),
+            'version_file': self.version_file.path,
+        }
+
+def init_app(app):
+    version_file = app.config.get('USER_CACHE_VERSION_FILE') or os.path.join(app.instance_path, 'user.version')
+    app.extensions['user_cache'] = UserCache(version_file, app.config.get('USER_CACHE_TTL', 60))
+
+def _cache():
+    return current_app.extensions['user_cache']
+
+def load(user_id):
+    return _cache().load(user_id)
+
+def invalidate():
+    """Drop cached users on every worker once the current transaction commits."""
+    bump_after_commit(_cache().version_file)
+
+def stats():
+    return _cache().stats()
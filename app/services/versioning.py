@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+from sqlalchemy import event
+from app import db
+
+class VersionFile:
+    """A data version shared by every worker on the host through a file's identity.
+
+    Reading the version is a single stat() call (inode + mtime), so caches can check it
+    on every request without touching the database. Bumping atomically replaces the
+    file, which gives it a new inode even when two bumps land in the same mtime tick.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    def bump(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}'
+        with open(tmp_path, 'w') as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp_path, self.path)
+
+def bump_after_commit(version_file):
+    """Bump `version_file` once the current db.session transaction commits (never on rollback).
+
+    Bumping before the commit would let another worker reload and re-cache the old rows.
+    """
+    db.session.info.setdefault('pending_version_bumps', {})[version_file.path] = version_file
+
+def _after_commit(session):
+    for version_file in session.info.pop('pending_version_bumps', {}).values():
+        version_file.bump()
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('pending_version_bumps', None)
+
+def init_app(app):
+    if not event.contains(db.session, 'after_commit', _after_commit):
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
@@ -1,12 +1,19 @@
 import functools
-from flask import Blueprint, render_template, abort, flash, redirect, url_for, request
+from flask import Blueprint, render_template, abort, flash, redirect, url_for, request, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import Produk, TransaksiMasuk, TransaksiKeluar, RiwayatAktivitas
-from app.admin.forms import IncomingProductForm, OutgoingProductForm # Reusing forms from admin
+from app.models import Produk, RiwayatAktivitas
+from app.admin.forms import IncomingProductForm, OutgoingProductForm, CheckoutForm # Reusing forms from admin
+from app.pagination import name_id_paginate
+from app.services import branches, catalog, fragments
+from app.services.replicas import read_replica
+from app.services.stock import available, receive_stock, issue_stock, checkout as checkout_lines, InsufficientStock
 
 staf_bp = Blueprint('staf', __name__, url_prefix='/staf')
 
+SEARCH_RESULT_LIMIT = 50
+PRODUCTS_PER_PAGE = 50
+
 # Decorator to restrict access to staf and pending roles (and admin/superadmin for general staf pages)
 def staf_required(f):
     @functools.wraps(f)
@@ -27,39 +34,60 @@ def dashboard():
 @staf_bp.route('/products')
 @staf_required
 def list_products():
-    products = Produk.query.order_by(Produk.nama).all()
-    return render_template('staf/list_products.html', title='Daftar Produk', products=products)
+    query = request.args.get('q', '').strip()
+    cursor = None if query else request.args.get('setelah')
+    cabang_id = current_user.cabang_id
+
+    def table_context():
+        next_cursor = None
+        if query:
+            products = catalog.search(query, limit=SEARCH_RESULT_LIMIT)
+        else:
+            # One page at a time, seeking on the name index; never the whole catalog
+            page = name_id_paginate(Produk.query, Produk.nama, Produk.id, cursor=cursor, per_page=PRODUCTS_PER_PAGE)
+            products, next_cursor = page.items, page.next_cursor
+        # Staff of a branch see their branch's stock instead of the central stock
+        branch_stock = None
+        if cabang_id is not None:
+            branch_stock = branches.stock_levels(cabang_id, [product.id for product in products])
+        return {'products': products, 'branch_stock': branch_stock, 'cursor': cursor, 'next_cursor': next_cursor}
+
+    product_table = fragments.render('staf.product_table', 'staf/_product_table.html', table_context,
+                                     key=(query, cursor, cabang_id))
+    return render_template('staf/list_products.html', title='Daftar Produk', product_table=product_table, query=query)
+
+@staf_bp.route('/products/search')
+@staf_required
+def search_products():
+    limit = min(request.args.get('limit', 10, type=int), SEARCH_RESULT_LIMIT)
+    results = catalog.search(request.args.get('q', ''), limit=max(limit, 1))
+    levels = None
+    if current_user.cabang_id is not None:
+        levels = branches.stock_levels(current_user.cabang_id, [item.id for item in results])
+    return jsonify([
+        {'id': item.id, 'nama': item.nama, 'kategori': item.kategori, 'harga': item.harga,
+         'stok': item.stok if levels is None else levels.get(item.id, 0)}
+        for item in results
+    ])
 
 @staf_bp.route('/incoming', methods=['GET', 'POST'])
 @staf_required
 def incoming_products():
     form = IncomingProductForm()
-    form.product_id.choices = [(p.id, p.nama) for p in Produk.query.order_by(Produk.nama).all()]
 
     if form.validate_on_submit():
-        product = Produk.query.get(form.product_id.data)
+        product = catalog.get(form.product_id.data)
         if product:
             quantity = form.quantity.data
-            product.stok += quantity
-            
-            transaction = TransaksiMasuk(
-                produk_id=product.id,
-                jumlah=quantity,
-                user_id=current_user.id
-            )
-            db.session.add(transaction)
-
-            activity = RiwayatAktivitas(
-                user_id=current_user.id,
-                aktivitas=f'[Staf] Input barang masuk: {quantity} unit {product.nama}'
-            )
-            db.session.add(activity)
-
-            db.session.commit()
-            flash(f'{quantity} unit {product.nama} berhasil ditambahkan ke stok.', 'message')
-            return redirect(url_for('staf.incoming_products'))
-        else:
-            flash('Produk tidak ditemukan.', 'error')
+            if receive_stock(product, quantity, current_user.id,
+                             f'[Staf] Input barang masuk: {quantity} unit {product.nama}',
+                             cabang_id=current_user.cabang_id):
+                db.session.commit()
+                flash(f'{quantity} unit {product.nama} berhasil ditambahkan ke stok.', 'message')
+                return redirect(url_for('staf.incoming_products'))
+            # The cached product was deleted after the catalog was loaded
+            db.session.rollback()
+        flash('Produk tidak ditemukan.', 'error')
     
     return render_template('staf/incoming_products.html', title='Input Barang Masuk', form=form)
 
@@ -68,40 +96,48 @@ def incoming_products():
 @staf_required
 def outgoing_products():
     form = OutgoingProductForm()
-    form.product_id.choices = [(p.id, p.nama) for p in Produk.query.order_by(Produk.nama).all()]
 
     if form.validate_on_submit():
-        product = Produk.query.get(form.product_id.data)
+        product = catalog.get(form.product_id.data)
         if product:
             quantity = form.quantity.data
-            if product.stok >= quantity:
-                product.stok -= quantity
-
-                transaction = TransaksiKeluar(
-                    produk_id=product.id,
-                    jumlah=quantity,
-                    user_id=current_user.id
-                )
-                db.session.add(transaction)
-
-                activity = RiwayatAktivitas(
-                    user_id=current_user.id,
-                    aktivitas=f'[Staf] Input barang keluar: {quantity} unit {product.nama}'
-                )
-                db.session.add(activity)
-
+            if issue_stock(product, quantity, current_user.id,
+                           f'[Staf] Input barang keluar: {quantity} unit {product.nama}',
+                           cabang_id=current_user.cabang_id):
                 db.session.commit()
                 flash(f'{quantity} unit {product.nama} berhasil dikeluarkan dari stok.', 'message')
                 return redirect(url_for('staf.outgoing_products'))
             else:
-                flash(f'Stok {product.nama} tidak mencukupi. Stok tersedia: {product.stok}.', 'error')
+                db.session.rollback()
+                flash(f'Stok {product.nama} tidak mencukupi. Stok tersedia: {available(product.id, current_user.cabang_id)}.', 'error')
         else:
             flash('Produk tidak ditemukan.', 'error')
     
     return render_template('staf/outgoing_products.html', title='Input Barang Keluar', form=form)
 
+@staf_bp.route('/checkout', methods=['GET', 'POST'])
+@staf_required
+def checkout():
+    form = CheckoutForm()
+    if form.validate_on_submit():
+        # Empty rows are ignored so the cashier can leave spare lines blank
+        lines = [(entry.product_id.data, entry.quantity.data) for entry in form.items
+                 if entry.product_id.data and entry.quantity.data]
+        try:
+            sold = checkout_lines(lines, current_user.id, aktivitas_prefix='[Staf] ', cabang_id=current_user.cabang_id)
+        except InsufficientStock as e:
+            flash(str(e), 'error')
+        else:
+            db.session.commit()
+            total_units = sum(quantity for _, quantity in sold)
+            flash(f'Penjualan {len(sold)} produk ({total_units} unit) berhasil diproses.', 'message')
+            return redirect(url_for('staf.checkout'))
+
+    return render_template('staf/checkout.html', title='Penjualan (Multi Produk)', form=form)
+
 @staf_bp.route('/my_activity')
 @staf_required
+@read_replica
 def my_activity():
     activities = RiwayatAktivitas.query.filter_by(user_id=current_user.id).order_by(RiwayatAktivitas.timestamp.desc()).all()
     return render_template('staf/my_activity.html', title='Riwayat Aktivitas Pribadi', activities=activities)
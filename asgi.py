@@ -0,0 +1,16 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
+if os.path.exists(dotenv_path):
+    load_dotenv(dotenv_path)
+
+from app import create_app
+from app.asgi import AsgiApp
+
+# Optional async serving mode, e.g.:
+#   uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers ${WEB_CONCURRENCY:-2}
+# Read-heavy views run on the event loop with async database drivers; forms and other
+# writes run on a thread pool (see app/asgi.py). Schema changes go through `flask db upgrade`.
+app = AsgiApp(create_app())
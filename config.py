@@ -7,3 +7,75 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
                               'sqlite:///' + os.path.join(basedir, '..', 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Read replicas for the reporting views (see app/services/replicas.py), comma-separated
+    DATABASE_REPLICA_URLS = os.environ.get('DATABASE_REPLICA_URLS', '')
+    READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))  # primary-only after a write
+    # Connection pool per bind; unset keeps SQLAlchemy's defaults
+    DATABASE_POOL_SIZE = os.environ.get('DATABASE_POOL_SIZE')
+    DATABASE_MAX_OVERFLOW = os.environ.get('DATABASE_MAX_OVERFLOW')
+    DATABASE_POOL_RECYCLE = os.environ.get('DATABASE_POOL_RECYCLE')  # seconds, e.g. below MySQL's wait_timeout
+    DATABASE_REPLICA_POOL_SIZE = os.environ.get('DATABASE_REPLICA_POOL_SIZE')
+    DATABASE_REPLICA_MAX_OVERFLOW = os.environ.get('DATABASE_REPLICA_MAX_OVERFLOW')
+    DATABASE_REPLICA_POOL_RECYCLE = os.environ.get('DATABASE_REPLICA_POOL_RECYCLE')
+
+    # ASGI serving mode (asgi.py, see app/asgi.py): connections per bind for the async views
+    # of one worker, and threads for the remaining (sync) views
+    ASGI_DB_POOL_SIZE = int(os.environ.get('ASGI_DB_POOL_SIZE', 5))
+    ASGI_DB_MAX_OVERFLOW = int(os.environ.get('ASGI_DB_MAX_OVERFLOW', 5))
+    ASGI_SYNC_THREADS = int(os.environ.get('ASGI_SYNC_THREADS', 4))
+
+    # Product catalog cache shared by workers on one host (see app/services/catalog.py)
+    CATALOG_VERSION_FILE = os.environ.get('CATALOG_VERSION_FILE')  # defaults to <instance>/catalog.version
+    # Bumped only by product create/edit/delete/import; defaults to catalog_names.version next to it
+    CATALOG_NAMES_VERSION_FILE = os.environ.get('CATALOG_NAMES_VERSION_FILE')
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 300))
+    # Rendered product tables and dashboard panels, per worker (see app/services/fragments.py)
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 300))
+    # Products listed in the dashboard's low-stock panel (see app/services/low_stock.py)
+    LOW_STOCK_DASHBOARD_LIMIT = int(os.environ.get('LOW_STOCK_DASHBOARD_LIMIT', 10))
+
+    # Per-worker cache behind Flask-Login's user_loader (see app/services/user_cache.py)
+    USER_CACHE_VERSION_FILE = os.environ.get('USER_CACHE_VERSION_FILE')  # defaults to <instance>/user.version
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+
+    # Password hashing (see app/services/passwords.py); existing hashes are upgraded on next login
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_THREADS = int(os.environ.get('PASSWORD_HASH_THREADS', 4))  # most hashes one worker runs at once
+
+    # Login throttle shared by workers on one host (see app/services/throttle.py)
+    LOGIN_THROTTLE_FILE = os.environ.get('LOGIN_THROTTLE_FILE')  # defaults to <instance>/login_throttle.sqlite
+    LOGIN_THROTTLE_WINDOW = int(os.environ.get('LOGIN_THROTTLE_WINDOW', 300))  # seconds
+    LOGIN_THROTTLE_USER_LIMIT = int(os.environ.get('LOGIN_THROTTLE_USER_LIMIT', 5))
+    LOGIN_THROTTLE_IP_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IP_LIMIT', 20))
+
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto are trusted
+    # (werkzeug ProxyFix). Behind a router, leaving this at 0 makes every client share
+    # the router's address, so the per-IP login limit locks everyone out at once; set
+    # it to the number of proxies (the Procfile sets 1). Never set it when the app is
+    # reached directly, or clients can choose their own address.
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+
+    # Activity log writer (see app/services/audit.py): 'sync' writes each entry in the
+    # transaction of the change it describes. 'async' batches entries on a background
+    # thread after commit; entries still queued (up to AUDIT_LOG_FLUSH_INTERVAL worth)
+    # are lost if the process dies without running atexit (SIGKILL, OOM kill, crash).
+    AUDIT_LOG_MODE = os.environ.get('AUDIT_LOG_MODE', 'sync')
+    AUDIT_LOG_BATCH_SIZE = int(os.environ.get('AUDIT_LOG_BATCH_SIZE', 200))
+    AUDIT_LOG_FLUSH_INTERVAL = float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', 1.0))  # seconds
+    AUDIT_LOG_QUEUE_SIZE = int(os.environ.get('AUDIT_LOG_QUEUE_SIZE', 10000))
+
+    # Monthly archives written by `flask archive` (see app/services/archive.py)
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR')  # defaults to <instance>/archive
+
+    # Per-request SQL statistics and N+1 detection (see app/services/profiler.py), shown
+    # at /admin/perf. Disabled by default; costs nothing unless switched on.
+    SQL_PROFILING = os.environ.get('SQL_PROFILING', '').lower() in ('1', 'true', 'yes')
+    SQL_PROFILING_HEADER = os.environ.get('SQL_PROFILING_HEADER', '').lower() in ('1', 'true', 'yes')  # X-SQL-Stats
+    SQL_PROFILING_SLOWEST = int(os.environ.get('SQL_PROFILING_SLOWEST', 5))  # slowest statements kept per endpoint
+    SQL_PROFILING_N_PLUS_ONE = int(os.environ.get('SQL_PROFILING_N_PLUS_ONE', 5))  # repeats of one shape per request
+
+    # JSON API (/api/v1): bodies smaller than this are sent uncompressed
+    API_GZIP_MIN_SIZE = int(os.environ.get('API_GZIP_MIN_SIZE', 1024))
+    API_GZIP_LEVEL = int(os.environ.get('API_GZIP_LEVEL', 6))
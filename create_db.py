@@ -1,5 +1,7 @@
-from run import app, db
+from flask_migrate import upgrade
+from run import app
 
+# Creates or updates the schema through the migrations, like `flask db upgrade`
 with app.app_context():
-    db.create_all()
+    upgrade()
     print("Tabel berhasil dibuat!")
@@ -0,0 +1,40 @@
+"""ringkasan counters
+
+Revision ID: 3b1f0c9a7e21
+Revises: d7968d82983c
+Create Date: 2026-10-17 09:12:40.117204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f0c9a7e21'
+down_revision = 'd7968d82983c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ringkasan',
+    sa.Column('nama', sa.String(length=64), nullable=False),
+    sa.Column('nilai', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('nama')
+    )
+
+    # Seed the counters from the existing history so the dashboard is correct right away
+    ringkasan = sa.table('ringkasan', sa.column('nama'), sa.column('nilai'))
+    sources = [
+        ('total_users', sa.func.count(), sa.table('user')),
+        ('total_products', sa.func.count(), sa.table('produk')),
+        ('total_incoming_transactions', sa.func.coalesce(sa.func.sum(sa.column('jumlah')), 0), sa.table('transaksi_masuk')),
+        ('total_outgoing_transactions', sa.func.coalesce(sa.func.sum(sa.column('jumlah')), 0), sa.table('transaksi_keluar')),
+    ]
+    for nama, value, source in sources:
+        op.execute(ringkasan.insert().from_select(
+            ['nama', 'nilai'], sa.select(sa.literal(nama), value).select_from(source)
+        ))
+
+def downgrade():
+    op.drop_table('ringkasan')
@@ -0,0 +1,59 @@
+"""penjualan harian rollups
+
+Revision ID: 8e4d2a6b1c35
+Revises: 3b1f0c9a7e21
+Create Date: 2026-10-17 23:20:05.481922
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4d2a6b1c35'
+down_revision = '3b1f0c9a7e21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('penjualan_harian',
+    sa.Column('tanggal', sa.Date(), nullable=False),
+    sa.Column('produk_id', sa.Integer(), nullable=False),
+    sa.Column('unit_keluar', sa.Integer(), nullable=False),
+    sa.Column('omzet', sa.BigInteger(), nullable=False),
+    sa.Column('unit_masuk', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['produk_id'], ['produk.id'], ),
+    sa.PrimaryKeyConstraint('tanggal', 'produk_id')
+    )
+    with op.batch_alter_table('penjualan_harian', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_penjualan_harian_produk_id'), ['produk_id'], unique=False)
+
+    # Seed from the existing history (archived months are added by `flask report backfill`)
+    produk = sa.table('produk', sa.column('id'), sa.column('harga'))
+    keluar = sa.table('transaksi_keluar', sa.column('produk_id'), sa.column('jumlah'), sa.column('tanggal_keluar'))
+    masuk = sa.table('transaksi_masuk', sa.column('produk_id'), sa.column('jumlah'), sa.column('tanggal_masuk'))
+    movements = sa.union_all(
+        sa.select(sa.func.date(keluar.c.tanggal_keluar).label('tanggal'), keluar.c.produk_id,
+                  keluar.c.jumlah.label('unit_keluar'), (keluar.c.jumlah * produk.c.harga).label('omzet'),
+                  sa.literal(0).label('unit_masuk'))
+        .select_from(keluar.join(produk, produk.c.id == keluar.c.produk_id)),
+        sa.select(sa.func.date(masuk.c.tanggal_masuk).label('tanggal'), masuk.c.produk_id,
+                  sa.literal(0).label('unit_keluar'), sa.literal(0).label('omzet'),
+                  masuk.c.jumlah.label('unit_masuk'))
+        .select_from(masuk.join(produk, produk.c.id == masuk.c.produk_id)),
+    ).subquery()
+    penjualan_harian = sa.table('penjualan_harian', sa.column('tanggal'), sa.column('produk_id'),
+                                sa.column('unit_keluar'), sa.column('omzet'), sa.column('unit_masuk'))
+    op.execute(penjualan_harian.insert().from_select(
+        ['tanggal', 'produk_id', 'unit_keluar', 'omzet', 'unit_masuk'],
+        sa.select(movements.c.tanggal, movements.c.produk_id, sa.func.sum(movements.c.unit_keluar),
+                  sa.func.sum(movements.c.omzet), sa.func.sum(movements.c.unit_masuk))
+        .group_by(movements.c.tanggal, movements.c.produk_id)
+    ))
+
+def downgrade():
+    with op.batch_alter_table('penjualan_harian', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_penjualan_harian_produk_id'))
+
+    op.drop_table('penjualan_harian')
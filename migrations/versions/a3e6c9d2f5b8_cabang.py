@@ -0,0 +1,82 @@
+"""cabang
+
+Revision ID: a3e6c9d2f5b8
+Revises: f1b8d4c2a6e7
+Create Date: 2026-10-18 00:22:47.130592
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e6c9d2f5b8'
+down_revision = 'f1b8d4c2a6e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cabang',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kode', sa.String(length=16), nullable=False),
+    sa.Column('nama', sa.String(length=128), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cabang', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cabang_kode'), ['kode'], unique=True)
+
+    op.create_table('stok_cabang',
+    sa.Column('cabang_id', sa.Integer(), nullable=False),
+    sa.Column('produk_id', sa.Integer(), nullable=False),
+    sa.Column('stok', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['cabang_id'], ['cabang.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['produk_id'], ['produk.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('cabang_id', 'produk_id')
+    )
+    with op.batch_alter_table('stok_cabang', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stok_cabang_produk_id'), ['produk_id'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cabang_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_user_cabang_id'), ['cabang_id'], unique=False)
+        batch_op.create_foreign_key('fk_user_cabang_id', 'cabang', ['cabang_id'], ['id'])
+
+    for table, time_column in (('transaksi_masuk', 'tanggal_masuk'), ('transaksi_keluar', 'tanggal_keluar')):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('cabang_id', sa.Integer(), nullable=True))
+            batch_op.add_column(sa.Column('mutasi', sa.Boolean(), server_default=sa.false(), nullable=False))
+            batch_op.create_index(f'ix_{table}_cabang_id_{time_column}', ['cabang_id', time_column], unique=False)
+            batch_op.create_foreign_key(f'fk_{table}_cabang_id', 'cabang', ['cabang_id'], ['id'])
+
+    with op.batch_alter_table('riwayat_aktivitas', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cabang_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_riwayat_aktivitas_cabang_id_timestamp', ['cabang_id', 'timestamp'], unique=False)
+        batch_op.create_foreign_key('fk_riwayat_aktivitas_cabang_id', 'cabang', ['cabang_id'], ['id'])
+
+def downgrade():
+    with op.batch_alter_table('riwayat_aktivitas', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_riwayat_aktivitas_cabang_id', type_='foreignkey')
+        batch_op.drop_index('ix_riwayat_aktivitas_cabang_id_timestamp')
+        batch_op.drop_column('cabang_id')
+
+    for table, time_column in (('transaksi_keluar', 'tanggal_keluar'), ('transaksi_masuk', 'tanggal_masuk')):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_cabang_id', type_='foreignkey')
+            batch_op.drop_index(f'ix_{table}_cabang_id_{time_column}')
+            batch_op.drop_column('mutasi')
+            batch_op.drop_column('cabang_id')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_user_cabang_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_user_cabang_id'))
+        batch_op.drop_column('cabang_id')
+
+    with op.batch_alter_table('stok_cabang', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stok_cabang_produk_id'))
+
+    op.drop_table('stok_cabang')
+    with op.batch_alter_table('cabang', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cabang_kode'))
+
+    op.drop_table('cabang')
@@ -0,0 +1,34 @@
+"""snapshot stok
+
+Revision ID: c5a7f3e9d214
+Revises: 8e4d2a6b1c35
+Create Date: 2026-10-17 23:58:31.906113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a7f3e9d214'
+down_revision = '8e4d2a6b1c35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('snapshot_stok',
+    sa.Column('waktu', sa.DateTime(), nullable=False),
+    sa.Column('produk_id', sa.Integer(), nullable=False),
+    sa.Column('stok', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['produk_id'], ['produk.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('waktu', 'produk_id')
+    )
+    with op.batch_alter_table('snapshot_stok', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_snapshot_stok_produk_id'), ['produk_id'], unique=False)
+
+def downgrade():
+    with op.batch_alter_table('snapshot_stok', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_snapshot_stok_produk_id'))
+
+    op.drop_table('snapshot_stok')
@@ -0,0 +1,30 @@
+"""titik pesan
+
+Revision ID: f1b8d4c2a6e7
+Revises: c5a7f3e9d214
+Create Date: 2026-10-17 23:41:09.518266
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b8d4c2a6e7'
+down_revision = 'c5a7f3e9d214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ALTER TABLE rather than batch mode: SQLite can add a virtual generated
+    # column in place, but a batch table copy would try to insert into it
+    op.add_column('produk', sa.Column('titik_pesan', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('produk', sa.Column('selisih_stok', sa.Integer(), sa.Computed('stok - titik_pesan'), nullable=True))
+    op.create_index(op.f('ix_produk_selisih_stok'), 'produk', ['selisih_stok'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_produk_selisih_stok'), table_name='produk')
+    with op.batch_alter_table('produk', schema=None) as batch_op:
+        batch_op.drop_column('selisih_stok')
+        batch_op.drop_column('titik_pesan')
@@ -0,0 +1,58 @@
+import pytest
+
+from app import create_app, db
+from app.models import User, Produk
+from config import Config
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build an app on a fresh SQLite database; keyword arguments override config values."""
+    apps = []
+
+    def make_app(**overrides):
+        class TestConfig(Config):
+            TESTING = True
+            WTF_CSRF_ENABLED = False
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / f'test{len(apps)}.db')
+            BCRYPT_LOG_ROUNDS = 4
+            AUDIT_LOG_MODE = 'sync'
+            CATALOG_VERSION_FILE = str(tmp_path / 'catalog.version')
+            USER_CACHE_VERSION_FILE = str(tmp_path / 'user.version')
+            LOGIN_THROTTLE_FILE = str(tmp_path / 'login_throttle.sqlite')
+            ARCHIVE_DIR = str(tmp_path / 'archive')
+
+        for name, value in overrides.items():
+            setattr(TestConfig, name, value)
+        app = create_app(TestConfig)
+        with app.app_context():
+            db.create_all()
+            for username, role in [('boss', 'superadmin'), ('adm', 'admin')]:
+                user = User(username=username, role=role)
+                user.set_password('rahasia')
+                db.session.add(user)
+            db.session.add(Produk(nama='HP A', harga=1000, stok=10, kategori='HP'))
+            db.session.commit()
+        apps.append(app)
+        return app
+
+    yield make_app
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def login(app):
+    def login(username):
+        client = app.test_client()
+        response = client.post('/login', data={'username': username, 'password': 'rahasia'})
+        assert response.status_code == 302
+        return client
+    return login
@@ -0,0 +1,25 @@
+from app import db
+from app.models import Ringkasan
+from app.services import counters
+
+
+def test_bump_creates_and_increments_in_one_statement(app):
+    with app.app_context():
+        db.session.query(Ringkasan).delete()
+        db.session.commit()
+
+        counters.bump(counters.TOTAL_INCOMING, 3)
+        counters.bump(counters.TOTAL_INCOMING, 2)
+        db.session.commit()
+
+        assert counters.read(counters.TOTAL_INCOMING) == {counters.TOTAL_INCOMING: 5}
+
+
+def test_touch_always_advances(app):
+    with app.app_context():
+        counters.touch(counters.CHANGES_PRODUCTS)
+        first = counters.read(counters.CHANGES_PRODUCTS)[counters.CHANGES_PRODUCTS]
+        counters.touch(counters.CHANGES_PRODUCTS)
+        db.session.commit()
+
+        assert counters.read(counters.CHANGES_PRODUCTS)[counters.CHANGES_PRODUCTS] > first
@@ -0,0 +1,37 @@
+import re
+
+from app import db
+from app.models import Produk
+from app.pagination import name_id_paginate
+
+
+def test_name_id_paginate_walks_duplicate_names_in_order(app):
+    with app.app_context():
+        db.session.add_all([Produk(nama=nama, harga=1, stok=1) for nama in ['Case', 'Case', 'Case', 'Adaptor', 'Zeta']])
+        db.session.commit()
+        expected = [(p.nama, p.id) for p in Produk.query.order_by(Produk.nama, Produk.id)]
+
+        seen, cursor = [], None
+        while True:
+            page = name_id_paginate(Produk.query, Produk.nama, Produk.id, cursor=cursor, per_page=2)
+            assert len(page.items) <= 2
+            seen += [(p.nama, p.id) for p in page.items]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        assert seen == expected
+
+
+def test_staff_product_list_is_paginated(app, login, monkeypatch):
+    monkeypatch.setattr('app.staf.routes.PRODUCTS_PER_PAGE', 2)
+    with app.app_context():
+        db.session.add_all([Produk(nama=f'Produk {i}', harga=1, stok=1) for i in range(3)])
+        db.session.commit()
+    client = login('adm')
+
+    body = client.get('/staf/products').get_data(as_text=True)
+    assert body.count('<tr>') == 3  # header + 2 rows
+    cursor = re.search(r'setelah=([\w-]+)', body).group(1)
+
+    body = client.get(f'/staf/products?setelah={cursor}').get_data(as_text=True)
+    assert 'Produk 2' in body and 'Halaman Pertama' in body and 'setelah=' not in body
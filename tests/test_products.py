@@ -0,0 +1,42 @@
+from app import db
+from app.models import Produk, TransaksiMasuk
+
+
+def product_id(app, nama):
+    with app.app_context():
+        return db.session.query(Produk.id).filter_by(nama=nama).scalar()
+
+
+def add_product(client, nama, stok):
+    response = client.post('/admin/products', data={'name': nama, 'price': '500', 'stock': str(stok),
+                                                     'category': 'Aksesoris', 'reorder_point': '0'})
+    assert response.status_code == 302
+
+
+def test_opening_stock_is_a_receipt(app, login):
+    admin = login('adm')
+    add_product(admin, 'Kabel', 7)
+
+    with app.app_context():
+        receipt = TransaksiMasuk.query.filter_by(produk_id=product_id(app, 'Kabel')).one()
+        assert receipt.jumlah == 7
+
+
+def test_product_with_history_is_not_deleted(app, login):
+    admin = login('adm')
+    add_product(admin, 'Kabel', 7)
+
+    response = admin.post(f"/admin/product/delete/{product_id(app, 'Kabel')}", follow_redirects=True)
+    assert response.status_code == 200
+    assert 'tidak dapat dihapus' in response.get_data(as_text=True)
+    assert product_id(app, 'Kabel') is not None
+
+
+def test_product_without_history_is_deleted(app, login):
+    admin = login('adm')
+    add_product(admin, 'Kabel', 0)
+
+    response = admin.post(f"/admin/product/delete/{product_id(app, 'Kabel')}", follow_redirects=True)
+    assert response.status_code == 200
+    assert 'berhasil dihapus' in response.get_data(as_text=True)
+    assert product_id(app, 'Kabel') is None
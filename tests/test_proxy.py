@@ -0,0 +1,20 @@
+from flask import request
+
+
+def client_address(app):
+    @app.route('/_test/remote_addr')
+    def remote_addr():
+        return request.remote_addr
+    return app.test_client()
+
+
+def test_forwarded_for_is_ignored_by_default(app):
+    client = client_address(app)
+    response = client.get('/_test/remote_addr', headers={'X-Forwarded-For': '203.0.113.7'})
+    assert response.get_data(as_text=True) == '127.0.0.1'
+
+
+def test_forwarded_for_is_trusted_for_configured_hops(make_app):
+    client = client_address(make_app(TRUSTED_PROXY_HOPS=1))
+    response = client.get('/_test/remote_addr', headers={'X-Forwarded-For': '198.51.100.1, 203.0.113.7'})
+    assert response.get_data(as_text=True) == '203.0.113.7'
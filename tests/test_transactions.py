@@ -0,0 +1,18 @@
+from app import db
+from app.models import Produk, User
+from app.services.stock import receive_stock
+
+
+def test_unknown_username_matches_no_transactions(app, login):
+    with app.app_context():
+        admin_id = db.session.query(User.id).filter_by(username='adm').scalar()
+        receive_stock(Produk.query.filter_by(nama='HP A').one(), 3, admin_id, 'Barang masuk')
+        db.session.commit()
+    admin = login('adm')
+
+    body = admin.get('/admin/transactions?pengguna=adm').get_data(as_text=True)
+    assert 'HP A' in body
+
+    body = admin.get('/admin/transactions?pengguna=tidakada').get_data(as_text=True)
+    assert 'Pengguna tidak ditemukan' in body
+    assert 'HP A' not in body
@@ -0,0 +1,43 @@
+from sqlalchemy import event
+
+from app import db
+from app.models import User
+
+
+def user_id(app, username):
+    with app.app_context():
+        return db.session.query(User.id).filter_by(username=username).scalar()
+
+
+def test_demoted_admin_is_refused_on_next_request(app, login):
+    admin = login('adm')
+    assert admin.get('/admin/dashboard').status_code == 200
+
+    superadmin = login('boss')
+    response = superadmin.post('/admin/users/role', data={'user_ids': [user_id(app, 'adm')], 'role': 'staf'})
+    assert response.status_code == 302
+
+    assert admin.get('/admin/dashboard').status_code == 403
+
+
+def test_authenticated_request_does_not_select_user(app, login):
+    admin = login('adm')
+    # Warm the user cache and the catalog
+    assert admin.get('/staf/products/search?q=HP').status_code == 200
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    try:
+        response = admin.get('/staf/products/search?q=HP')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    assert response.get_json()[0]['nama'] == 'HP A'
+    assert [statement for statement in statements if 'FROM user' in statement] == []